@@ -0,0 +1,155 @@
+"""Memory used by generated blocks per rendered line.
+
+Builds the Python ``class`` block for a synthetic model and measures memory
+allocated by the tree of blocks: once with `Block` and once with
+`DictBlock`, a copy of the block class before `Block` had ``__slots__``,
+which keeps all formatting attributes in the instance ``__dict__``. The same
+output flattened into a `BlockArena` is measured too. Run from the
+repository root:
+
+    python benchmarks/block_memory.py [ENTITIES] [PROPERTIES]
+
+Measured with 2000 entities and 10 properties per entity (168 000 lines,
+Python 3.11):
+
+    ===============================  ==============
+    Representation                   bytes per line
+    ===============================  ==============
+    Block with ``__dict__``          144
+    Block with ``__slots__``, Style  129
+    BlockArena                        79
+    ===============================  ==============
+
+The numbers include the line strings themselves, which are about 60 bytes
+per line of this output. The writers build trees of `Block` objects, the
+second row is the memory the tool uses. `BlockArena` is not used by the
+writers, the row shows how much a flat representation would save.
+"""
+
+import sys
+import tracemalloc
+
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+sys.path.insert(0, ".")
+
+from entigen.block import Block, BlockArena
+from entigen.model import Model, Entity, Property
+from entigen.writers import python as python_writer
+from entigen.writers.python import PythonWriter
+
+
+TYPES = ["string", "int", "list<string>", "date"]
+
+
+def create_model(entity_count: int, property_count: int) -> Model:
+    """Create a model with `entity_count` entities, each with
+    `property_count` properties."""
+
+    model = Model()
+
+    for i in range(entity_count):
+        props = []
+        for j in range(property_count):
+            raw_type = TYPES[j % len(TYPES)]
+            default = "[]" if raw_type.startswith("list") else None
+            prop = Property(name="property_{}".format(j),
+                            tag=j + 1,
+                            raw_type=raw_type,
+                            label="Property {}".format(j),
+                            desc="Description of property {}".format(j),
+                            default=default,
+                            is_optional=False)
+            props.append(prop)
+
+        model.add_entity(Entity(name="Entity{}".format(i), properties=props))
+
+    return model
+
+
+class DictBlock:
+    """Block as it was before `Block` had ``__slots__`` and `Style`: every
+    formatting attribute is stored in the instance ``__dict__``. Only
+    creation of blocks is supported."""
+
+    children: List[Union["DictBlock", str]]
+
+    def __init__(self, block: Any=None,
+            indent: int=0,
+            prefix: Optional[str]=None,
+            suffix: Optional[str]=None,
+            first_prefix: Optional[str]=None,
+            first_indent: Optional[int]=None,
+            last_suffix: Optional[str]=None) -> None:
+
+        self.indent = indent
+        self.prefix = prefix
+        self.suffix = suffix
+        self.first_indent = first_indent
+        self.first_prefix = first_prefix
+        self.last_suffix = last_suffix
+
+        if not block:
+            self.children = []
+        elif isinstance(block, (DictBlock, str)):
+            self.children = [block]
+        else:
+            self.children = block
+
+    def __iadd__(self, block: Union["DictBlock", str]) -> "DictBlock":
+        self.children.append(block)
+        return self
+
+
+def measure(create: Callable[[], Any]) -> Tuple[Any, int]:
+    """Return object created by `create` and number of bytes allocated
+    while creating it."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = create()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (obj, after - before)
+
+
+def main() -> None:
+    entity_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    property_count = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    model = create_model(entity_count, property_count)
+    writer = PythonWriter(model, variables={})
+
+    def create_block() -> Block:
+        return writer.create_block("class")
+
+    def create_arena() -> BlockArena:
+        arena = BlockArena()
+        for entity in model.entities:
+            arena += writer.write_class(entity)
+            arena += ""
+        return arena
+
+    block, block_size = measure(create_block)
+    line_count = sum(1 for _ in block.lines())
+    del block
+
+    # The writer creates blocks of the class imported into its module
+    python_writer.Block = DictBlock  # type: ignore
+    try:
+        dict_block, dict_block_size = measure(create_block)
+    finally:
+        python_writer.Block = Block  # type: ignore
+    del dict_block
+
+    arena, arena_size = measure(create_arena)
+    assert len(list(arena.lines())) == line_count
+
+    print("lines: {}".format(line_count))
+    print("DictBlock tree: {:.0f} bytes per line"
+          .format(dict_block_size / line_count))
+    print("Block tree: {:.0f} bytes per line".format(block_size / line_count))
+    print("BlockArena: {:.0f} bytes per line".format(arena_size / line_count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Memory benchmark – size of models read by the CSV reader.
+
+Run from the repository root:
+
+    python benchmarks/memory.py [-s SCALE ...]
+
+Synthetic models of each scale, see `run.SCALES`, are read with the default
+model representation – objects with ``__slots__`` – and with the compact one
+(the ``compact_model`` reader variable). Memory allocated by the model is
+measured by `tracemalloc` and printed as bytes per property, together with
+the peak while reading.
+
+The ``dict`` row is the representation before the model classes had slots:
+the entities and properties read are copied into plain objects with their
+attributes in ``__dict__`` and the slotted model is dropped. The copies
+share the attribute values with the read model, so strings are interned in
+all rows and the row does not include duplicate strings of the original
+reader. Its peak includes both copies of the model.
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, ".")
+sys.path.insert(0, os.path.dirname(__file__))
+
+from entigen.model import Model, Entity, Property
+
+from run import SCALES, DEFAULT_SCALES, read_model
+from synthetic import write_model
+
+
+REPRESENTATIONS = {
+    "dict": ({}, True),
+    "objects": ({}, False),
+    "compact": ({"compact_model": "yes"}, False),
+}
+"""Reader variables of the measured model representations and a flag
+whether the model is copied into plain objects."""
+
+
+class PlainProperty:
+    """Property with attributes in ``__dict__``."""
+
+    def __init__(self, prop: Property) -> None:
+        for name in Property.__slots__:
+            setattr(self, name, getattr(prop, name))
+
+
+class PlainEntity:
+    """Entity with attributes in ``__dict__``."""
+
+    def __init__(self, entity: Entity) -> None:
+        self.name = entity.name
+        self.properties = [PlainProperty(prop) for prop in entity.properties]
+
+
+def plain_entities(model: Model) -> List[PlainEntity]:
+    return [PlainEntity(entity) for entity in model.entities]
+
+
+def model_size(path: str, variables: Dict[str,str],
+               plain: bool=False) -> Tuple[int, int]:
+    """Return bytes allocated by the model at `path` and the peak while
+    reading it. If `plain` is true, then the size of the entities copied
+    into plain objects is measured instead."""
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        model: Any = read_model(path, variables)
+        if plain:
+            model = plain_entities(model)
+        gc.collect()
+        size, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    del model
+    return (size, peak)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure model memory")
+    parser.add_argument("-s", "--scale", dest="scales", action="append",
+                        choices=sorted(SCALES),
+                        help="Model scale, might be repeated. Default: {}"
+                             .format(", ".join(DEFAULT_SCALES)))
+    args = parser.parse_args()
+
+    print("{:24} {:>14} {:>14}".format("model", "bytes/property",
+                                       "peak (MB)"))
+
+    for scale in args.scales or DEFAULT_SCALES:
+        entity_count, property_count, enum_count = SCALES[scale]
+        properties = entity_count * property_count
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, "synthetic.model")
+            write_model(path, entity_count, property_count, enum_count)
+
+            for name, (variables, plain) in REPRESENTATIONS.items():
+                size, peak = model_size(path, variables, plain)
+                print("{:24} {:14.1f} {:14.1f}"
+                      .format("{}/{}".format(scale, name),
+                              size / properties, peak / (1 << 20)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""Benchmark suite – reading, generation and rendering at several scales.
+
+Run from the repository root:
+
+    python benchmarks/run.py [-s SCALE ...] [-r REPEAT] [-o RESULTS.json]
+                             [-c BASELINE.json] [-t THRESHOLD]
+
+Synthetic models of each scale are generated by `synthetic.write_model()`.
+The time of every benchmark is the best of the repeated runs. Results are
+saved as JSON with ``-o``. With ``-c`` the results are compared with a stored
+baseline – results of a previous run – and the command fails if any
+benchmark is slower than the baseline by more than the threshold, by default
+20 %. A baseline is machine-specific, compare only results from the same
+machine:
+
+    python benchmarks/run.py -o baseline.json
+    ... change the code ...
+    python benchmarks/run.py -c baseline.json
+"""
+
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, ".")
+sys.path.insert(0, os.path.dirname(__file__))
+
+from entigen.block import Block
+from entigen.model import Model
+from entigen.readers.csv import CSVReader
+from entigen.writers.info import InfoWriter
+from entigen.writers.python import PythonWriter
+
+from synthetic import write_model
+
+
+# Scale name -> (entities, properties per entity, enums)
+SCALES = {
+    "small": (100, 10, 5),
+    "medium": (1000, 20, 20),
+    "large": (5000, 25, 50),
+}
+
+DEFAULT_SCALES = ["small", "medium"]
+
+DEFAULT_THRESHOLD = 0.2
+"""Relative slowdown against the baseline considered a regression."""
+
+Benchmark = Tuple[str, Callable[[], Any]]
+
+
+def best_time(function: Callable[[], Any], repeat: int) -> float:
+    """Return the best time of `repeat` calls of `function` in seconds."""
+    best: Optional[float] = None
+
+    for i in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    assert best is not None
+    return best
+
+
+def render(block: Block) -> str:
+    """Render `block` the way it is written by the tool."""
+    stream = io.StringIO()
+    block.write(stream)
+    return stream.getvalue()
+
+
+def read_model(path: str, variables: Dict[str,str]) -> Model:
+    reader = CSVReader(Model(), variables=variables)
+    reader.read_model(path)
+    return reader.model
+
+
+def nested_block(width: int, depth: int) -> Block:
+    """Create a tree of blocks with `width` lines and `width` nested blocks
+    on each of `depth` levels, every level with different formatting."""
+    block = Block(indent=4, suffix=",", last_suffix="")
+    for i in range(width):
+        block += "line {}".format(i)
+    if depth > 1:
+        for i in range(width):
+            block += nested_block(width, depth - 1)
+    return block
+
+
+def writer_benchmarks(model: Model) -> List[Benchmark]:
+    """Return benchmarks of block types of all writers. A new writer is
+    created for every run, so caches of the writers are not reused."""
+
+    benchmarks: List[Benchmark] = []
+
+    def create(writer_class: Any, block_type: str) -> Callable[[], Any]:
+        def run() -> str:
+            writer = writer_class(model, variables={})
+            return render(writer.create_block(block_type))
+        return run
+
+    for block_type in ["class", "class_file", "enums_file"]:
+        benchmarks.append(("python." + block_type,
+                           create(PythonWriter, block_type)))
+
+    for block_type in InfoWriter.block_types:
+        benchmarks.append(("info." + block_type,
+                           create(InfoWriter, block_type)))
+
+    return benchmarks
+
+
+def block_benchmarks(model: Model, entity_count: int) -> List[Benchmark]:
+    """Return benchmarks of rendering of blocks without creating them."""
+
+    class_file = PythonWriter(model, variables={}).create_block("class_file")
+
+    # Roughly as many lines as there are entities
+    width = max(2, int(entity_count ** (1 / 3)))
+    nested = nested_block(width, 3)
+
+    return [
+        ("block.render_class_file",
+         lambda: render(class_file)),
+        ("block.render_nested",
+         lambda: render(nested)),
+        ("block.build_render_nested",
+         lambda: render(nested_block(width, 3))),
+    ]
+
+
+def run_scale(scale: str, repeat: int) -> Dict[str, Dict[str, Any]]:
+    """Run all benchmarks on a model of scale `scale`."""
+
+    entity_count, property_count, enum_count = SCALES[scale]
+    results: Dict[str, Dict[str, Any]] = {}
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        path = os.path.join(tempdir, "synthetic.model")
+        write_model(path, entity_count, property_count, enum_count)
+
+        benchmarks: List[Benchmark] = [
+            ("read_model.csv", lambda: read_model(path, {})),
+            ("read_model.fast_csv",
+             lambda: read_model(path, {"fast_csv": "yes"})),
+        ]
+
+        model = read_model(path, {})
+
+        benchmarks += writer_benchmarks(model)
+        benchmarks += block_benchmarks(model, entity_count)
+
+        for name, function in benchmarks:
+            key = "{}/{}".format(scale, name)
+            seconds = best_time(function, repeat)
+            results[key] = {"seconds": seconds}
+            print("{:40} {:10.2f} ms".format(key, seconds * 1000))
+
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]],
+            baseline: Dict[str, Dict[str, Any]],
+            threshold: float) -> List[str]:
+    """Print comparison of `results` with `baseline` and return names of
+    benchmarks slower by more than `threshold`."""
+
+    regressions: List[str] = []
+
+    print()
+    print("{:40} {:>10} {:>10} {:>8}".format("benchmark", "baseline",
+                                             "current", "ratio"))
+
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+
+        base = baseline[key]["seconds"]
+        current = result["seconds"]
+        ratio = current / base if base else float("inf")
+
+        mark = ""
+        if ratio > 1 + threshold:
+            regressions.append(key)
+            mark = " !"
+
+        print("{:40} {:8.2f}ms {:8.2f}ms {:7.2f}x{}"
+              .format(key, base * 1000, current * 1000, ratio, mark))
+
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run entigen benchmarks")
+    parser.add_argument("-s", "--scale", dest="scales", action="append",
+                        choices=sorted(SCALES),
+                        help="Model scale, might be repeated. Default: {}"
+                             .format(", ".join(DEFAULT_SCALES)))
+    parser.add_argument("-r", "--repeat", type=int, default=5,
+                        help="Number of runs of each benchmark")
+    parser.add_argument("-o", "--output",
+                        help="Save results into a JSON file")
+    parser.add_argument("-c", "--compare", metavar="BASELINE",
+                        help="Compare results with a baseline JSON file")
+    parser.add_argument("-t", "--threshold", type=float,
+                        default=DEFAULT_THRESHOLD,
+                        help="Relative slowdown considered a regression")
+
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for scale in args.scales or DEFAULT_SCALES:
+        results.update(run_scale(scale, args.repeat))
+
+    data = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "scales": {scale: SCALES[scale]
+                   for scale in args.scales or DEFAULT_SCALES},
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print()
+            print("Regressions: {}".format(", ".join(regressions)))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Start-up time of the tool above the start-up of the interpreter itself.
+
+    python benchmarks/startup.py [REPEAT]
+
+Every command is run in a new interpreter, the time is the best of the
+repeated runs minus the best time of an empty interpreter run. Measured with
+Python 3.11:
+
+    ================================  =======
+    Command                           ms
+    ================================  =======
+    import ``entigen.main``           ~60
+    ``entigen --help``                ~65
+    ``entigen examples/thing.model``  ~110
+    ================================  =======
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLE_MODEL = os.path.join(ROOT, "examples", "thing.model")
+
+COMMANDS = [
+    ("import entigen.main", "import entigen.main"),
+    ("entigen --help",
+     "import sys; sys.argv = ['entigen', '--help']; "
+     "from entigen.main import main; main()"),
+    ("entigen thing.model",
+     "import sys; sys.argv = ['entigen', '--no-cache', {!r}]; "
+     "from entigen.main import main; main()".format(EXAMPLE_MODEL)),
+]
+
+
+def best_time(code: str, repeat: int) -> float:
+    """Run Python `code` in a new interpreter `repeat` times and return the
+    best time in seconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True,
+                       stdout=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    assert best is not None
+    return best
+
+
+def main() -> None:
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    interpreter = best_time("pass", repeat)
+    print("{:24} {:8.0f} ms".format("interpreter", interpreter * 1000))
+
+    for name, code in COMMANDS:
+        seconds = best_time(code, repeat) - interpreter
+        print("{:24} {:8.0f} ms".format(name, seconds * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Synthetic model generator for benchmarks.
+
+Writes a ``*.model`` directory readable by the CSV reader:
+
+    python benchmarks/synthetic.py PATH [ENTITIES] [PROPERTIES] [ENUMS]
+
+Properties have a mix of base types, composite types, and types referring
+to other entities and to enums of the model.
+"""
+
+import csv
+import os
+import sys
+
+
+BASE_TYPES = ["string", "int", "identifier", "date"]
+
+
+def property_type(entity: int, prop: int, entity_count: int,
+                  enum_count: int) -> str:
+    """Return type of property `prop` of entity `entity`. Every eighth
+    property has the same kind of type: four base types, a list, a
+    dictionary, a reference to another entity and an enum."""
+
+    kind = prop % 8
+    # Referenced entity, the model is cyclic
+    other = "Entity{}".format((entity + 1 + prop // 8) % entity_count)
+
+    if kind < 4:
+        return BASE_TYPES[kind]
+    elif kind == 4:
+        return "list<string>" if (prop // 8) % 2 else "list<{}>".format(other)
+    elif kind == 5:
+        return "dict<string,int>" if (prop // 8) % 2 \
+               else "dict<identifier,list<{}>>".format(other)
+    elif kind == 6:
+        return other
+    elif enum_count:
+        return "Enum{}".format((entity + prop // 8) % enum_count)
+    else:
+        return "list<dict<string,{}>>".format(other)
+
+
+def write_model(path: str, entity_count: int, property_count: int,
+                enum_count: int=0, value_count: int=5,
+                mixed_types: bool=True) -> None:
+    """Write a model with `entity_count` entities, each with
+    `property_count` properties, and `enum_count` enums with `value_count`
+    values each into directory `path`. If `mixed_types` is false, then all
+    properties are of base types."""
+
+    os.makedirs(path, exist_ok=True)
+
+    with open(os.path.join(path, "entities.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "label", "description"])
+        for i in range(entity_count):
+            writer.writerow(["Entity{}".format(i), "Entity {}".format(i),
+                             "Description of entity {}".format(i)])
+
+    with open(os.path.join(path, "properties.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["category", "entity", "name", "type", "optional",
+                         "tag", "label", "description", "default", "note"])
+        for i in range(entity_count):
+            for j in range(property_count):
+                if mixed_types:
+                    raw_type = property_type(i, j, entity_count, enum_count)
+                else:
+                    raw_type = BASE_TYPES[j % len(BASE_TYPES)]
+                # Some of the composite properties have a default value
+                default = "[]" if raw_type.startswith("list") and j % 3 \
+                          else ""
+                writer.writerow(["default", "Entity{}".format(i),
+                                 "property_{}".format(j), raw_type,
+                                 "no" if j % 3 else "yes", j + 1,
+                                 "Property {}".format(j),
+                                 "Description of property {}".format(j),
+                                 default, ""])
+
+    if not enum_count:
+        return
+
+    with open(os.path.join(path, "enum_values.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["enum", "key", "value", "label", "description"])
+        for i in range(enum_count):
+            for j in range(value_count):
+                writer.writerow(["Enum{}".format(i), "value_{}".format(j), j,
+                                 "Value {}".format(j), ""])
+
+
+if __name__ == "__main__":
+    write_model(sys.argv[1],
+                int(sys.argv[2]) if len(sys.argv) > 2 else 1000,
+                int(sys.argv[3]) if len(sys.argv) > 3 else 10,
+                int(sys.argv[4]) if len(sys.argv) > 4 else 0)
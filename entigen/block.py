@@ -1,14 +1,153 @@
 """Text block"""
 
-from typing import Union, cast, List, Optional, Iterable
+import weakref
+
+from array import array
+from typing import (Union, cast, Any, Dict, List, Optional, Iterable,
+                    Iterator, Tuple, Set, TextIO)
+
+from . import instrument
 
 BlockType = Union["Block", str]
 BlockConvertible = Union[BlockType, List[BlockType]]
 
+# First line lead, common line lead, common suffix, last suffix
+_Format = Tuple[str, str, str, str]
+
+# Format used for lines that are already rendered
+_PLAIN: _Format = ("", "", "", "")
+
+# Rendering events: a line is a string, opening of a block is a tuple of the
+# block format and the block to be memoized, closing of the innermost open
+# block is `None`.
+_Event = Union[str, Tuple[_Format, Optional["Block"]], None]
+
+
+class Style:
+    """Immutable formatting of a block – indentation, prefixes and suffixes.
+    See `Block` for the meaning of the attributes.
+
+    Styles are shared: there is only one instance for every combination of
+    the attributes, which can be retrieved with `Style.get()`. Each style
+    has an `id` which can be used to refer to it by a number instead of an
+    object reference."""
+
+    __slots__ = ("indent", "prefix", "suffix", "first_prefix",
+                 "first_indent", "last_suffix", "id", "format")
+
+    indent: int
+    prefix: Optional[str]
+    suffix: Optional[str]
+    first_prefix: Optional[str]
+    first_indent: Optional[int]
+    last_suffix: Optional[str]
+    id: int
+    format: _Format
+
+    _styles: List["Style"] = []
+    _ids: Dict[Tuple[Any, ...], int] = {}
+
+    @classmethod
+    def get(cls, indent: int=0,
+            prefix: Optional[str]=None,
+            suffix: Optional[str]=None,
+            first_prefix: Optional[str]=None,
+            first_indent: Optional[int]=None,
+            last_suffix: Optional[str]=None) -> "Style":
+        """Return shared style with given attributes."""
+
+        key = (indent, prefix, suffix, first_prefix, first_indent, last_suffix)
+
+        try:
+            return cls._styles[cls._ids[key]]
+        except KeyError:
+            pass
+
+        style = object.__new__(cls)
+        for name, value in zip(STYLE_ATTRIBUTES, key):
+            object.__setattr__(style, name, value)
+        object.__setattr__(style, "id", len(cls._styles))
+        object.__setattr__(style, "format", style._create_format())
+
+        cls._ids[key] = style.id
+        cls._styles.append(style)
+
+        return style
+
+    @classmethod
+    def by_id(cls, id: int) -> "Style":
+        """Return style with identifier `id`."""
+        return cls._styles[id]
+
+    def replace(self, **attributes: Any) -> "Style":
+        """Return shared style with `attributes` replaced."""
+        values = {name: getattr(self, name) for name in STYLE_ATTRIBUTES}
+        values.update(attributes)
+        return Style.get(**values)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Style is immutable")
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (_style, tuple(getattr(self, name)
+                              for name in STYLE_ATTRIBUTES))
+
+    def _create_format(self) -> _Format:
+        """Return tuple of padding, prefix and suffix strings used for the
+        first, common and last lines of a block."""
+
+        common_padding = " " * self.indent
+        if self.first_indent is None:
+            first_padding = common_padding
+        else:
+            first_padding = " " * self.first_indent
+
+        common_prefix = self.prefix or ""
+        if self.first_prefix is None:
+            first_prefix = common_prefix
+        else:
+            first_prefix = self.first_prefix
+
+        common_suffix = self.suffix or ""
+        if self.last_suffix is None:
+            last_suffix = common_suffix
+        else:
+            last_suffix = self.last_suffix
+
+        return (first_padding + first_prefix,
+                common_padding + common_prefix,
+                common_suffix,
+                last_suffix)
+
+
+STYLE_ATTRIBUTES = ("indent", "prefix", "suffix", "first_prefix",
+                    "first_indent", "last_suffix")
+"""Attributes affecting the rendered lines of a block."""
+
+DEFAULT_STYLE = Style.get()
+
+
+def _style(*attributes: Any) -> Style:
+    """Unpickle a style."""
+    return Style.get(*attributes)
+
+
+def _style_property(name: str) -> property:
+    """Create a `Block` property for style attribute `name`."""
+
+    def getter(self: "Block") -> Any:
+        return getattr(self.style, name)
+
+    def setter(self: "Block", value: Any) -> None:
+        self.style = self.style.replace(**{name: value})
+
+    return property(getter, setter)
+
+
 class Block:
     """Represents a block of code. See the `__init__` method documentation for
     more information about the block properties.
-    
+
     Blocks are composed of list of lines or other blocks. Blocks can be
     indented or decorated by suffixes or prefixes. Example use:
 
@@ -31,25 +170,47 @@ class Block:
             do_this()
             do_that()
         end
+
+    Rendered lines are memoized on request – by `lines()` with `memoize`
+    true – for the rendered block and all its nested blocks. Blocks which
+    are rendered repeatedly reuse the memoized lines of their children.
+    Adding to a block or changing its formatting discards the memoized
+    lines of the block and of all memoized blocks that contain it. `str()`
+    and `write()` do not memoize, the rendered lines are not kept.
+
+    Formatting attributes are stored in a shared `Style` object. Use
+    `BlockArena` for large outputs where the whole tree of blocks does not
+    need to be kept.
     """
 
+    __slots__ = ("children", "_style", "_cache", "_parents", "__weakref__")
+
     children: List[BlockType]
-    indent: int
-    prefix: Optional[str]
-    suffix: Optional[str]
-    first_prefix: Optional[str]
-    first_indent: Optional[int]
-    last_suffix: Optional[str]
-    
+    _style: Style
+    _cache: Optional[List[str]]
+    # Weak reference to the only memoized parent or list of weak references
+    # if the block is shared. Parents are registered when their lines are
+    # memoized and are not kept alive by their children.
+    _parents: Union[None, "weakref.ReferenceType[Block]",
+                    List["weakref.ReferenceType[Block]"]]
+
+    indent = _style_property("indent")
+    prefix = _style_property("prefix")
+    suffix = _style_property("suffix")
+    first_prefix = _style_property("first_prefix")
+    first_indent = _style_property("first_indent")
+    last_suffix = _style_property("last_suffix")
+
     def __init__(self, block: Optional[BlockConvertible]=None,
             indent: int=0,
             prefix: Optional[str]=None,
             suffix: Optional[str]=None,
             first_prefix: Optional[str]=None,
             first_indent: Optional[int]=None,
-            last_suffix: Optional[str]=None) -> None:
+            last_suffix: Optional[str]=None,
+            style: Optional[Style]=None) -> None:
         """Create a code block. Arguments:
-        
+
         * `block` – content of the block, either another block or a string.
         * `indent` – number of spaces before each line of the block body
         * `prefix` – string prepended to every line of the block after adding
@@ -61,15 +222,18 @@ class Block:
           first line of the block instead of the common indent.
         * `last_suffix` – if specified, then appended to the last line of the
           block instead of the common `suffix`
+        * `style` – if specified, then it is used instead of the formatting
+          arguments above
 
         """
 
-        self.indent = indent
-        self.prefix = prefix
-        self.suffix = suffix
-        self.first_indent = first_indent
-        self.first_prefix = first_prefix
-        self.last_suffix = last_suffix
+        self._cache = None
+        self._parents = None
+
+        if style is None:
+            style = Style.get(indent, prefix, suffix, first_prefix,
+                              first_indent, last_suffix)
+        self._style = style
 
         if not block:
             self.children = []
@@ -84,61 +248,139 @@ class Block:
         if not isinstance(block, (Block, str)):
             raise Exception("Invalid block type: {}".format(type(block)))
         self.children.append(block)
-        return self
-
-    def lines(self) -> Iterable[str]:
-        """Iterate over lines of the block"""
-
-        common_padding = " " * self.indent
-        if self.first_indent is None:
-            first_padding = common_padding
-        else:
-            first_padding = " " * self.first_indent
+        self.invalidate()
 
-        common_prefix = self.prefix or ""
-        if self.first_prefix is None:
-            first_prefix = common_prefix
-        else:
-            first_prefix = self.first_prefix
+        return self
 
-        common_suffix = self.suffix or ""
-        if self.last_suffix is None:
-            last_suffix = common_suffix
+    @property
+    def style(self) -> Style:
+        """Formatting of the block."""
+        return self._style
+
+    @style.setter
+    def style(self, style: Style) -> None:
+        if style is not self._style:
+            self._style = style
+            self.invalidate()
+
+    def _add_parent(self, parent: "Block") -> None:
+        parents = self._parents
+        if parents is None:
+            self._parents = weakref.ref(parent)
+        elif isinstance(parents, list):
+            # Drop references to parents that no longer exist and repeated
+            # references, from time to time so adding stays linear
+            count = len(parents)
+            if not count & (count - 1):
+                alive: Dict[int, "weakref.ReferenceType[Block]"] = {}
+                for ref in parents:
+                    block = ref()
+                    if block is not None:
+                        alive.setdefault(id(block), ref)
+                parents = self._parents = list(alive.values())
+                if id(parent) in alive:
+                    return
+            parents.append(weakref.ref(parent))
+        elif parents() is None:
+            self._parents = weakref.ref(parent)
+        elif parents() is not parent:
+            self._parents = [parents, weakref.ref(parent)]
+
+    def invalidate(self) -> None:
+        """Discard rendered lines of the block and of all blocks that contain
+        it. Called automatically when a child is added with ``+=`` or when a
+        formatting attribute is changed. Must be called explicitly when
+        `children` are modified directly."""
+
+        if self._cache is None and self._parents is None:
+            return
+
+        todo: List[Block] = [self]
+        seen: Set[int] = set()
+
+        while todo:
+            block = todo.pop()
+            if id(block) in seen:
+                continue
+            seen.add(id(block))
+
+            block._cache = None
+
+            if block._parents is None:
+                continue
+
+            refs = block._parents if isinstance(block._parents, list) \
+                   else [block._parents]
+            for ref in refs:
+                parent = ref()
+                if parent is not None:
+                    todo.append(parent)
+
+    def lines(self, memoize: bool=False) -> Iterator[str]:
+        """Iterate over lines of the block. If `memoize` is true, then
+        rendered lines of the block and of its nested blocks are memoized
+        once the iteration is finished. Memoized lines are used regardless
+        of `memoize`."""
+
+        if self._cache is not None:
+            return iter(self._cache)
         else:
-            last_suffix = self.last_suffix
+            return _render(self._events(), memoize=memoize)
+
+    def _events(self) -> Iterator[_Event]:
+        """Iterate over rendering events of the block. The block tree is
+        walked iteratively. Nested blocks with memoized lines are not walked,
+        their lines are used instead."""
+
+        stack: List[Iterator[BlockType]] = [iter(self.children)]
+        yield (self._style.format, self)
+
+        while stack:
+            child = next(stack[-1], None)
+
+            if child is None:
+                stack.pop()
+                yield None
+            elif isinstance(child, str):
+                yield child
+            elif child._cache is not None:
+                stack.append(iter(child._cache))
+                yield (_PLAIN, None)
+            else:
+                stack.append(iter(child.children))
+                yield (child._style.format, child)
 
-        # We gather all the lines, since we need to know which one is the last
-        # one
-        lines: List[str] = []
+    def write(self, stream: TextIO) -> None:
+        """Write lines of the block into a text `stream`. Each line is
+        terminated by a new line. Lines are written as they are produced,
+        no output is collected in memory and nothing is memoized."""
 
-        for child in self.children:
-            if isinstance(child, str):
-                lines.append(child)
-            else:
-                for line in child.lines():
-                    lines.append(line)
+        if instrument.enabled:
+            self._write_instrumented(stream)
+            return
 
-        count = len(lines)
+        for line in self.lines():
+            stream.write(line)
+            stream.write("\n")
 
-        # Print-out the lines
-        for i, line in enumerate(lines):
-            prefix = common_prefix
-            padding = common_padding
-            suffix = common_suffix
+    def _write_instrumented(self, stream: TextIO) -> None:
+        """Write the block and measure rendering time and number of lines.
+        Includes time of writing into the stream."""
+        count = 0
 
-            if i == 0:
-                prefix = first_prefix
-                padding = first_padding
-            elif i >= count - 1:
-                suffix = last_suffix
+        with instrument.timer("render"):
+            for line in self.lines():
+                stream.write(line)
+                stream.write("\n")
+                count += 1
 
-            yield padding + prefix + line + suffix
+        instrument.count("lines", count)
 
     def to_string(self, indent:int=0) -> str:
         """Return block as string with indent `indent`"""
 
 
-        lines = self.lines()
+        lines: Iterable[str] = self.lines()
 
         if self.suffix:
             lines = [line + self.suffix for line in lines]
@@ -148,5 +390,326 @@ class Block:
         return self.to_string(indent=0)
 
 
+class BlockArena:
+    """Flat representation of a block tree. Instead of nested `Block`
+    objects the arena stores one record per line or nested block: depth of
+    the record, identifier of the block `Style` and the line text (`None`
+    for a nested block). Records are stored in arrays, which requires
+    considerably less memory per line than a tree of blocks.
+
+    Nested blocks are opened with `open()` and closed with `close()`. Lines
+    and whole `Block` trees are appended with ``+=``:
+
+    .. code-block::
+
+        arena = BlockArena()
+        arena += "begin"
+        arena.open(indent=4)
+        arena += "do_this()"
+        arena.close()
+        arena += "end"
+
+    Rendered output is the same as if the records were nested blocks.
+    """
+
+    style: Style
+    depths: "array[int]"
+    style_ids: "array[int]"
+    texts: List[Optional[str]]
+    depth: int
+
+    def __init__(self, style: Optional[Style]=None) -> None:
+        """Create an empty arena. `style` is style of the outermost block."""
+        self.style = style or DEFAULT_STYLE
+        self.depths = array("H")
+        self.style_ids = array("I")
+        self.texts = []
+        self.depth = 1
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def _append(self, depth: int, style_id: int,
+                text: Optional[str]) -> None:
+        self.depths.append(depth)
+        self.style_ids.append(style_id)
+        self.texts.append(text)
+
+    def open(self, style: Optional[Style]=None, **attributes: Any) -> None:
+        """Open a nested block with `style` or with a style created from
+        `attributes`. Following lines are part of the nested block until
+        `close()` is called."""
+        style = style or Style.get(**attributes)
+        self._append(self.depth, style.id, None)
+        self.depth += 1
+
+    def close(self) -> None:
+        """Close the innermost open block."""
+        if self.depth <= 1:
+            raise Exception("No block to close")
+        self.depth -= 1
+
+    def __iadd__(self, block: BlockType) -> "BlockArena":
+        if isinstance(block, str):
+            self._append(self.depth, 0, block)
+        elif isinstance(block, Block):
+            self._add_block(block)
+        else:
+            raise Exception("Invalid block type: {}".format(type(block)))
+        return self
+
+    def _add_block(self, block: Block) -> None:
+        """Append records of `block` and all its nested blocks."""
+        base = self.depth
+        stack: List[Iterator[BlockType]] = [iter(block.children)]
+        self._append(base, block.style.id, None)
+
+        while stack:
+            child = next(stack[-1], None)
+
+            if child is None:
+                stack.pop()
+            elif isinstance(child, str):
+                self._append(base + len(stack), 0, child)
+            else:
+                self._append(base + len(stack), child.style.id, None)
+                stack.append(iter(child.children))
+
+    def _events(self) -> Iterator[_Event]:
+        """Iterate over rendering events of the arena."""
+
+        yield (self.style.format, None)
+        open_depth = 0
+
+        for depth, style_id, text in zip(self.depths, self.style_ids,
+                                         self.texts):
+            # Close blocks that the record is not part of
+            while open_depth >= depth:
+                yield None
+                open_depth -= 1
+
+            if text is None:
+                yield (Style.by_id(style_id).format, None)
+                open_depth = depth
+            else:
+                yield text
+
+        while open_depth >= 0:
+            yield None
+            open_depth -= 1
+
+    def lines(self) -> Iterator[str]:
+        """Iterate over rendered lines."""
+        return _render(self._events(), memoize=False)
+
+    def write(self, stream: TextIO) -> None:
+        """Write rendered lines into a text `stream`. Each line is terminated
+        by a new line."""
+        for line in self.lines():
+            stream.write(line)
+            stream.write("\n")
+
+    def __str__(self) -> str:
+        return "\n".join(self.lines())
+
+
+def _render(events: Iterator[_Event], memoize: bool) -> Iterator[str]:
+    """Render lines from rendering `events`.
+
+    Lines of nested blocks are not collected. Whether a line is the last
+    line of a block is known only after the next line is reached, therefore
+    one line is kept pending until then.
+
+    Leads and suffixes of the open blocks are combined when a block is
+    opened, so a line is decorated by a few concatenations regardless of its
+    depth. If `memoize` is true, then lines of every block in the events are
+    collected and memoized in the block when the block is finished, see
+    `_render_memoized()`."""
+
+    if memoize:
+        yield from _render_memoized(events)
+        return
+
+    # Formats of the open blocks, combined leads of the blocks and their
+    # outer blocks for a common line and for a first line, and combined
+    # suffixes of the blocks and their outer blocks
+    formats: List[_Format] = []
+    leads: List[str] = []
+    first_leads: List[str] = []
+    suffixes: List[str] = []
+    # Number of outer open blocks that already contain a line, the other
+    # open blocks have no lines yet
+    filled = 0
+
+    # Pending line with its lead and the suffixes of the closed blocks
+    pending: Optional[str] = None
+    pending_tail = ""
+    # Number of blocks of the pending line that are not closed yet and
+    # number of blocks that contained a line before the pending one
+    pending_open = 0
+    pending_filled = 0
+
+    for event in events:
+        if isinstance(event, str):
+            if pending is not None:
+                if pending_open:
+                    yield pending + pending_tail + suffixes[pending_open - 1]
+                else:
+                    yield pending + pending_tail
+
+            depth = len(formats) - 1
+            if filled <= depth:
+                pending = first_leads[depth] + event
+            else:
+                pending = leads[depth] + event
+
+            pending_tail = ""
+            pending_open = depth + 1
+            pending_filled = filled
+            filled = depth + 1
+
+        elif event is not None:
+            format = event[0]
+            depth = len(formats)
+            formats.append(format)
+
+            if depth:
+                leads.append(leads[-1] + format[1])
+                if filled < depth:
+                    first_leads.append(first_leads[-1] + format[0])
+                else:
+                    first_leads.append(leads[-2] + format[0])
+                suffixes.append(format[2] + suffixes[-1])
+            else:
+                leads.append(format[1])
+                first_leads.append(format[0])
+                suffixes.append(format[2])
+
+        else:
+            format = formats.pop()
+            leads.pop()
+            first_leads.pop()
+            suffixes.pop()
+            depth = len(formats)
+
+            if depth < pending_open:
+                # The first line of a block has the common suffix
+                if depth >= pending_filled:
+                    pending_tail += format[2]
+                else:
+                    pending_tail += format[3]
+                pending_open = depth
+
+            if filled > depth:
+                filled = depth
+
+    if pending is not None:
+        if pending_open:
+            yield pending + pending_tail + suffixes[pending_open - 1]
+        else:
+            yield pending + pending_tail
+
+
+def _render_memoized(events: Iterator[_Event]) -> Iterator[str]:
+    """Render lines from rendering `events` and memoize lines of every
+    block in the events. Lines as rendered by each block are collected,
+    therefore every line is decorated by the blocks one by one."""
+
+    # Formats of the open blocks, counts of lines already produced within
+    # them, the blocks and collectors of their lines
+    formats: List[_Format] = []
+    counts: List[int] = []
+    blocks: List[Optional[Block]] = []
+    collectors: List[Optional[List[str]]] = []
+
+    pending: Optional[str] = None
+    pending_formats: Tuple[_Format, ...] = ()
+    pending_firsts: Tuple[bool, ...] = ()
+    pending_collectors: Tuple[Optional[List[str]], ...] = ()
+    # Depth from which the blocks of the pending line were closed
+    pending_closed = 0
+
+    # Finished blocks waiting for the pending line
+    finished: List[Tuple[Block, List[str]]] = []
+
+    for event in events:
+        if isinstance(event, str):
+            if pending is not None:
+                yield _decorate(pending, pending_formats, pending_firsts,
+                                pending_closed, pending_collectors)
+            if finished:
+                _memoize(finished)
+                finished = []
+
+            pending = event
+            pending_formats = tuple(formats)
+            pending_firsts = tuple(count == 0 for count in counts)
+            pending_collectors = tuple(collectors)
+            pending_closed = len(formats)
+
+            for i in range(len(counts)):
+                counts[i] += 1
+
+        elif event is not None:
+            format, block = event
+            formats.append(format)
+            counts.append(0)
+            blocks.append(block)
+            if block is not None:
+                collectors.append([])
+            else:
+                collectors.append(None)
+
+        else:
+            formats.pop()
+            counts.pop()
+            block = blocks.pop()
+            collector = collectors.pop()
+            pending_closed = min(pending_closed, len(formats))
+
+            if block is not None and collector is not None:
+                finished.append((block, collector))
+
+    if pending is not None:
+        yield _decorate(pending, pending_formats, pending_firsts,
+                        pending_closed, pending_collectors)
+
+    _memoize(finished)
+
+
+def _memoize(finished: List[Tuple[Block, List[str]]]) -> None:
+    """Set memoized lines of finished blocks. A memoized block is registered
+    as a parent of its nested blocks, so that changes of the nested blocks
+    discard its lines."""
+
+    for block, collector in finished:
+        block._cache = collector
+        for child in block.children:
+            if isinstance(child, Block):
+                child._add_parent(block)
+
+
+def _decorate(line: str, formats: Tuple[_Format, ...],
+              firsts: Tuple[bool, ...], closed: int,
+              collectors: Tuple[Optional[List[str]], ...]) -> str:
+    """Decorate `line` with formats of the blocks it is nested in, from the
+    innermost to the outermost one. `firsts` are flags whether the line is
+    the first line of the corresponding block, blocks at depth `closed` and
+    deeper were closed after the line. The line as rendered by each block is
+    appended to the block's collector, if there is one."""
+
+    for depth in range(len(formats) - 1, -1, -1):
+        first_lead, lead, suffix, last_suffix = formats[depth]
+
+        if firsts[depth]:
+            line = first_lead + line + suffix
+        elif depth >= closed:
+            line = lead + line + last_suffix
+        else:
+            line = lead + line + suffix
+
+        collector = collectors[depth]
+        if collector is not None:
+            collector.append(line)
 
-    
+    return line
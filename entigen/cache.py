@@ -0,0 +1,152 @@
+"""Persistent cache of models read from model sources."""
+
+import hashlib
+import os
+import os.path
+import pickle
+import tempfile
+
+from typing import Dict, List, Optional, Tuple
+
+from .model import Model
+from .extensible import Extensible, Reader
+from .utils import paused_gc
+from . import instrument
+
+CACHE_FORMAT = 3
+"""Version of the cached data. Has to be increased when the model classes
+change."""
+
+FileFingerprint = Tuple[str, Optional[int], Optional[int], Optional[str]]
+"""Path, size, modification time in nanoseconds and SHA-256 digest of a
+file. All but the path are `None` if the file does not exist."""
+
+
+def default_cache_dir() -> str:
+    """Return default directory for cached models."""
+    base = os.environ.get("XDG_CACHE_HOME") \
+           or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "entigen")
+
+
+def reader_variables(reader: Reader,
+                     variables: Dict[str,str]) -> Dict[str,str]:
+    """Return variables from `variables` declared by `reader` – only those
+    might affect the model read by the reader."""
+    names = [name for name, _ in reader.variables]
+    return {name: str(value) for name, value in variables.items()
+            if name in names}
+
+
+def file_fingerprint(path: str) -> FileFingerprint:
+    """Return fingerprint of file `path`."""
+
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return (path, None, None, None)
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+
+    return (path, stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+
+
+def files_fingerprint(paths: List[str]) -> List[FileFingerprint]:
+    """Return fingerprints of files `paths`."""
+    return [file_fingerprint(path) for path in paths]
+
+
+class ModelCache:
+    """Cache of models stored in a directory. A cached model is a pickled
+    snapshot of the `Model` together with fingerprints of the source files
+    – their size, modification time and content hash. The snapshot is used
+    only if all the fingerprints match the current files."""
+
+    path: str
+
+    def __init__(self, path: Optional[str]=None) -> None:
+        """Create a cache in directory `path`, by default a directory in the
+        user's cache directory."""
+        self.path = path or default_cache_dir()
+
+    def _cache_file(self, reader: str, source: str,
+                    variables: Dict[str,str]) -> str:
+        """Return file name of the snapshot of model `source` read by
+        `reader` with reader `variables`."""
+        key = repr((CACHE_FORMAT, reader, os.path.abspath(source),
+                    sorted(variables.items())))
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.path, name + ".pickle")
+
+    def read(self, reader_name: str, source: str,
+             variables: Optional[Dict[str,str]]=None) -> Model:
+        """Return model from `source` read by reader `reader_name`. Cached
+        snapshot is returned if it is valid, otherwise the model is read and
+        stored in the cache."""
+
+        variables = variables or {}
+        reader = Extensible.readers[reader_name](model=Model(),
+                                                 variables=variables)
+        files = reader.source_files(source)
+
+        if files is None:
+            reader.read_model(source)
+            return reader.model
+
+        reader_vars = reader_variables(reader, variables)
+
+        cache_file = self._cache_file(reader_name, source, reader_vars)
+        fingerprint = files_fingerprint(files)
+
+        model = self._load(cache_file, fingerprint)
+        if model is not None:
+            return model
+
+        reader.read_model(source)
+        self._save(cache_file, fingerprint, reader.model)
+
+        return reader.model
+
+    @instrument.timed("cache_load")
+    def _load(self, cache_file: str,
+              fingerprint: List[FileFingerprint]) -> Optional[Model]:
+        """Return model from `cache_file` if it matches `fingerprint`."""
+        try:
+            with open(cache_file, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        try:
+            with paused_gc():
+                cached_fingerprint, model = pickle.loads(data)
+        except Exception:
+            # Broken or incompatible snapshot is the same as no snapshot
+            return None
+
+        if cached_fingerprint != fingerprint:
+            return None
+
+        return model
+
+    def _save(self, cache_file: str, fingerprint: List[FileFingerprint],
+              model: Model) -> None:
+        """Store `model` in `cache_file`. The file is replaced atomically.
+        Failure to write the cache is ignored."""
+        data = pickle.dumps((fingerprint, model),
+                            protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            fd, temp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(temp, cache_file)
+            except BaseException:
+                os.unlink(temp)
+                raise
+        except OSError:
+            pass
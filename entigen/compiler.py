@@ -0,0 +1,174 @@
+"""
+Compiled model – data types bound to the model objects, and information
+about entities that writers need, computed once.
+
+Entities are compiled when they are used for the first time. All problems
+of the compiled entities – unknown data types and duplicate property tags –
+are reported at once with `CompilationError`.
+"""
+
+from collections import namedtuple
+from typing import Dict, List, Optional
+
+from . import instrument
+from .errors import CompilationError, DatatypeError
+from .model import Model, Entity, Property
+from .types import BASE_TYPES, COMPOSITE_TYPES, Type, type_names
+
+
+BASE = "base"
+COMPOSITE = "composite"
+ENTITY = "entity"
+ENUM = "enum"
+
+Binding = namedtuple("Binding", ["kind", "target"])
+"""Meaning of a data type name. `kind` is one of `BASE`, `COMPOSITE`,
+`ENTITY` or `ENUM`, `target` is the entity or the enumeration."""
+
+
+def sort_by_default(props: List[Property]) -> List[Property]:
+    """Sort properties `props` by whether they have default value or not. Put
+    the ones with default value at the end."""
+    first: List[Property] = []
+    last: List[Property] = []
+
+    for prop in props:
+        if prop.default is not None:
+            last.append(prop)
+        else:
+            first.append(prop)
+
+    return first + last
+
+
+class CompiledEntity:
+    entity: Entity
+
+    arguments: List[Property]
+    """Properties in the order of constructor arguments – properties without
+    a default value first"""
+
+    type_names: List[str]
+    """Sorted names of all data types used by the properties, including the
+    nested types"""
+
+    references: List[str]
+    """Sorted names of entities and enumerations used by the properties"""
+
+    def __init__(self, entity: Entity, arguments: List[Property],
+                 type_names: List[str], references: List[str]) -> None:
+        self.entity = entity
+        self.arguments = arguments
+        self.type_names = type_names
+        self.references = references
+
+
+class CompiledModel:
+    """Compiled entities and data type bindings of `model`. The model should
+    not be changed after it is compiled."""
+
+    model: Model
+
+    _bindings: Dict[str, Binding]
+    _entities: Dict[str, CompiledEntity]
+    # Type -> sorted names of the type and its nested types
+    _type_names: Dict[Type, List[str]]
+
+    def __init__(self, model: Model) -> None:
+        self.model = model
+        self._bindings = {}
+        self._entities = {}
+        self._type_names = {}
+
+    def bind(self, name: str) -> Binding:
+        """Return binding of data type name `name`. Entities take precedence
+        over enumerations. Raises `DatatypeError` if the type is unknown."""
+        try:
+            return self._bindings[name]
+        except KeyError:
+            pass
+
+        if name in BASE_TYPES:
+            binding = Binding(BASE, None)
+        elif name in COMPOSITE_TYPES:
+            binding = Binding(COMPOSITE, None)
+        elif self.model.is_entity(name):
+            binding = Binding(ENTITY, self.model.entity(name))
+        elif self.model.is_enum(name):
+            binding = Binding(ENUM, self.model.enum(name))
+        else:
+            raise DatatypeError("Unknown type '{}'".format(name))
+
+        self._bindings[name] = binding
+        return binding
+
+    def entity(self, name: str) -> CompiledEntity:
+        """Return compiled entity `name`."""
+        try:
+            return self._entities[name]
+        except KeyError:
+            return self.compile([name])[0]
+
+    @instrument.timed("compile")
+    def compile(self, names: Optional[List[str]]=None) \
+            -> List[CompiledEntity]:
+        """Compile entities `names`, all entities if not specified, and
+        return them in the same order. Raises `CompilationError` with all
+        problems found in the entities."""
+
+        problems: List[str] = []
+        compiled: List[CompiledEntity] = []
+
+        for name in names or self.model.entity_names:
+            try:
+                compiled.append(self._entities[name])
+                continue
+            except KeyError:
+                pass
+
+            count = len(problems)
+            entity = self._compile_entity(self.model.entity(name), problems)
+            if len(problems) == count:
+                self._entities[name] = entity
+            compiled.append(entity)
+
+        if problems:
+            raise CompilationError(problems)
+
+        return compiled
+
+    def _compile_entity(self, entity: Entity,
+                        problems: List[str]) -> CompiledEntity:
+        """Compile `entity` and append its problems to `problems`."""
+
+        names = set()
+        tags: Dict[int, Property] = {}
+
+        for prop in entity.properties:
+            try:
+                prop_names = self._type_names[prop.type]
+            except KeyError:
+                prop_names = sorted(type_names(prop.type))
+                self._type_names[prop.type] = prop_names
+
+            for name in prop_names:
+                try:
+                    self.bind(name)
+                except DatatypeError:
+                    problems.append("Unknown type '{}' of property '{}.{}'"
+                                    .format(name, entity.name, prop.name))
+                else:
+                    names.add(name)
+
+            other = tags.setdefault(prop.tag, prop)
+            if other is not prop:
+                problems.append("Duplicate tag {} of properties '{}.{}' and "
+                                "'{}.{}'".format(prop.tag, entity.name,
+                                                 other.name, entity.name,
+                                                 prop.name))
+
+        references = [name for name in sorted(names)
+                      if self._bindings[name].kind in (ENTITY, ENUM)]
+
+        return CompiledEntity(entity, sort_by_default(entity.properties),
+                              sorted(names), references)
@@ -0,0 +1,223 @@
+"""
+Structural difference of two models.
+
+Models are compared by content hashes, see `Model.digest()`: entities and
+enums with the same hash are not compared any further, properties and enum
+values are compared only in the changed entities and enums.
+"""
+
+import json
+
+from typing import Any, Dict, Iterable, List, Sequence, Set, TextIO, Tuple
+
+from .model import Model, Entity, Enumeration
+from .types import type_names
+
+
+class MemberDiff:
+    """Changes of members of an entity – properties identified by tag – or
+    of an enum – values identified by key."""
+
+    name: str
+    """Name of the entity or the enum"""
+
+    added: List[Any]
+    removed: List[Any]
+    changed: List[Any]
+
+    reordered: bool
+    """Flag whether the common members are in a different order"""
+
+    def __init__(self, name: str, added: List[Any], removed: List[Any],
+                 changed: List[Any], reordered: bool) -> None:
+        self.name = name
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+        self.reordered = reordered
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "added": self.added,
+            "removed": self.removed,
+            "changed": self.changed,
+            "reordered": self.reordered,
+        }
+
+
+class ModelDiff:
+    """Changes from one model to another. Entities and enums are listed in
+    the order of the model they are in."""
+
+    added_entities: List[str]
+    removed_entities: List[str]
+    changed_entities: List[MemberDiff]
+    entities_reordered: bool
+
+    added_enums: List[str]
+    removed_enums: List[str]
+    changed_enums: List[MemberDiff]
+
+    def __init__(self) -> None:
+        self.added_entities = []
+        self.removed_entities = []
+        self.changed_entities = []
+        self.entities_reordered = False
+        self.added_enums = []
+        self.removed_enums = []
+        self.changed_enums = []
+
+    def __bool__(self) -> bool:
+        return bool(self.entities or self.enums or self.entities_reordered)
+
+    @property
+    def entities(self) -> Set[str]:
+        """Names of added, removed and changed entities."""
+        return set(self.added_entities) | set(self.removed_entities) \
+               | set(diff.name for diff in self.changed_entities)
+
+    @property
+    def enums(self) -> Set[str]:
+        """Names of added, removed and changed enums."""
+        return set(self.added_enums) | set(self.removed_enums) \
+               | set(diff.name for diff in self.changed_enums)
+
+    def affected_entities(self, model: Model) -> List[str]:
+        """Return names of entities of `model` – the changed model – which
+        output might be affected by the changes, in the model order."""
+        return affected_entities(model, self.entities, self.enums)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the changes as a dictionary of lists and dictionaries,
+        suitable for JSON."""
+        return {
+            "entities": {
+                "added": self.added_entities,
+                "removed": self.removed_entities,
+                "changed": {diff.name: diff.as_dict()
+                            for diff in self.changed_entities},
+                "reordered": self.entities_reordered,
+            },
+            "enums": {
+                "added": self.added_enums,
+                "removed": self.removed_enums,
+                "changed": {diff.name: diff.as_dict()
+                            for diff in self.changed_enums},
+            },
+        }
+
+
+def affected_entities(model: Model, entities: Set[str],
+                      enums: Set[str]) -> List[str]:
+    """Return names of entities of `model` which output might be affected by
+    changes of `entities` and `enums` – the changed entities and entities
+    with properties of a changed entity or enum type."""
+
+    changed = entities | enums
+    affected: List[str] = []
+
+    for entity in model.entities:
+        if entity.name in entities:
+            affected.append(entity.name)
+            continue
+
+        for prop in entity.properties:
+            if type_names(prop.type) & changed:
+                affected.append(entity.name)
+                break
+
+    return affected
+
+
+def _diff_members(name: str, old: Iterable[Tuple[Any, bytes]],
+                  new: Iterable[Tuple[Any, bytes]]) -> MemberDiff:
+    """Compare members given as pairs of key and hash."""
+
+    old_members = dict(old)
+    new_members = dict(new)
+
+    added = [key for key in new_members if key not in old_members]
+    removed = [key for key in old_members if key not in new_members]
+    changed = [key for key, digest in new_members.items()
+               if key in old_members and old_members[key] != digest]
+
+    old_order = [key for key in old_members if key in new_members]
+    new_order = [key for key in new_members if key in old_members]
+
+    return MemberDiff(name, added, removed, changed, old_order != new_order)
+
+
+def _diff_objects(old_objects: Sequence[Any], new_objects: Sequence[Any],
+                  compare: Any) -> Tuple[List[str], List[str], List[Any]]:
+    """Return names of added and removed objects and changes of objects
+    with different hashes. Objects are matched by name."""
+
+    old: Dict[str, Any] = {obj.name: obj for obj in old_objects}
+    new: Dict[str, Any] = {obj.name: obj for obj in new_objects}
+
+    added = [obj.name for obj in new_objects if obj.name not in old]
+    removed = [obj.name for obj in old_objects if obj.name not in new]
+    changed = [compare(old[obj.name], obj) for obj in new_objects
+               if obj.name in old and old[obj.name] is not obj
+               and old[obj.name].digest() != obj.digest()]
+
+    return (added, removed, changed)
+
+
+def _diff_entities(old: Entity, new: Entity) -> MemberDiff:
+    # Properties with the same tag are told apart by their order
+    def members(entity: Entity) -> List[Tuple[Any, bytes]]:
+        seen: Dict[int, int] = {}
+        result: List[Tuple[Any, bytes]] = []
+        for prop in entity.properties:
+            count = seen.get(prop.tag, 0)
+            seen[prop.tag] = count + 1
+            key = prop.tag if not count else (prop.tag, count)
+            result.append((key, prop.digest()))
+        return result
+
+    return _diff_members(new.name, members(old), members(new))
+
+
+def _diff_enums(old: Enumeration, new: Enumeration) -> MemberDiff:
+    return _diff_members(new.name,
+                         [(value.key, value.digest()) for value in old.values],
+                         [(value.key, value.digest()) for value in new.values])
+
+
+def diff_models(old: Model, new: Model) -> ModelDiff:
+    """Return changes from model `old` to model `new`, see `Model.diff()`."""
+
+    diff = ModelDiff()
+
+    if old is new or old.digest() == new.digest():
+        return diff
+
+    (diff.added_entities, diff.removed_entities,
+     diff.changed_entities) = _diff_objects(old.entities, new.entities,
+                                            _diff_entities)
+
+    common = set(old.entity_names) & set(new.entity_names)
+    diff.entities_reordered = \
+        [name for name in old.entity_names if name in common] \
+        != [name for name in new.entity_names if name in common]
+
+    (diff.added_enums, diff.removed_enums,
+     diff.changed_enums) = _diff_objects(old.enums, new.enums, _diff_enums)
+
+    return diff
+
+
+def write_change_set(old: Model, new: Model, stream: TextIO) -> None:
+    """Write changes from model `old` to model `new` into `stream` as JSON.
+    The change set contains hashes of both models, the changes and names of
+    the affected entities of the `new` model."""
+
+    model_diff = old.diff(new)
+
+    data = model_diff.as_dict()
+    data["digest"] = {"old": old.digest().hex(), "new": new.digest().hex()}
+    data["affected_entities"] = model_diff.affected_entities(new)
+
+    json.dump(data, stream, indent=2, sort_keys=True)
+    stream.write("\n")
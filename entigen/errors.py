@@ -1,3 +1,6 @@
+from typing import Any, List, Tuple
+
+
 class EntgenError(Exception):
     """Base class for Entgen errors"""
 
@@ -14,3 +17,17 @@ class MetadataError(Exception):
 
 class NoSuchObjectError(MetadataError):
     """Error when a model object is not found."""
+
+class MemoryLimitError(EntgenError):
+    """Error when memory used by the generation exceeds the limit."""
+
+class CompilationError(MetadataError):
+    """Error with all problems found when compiling the model."""
+
+    def __init__(self, problems: List[str]) -> None:
+        super().__init__("Model has {} error(s):\n  {}"
+                         .format(len(problems), "\n  ".join(problems)))
+        self.problems = problems
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (CompilationError, (self.problems,))
@@ -1,17 +1,103 @@
-from typing import List, Dict, Any, Type, cast, Optional
+import importlib
 
-from .model import Model
+from typing import List, Dict, Any, Type, cast, Iterator, Optional, Tuple
+
+from . import instrument
+from .compiler import CompiledModel
+from .model import Model, Entity
 from .block import Block
 
+
+BUILTIN_READERS = {
+    "csv": "entigen.readers.csv",
+    "sqlite": "entigen.readers.sqlite",
+}
+"""Modules of the built-in readers by reader name."""
+
+BUILTIN_WRITERS = {
+    "python": "entigen.writers.python",
+    "info": "entigen.writers.info",
+}
+"""Modules of the built-in writers by writer name."""
+
+READERS_ENTRY_POINT = "entigen.readers"
+WRITERS_ENTRY_POINT = "entigen.writers"
+
+
+class PluginRegistry(dict):
+    """Dictionary of extension classes by name. Extensions register
+    themselves when their modules are imported. A module of an extension
+    which is not registered yet is imported when the extension is looked up:
+    modules of the built-in extensions are known, other extensions are
+    looked up in the entry point group `group` of the installed packages."""
+
+    modules: Dict[str, str]
+    group: str
+
+    def __init__(self, modules: Dict[str, str], group: str) -> None:
+        super().__init__()
+        self.modules = modules
+        self.group = group
+
+    def __missing__(self, name: str) -> Any:
+        if name in self.modules:
+            importlib.import_module(self.modules[name])
+        else:
+            entry_point = self._entry_points().get(name)
+            if entry_point is not None:
+                extension = entry_point.load()
+                # Entry point might refer to a class registered under
+                # another name or to a module
+                if isinstance(extension, type) and name not in self:
+                    self[name] = extension
+
+        if name not in self:
+            raise KeyError(name)
+
+        return self[name]
+
+    def _entry_points(self) -> Dict[str, Any]:
+        """Return entry points of the registry group by name."""
+        try:
+            from importlib.metadata import entry_points
+        except ImportError:
+            return {}
+
+        found = entry_points()
+        if hasattr(found, "select"):
+            group = found.select(group=self.group)
+        else:
+            group = found.get(self.group, [])
+
+        return {entry_point.name: entry_point for entry_point in group}
+
+    def names(self) -> List[str]:
+        """Return sorted names of all available extensions, without
+        importing them."""
+        names = set(self) | set(self.modules) | set(self._entry_points())
+        return sorted(names)
+
+
 class Extensible:
     __extensions__ = "unknown"
 
-    readers: Dict[str, Type["Reader"]] = {}
-    writers: Dict[str, Type["Writer"]] = {}
+    __timed__: List[str] = []
+    """Methods measured by the instrumentation, see `instrument.timed()`.
+    Methods are wrapped when a subclass defines them."""
+
+    readers: Dict[str, Type["Reader"]] = PluginRegistry(BUILTIN_READERS,
+                                                        READERS_ENTRY_POINT)
+    writers: Dict[str, Type["Writer"]] = PluginRegistry(BUILTIN_WRITERS,
+                                                        WRITERS_ENTRY_POINT)
 
     def __init_subclass__(cls, **kwargs: Any) -> None:
         super().__init_subclass__()
 
+        for method in cls.__timed__:
+            if method in cls.__dict__:
+                setattr(cls, method,
+                        instrument.timed(method)(cls.__dict__[method]))
+
         name = kwargs.get("name")
         
         if not name:
@@ -27,25 +113,128 @@ class Extensible:
 
 class Reader(Extensible):
     __extensions__ = "readers"
+    __timed__ = ["read_model"]
+
+    variables: List[Tuple[str, str]] = []
+    """Variables affecting the reader – pairs of name and description."""
+
+    selective: bool = False
+    """Flag whether the reader reads only the requested entities in
+    `read_entities()`."""
 
     model: Model
 
-    def __init__(self, model: Model) -> None:
+    def __init__(self, model: Model,
+                 variables: Optional[Dict[str,str]]=None) -> None:
         pass
 
     def read_model(self, path: str) -> None:
         pass
 
+    def read_entities(self, path: str, names: List[str]) -> None:
+        """Read entities `names` of the model at `path`, the entities they
+        refer to and all enums of the model. Names of entities that are not
+        in the model are ignored. Readers that can read parts of the model
+        should override this method and set `selective`. Default
+        implementation reads the whole model."""
+        self.read_model(path)
+
+    def iter_entities(self, path: str) -> Iterator[Entity]:
+        """Iterate over entities of the model at `path`. Readers that can
+        provide entities without reading the whole model should override
+        this method. Default implementation reads the whole model."""
+        self.read_model(path)
+        return iter(self.model.entities)
+
+    def reload_model(self, path: str, changed: List[str],
+                     previous: Model) -> None:
+        """Read model at `path` of which only files `changed` have changed
+        since it was read into the `previous` model. Readers that can read
+        the model by parts should override this method and take unchanged
+        parts from the `previous` model. Default implementation reads the
+        whole model."""
+        self.read_model(path)
+
+    def source_files(self, path: str) -> Optional[List[str]]:
+        """Return list of files the model at `path` is read from, including
+        optional files that do not exist. Returns `None` if the files are not
+        known, in which case the model can not be cached."""
+        return None
+
 class Writer(Extensible):
     __extensions__ = "writers"
+    __timed__ = ["create_block"]
 
     block_types: List[str] = []
 
+    workers: int = 1
+    """Number of worker processes used to create entity blocks."""
+
+    model: Model
+
+    caches: Dict[str, Any]
+    """Caches that depend only on the model, not on the writer variables.
+    Writers of the same kind with the same model might share them."""
+
     def __init__(self, model: Model,
                  variables: Optional[Dict[str,str]]=None) -> None:
-        pass
+        self.model = model
+        self.caches = {}
+
+    @property
+    def compiled(self) -> CompiledModel:
+        """Compiled model, kept in the caches."""
+        compiled = self.caches.get("compiled")
+
+        if compiled is None or compiled.model is not self.model:
+            compiled = CompiledModel(self.model)
+            self.caches["compiled"] = compiled
+
+        return compiled
 
     def create_block(self, block_type: str,
                      entities: Optional[List[str]]=None) -> Block:
         """Write a block of type `block_type`."""
         raise NotImplementedError
+
+    def iter_blocks(self, block_type: str,
+                    entities: Optional[List[str]]=None) -> Iterator[Block]:
+        """Iterate over consecutive parts of the block of type `block_type`.
+        Writing the parts one after another gives the same output as
+        writing the whole block, but only one part has to be kept in memory.
+        Writers should override this method for block types consisting of
+        parts for each entity. Default implementation yields the whole
+        block."""
+        yield self.create_block(block_type, entities)
+
+    def entity_blocks(self, method: str,
+                      entities: List[Entity]) -> Iterator[Block]:
+        """Iterate over blocks created by writer method `method` for each of
+        the `entities`, in the order of the entities. If there are multiple
+        `workers` and enough entities, then the blocks are created in worker
+        processes and contain the rendered lines."""
+
+        # Imported here, the module depends on this one
+        from .parallel import render_entities, PARALLEL_MIN_ENTITIES
+
+        if self.workers > 1 and len(entities) >= PARALLEL_MIN_ENTITIES:
+            for lines in render_entities(self, method, entities,
+                                         self.workers):
+                yield Block(lines)
+        elif instrument.enabled:
+            create = getattr(self, method)
+            for entity in entities:
+                with instrument.timer(method, entity.name):
+                    block = create(entity)
+                yield block
+        else:
+            create = getattr(self, method)
+            for entity in entities:
+                yield create(entity)
+
+    def create_files(self, entities: Optional[List[str]]=None) \
+            -> Iterator[Tuple[str, Block]]:
+        """Iterate over files of a multi-file output as pairs of file name
+        relative to the output directory and the file content."""
+        raise NotImplementedError("Writer does not support multi-file "
+                                  "output")
@@ -0,0 +1,174 @@
+"""
+Graph of references between entities of a model.
+
+An entity references another entity if a type of any of its properties, or
+any nested type, is the other entity, such as ``list<Attribute>``. The
+entities it references are its dependencies.
+"""
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .jobs import Job
+from .model import Model
+from .types import Type, type_names
+
+
+class EntityGraph:
+    """References between entities of `model`, built once. The model should
+    not be changed while the graph is used. Entities are ordered as in the
+    model, references as they are used by the properties."""
+
+    model: Model
+
+    references: Dict[str, List[str]]
+    """Entities referenced by each entity"""
+
+    referrers: Dict[str, List[str]]
+    """Entities referencing each entity"""
+
+    _components: Optional[List[List[str]]]
+
+    def __init__(self, model: Model) -> None:
+        self.model = model
+        self.references = {}
+        self.referrers = {name: [] for name in model.entity_names}
+        self._components = None
+
+        # Type -> names of referenced entities
+        type_refs: Dict[Type, List[str]] = {}
+
+        for entity in model.entities:
+            refs: List[str] = []
+
+            for prop in entity.properties:
+                try:
+                    names = type_refs[prop.type]
+                except KeyError:
+                    names = sorted(name for name in type_names(prop.type)
+                                   if model.is_entity(name))
+                    type_refs[prop.type] = names
+
+                for name in names:
+                    if name not in refs:
+                        refs.append(name)
+
+            self.references[entity.name] = refs
+            for name in refs:
+                self.referrers[name].append(entity.name)
+
+    def closure(self, names: Iterable[str]) -> Set[str]:
+        """Return entities `names` and all entities they depend on, directly
+        or indirectly. Raises `NoSuchObjectError` if an entity does not
+        exist."""
+
+        result: Set[str] = set()
+        stack = [self.model.entity(name).name for name in names]
+
+        while stack:
+            name = stack.pop()
+            if name in result:
+                continue
+            result.add(name)
+            stack.extend(self.references[name])
+
+        return result
+
+    def components(self) -> List[List[str]]:
+        """Return strongly connected components – groups of entities that
+        depend on each other – in dependency order: every component comes
+        after the components it depends on."""
+
+        if self._components is None:
+            self._components = self._find_components()
+        return self._components
+
+    def _find_components(self) -> List[List[str]]:
+        """Tarjan's algorithm without recursion, so the depth of references
+        is not limited by the recursion limit."""
+
+        index: Dict[str, int] = {}
+        lowlink: Dict[str, int] = {}
+        on_stack: Set[str] = set()
+        stack: List[str] = []
+        components: List[List[str]] = []
+        order = {name: i for i, name in enumerate(self.model.entity_names)}
+
+        for root in self.model.entity_names:
+            if root in index:
+                continue
+
+            # Entity and position of the next reference to visit
+            work: List[Tuple[str, int]] = [(root, 0)]
+
+            while work:
+                name, pos = work.pop()
+
+                if pos == 0:
+                    index[name] = lowlink[name] = len(index)
+                    stack.append(name)
+                    on_stack.add(name)
+
+                refs = self.references[name]
+                while pos < len(refs):
+                    ref = refs[pos]
+                    pos += 1
+                    if ref not in index:
+                        work.append((name, pos))
+                        work.append((ref, 0))
+                        break
+                    elif ref in on_stack:
+                        lowlink[name] = min(lowlink[name], index[ref])
+                else:
+                    if lowlink[name] == index[name]:
+                        component: List[str] = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == name:
+                                break
+                        component.sort(key=order.__getitem__)
+                        components.append(component)
+
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[name])
+
+        return components
+
+    def topological_order(self, names: Optional[Iterable[str]]=None) \
+            -> List[str]:
+        """Return entities `names`, all entities if not specified, in
+        dependency order – every entity comes after the entities it depends
+        on, except entities that depend on each other, which are in the model
+        order."""
+
+        order = [name for component in self.components()
+                 for name in component]
+
+        if names is None:
+            return order
+
+        selected = set(names)
+        return [name for name in order if name in selected]
+
+    def dependency_order(self, names: Iterable[str]) -> List[str]:
+        """Return entities `names` and all their dependencies in dependency
+        order."""
+        return self.topological_order(self.closure(names))
+
+
+def with_dependencies(model: Model, jobs: List[Job]) -> List[Job]:
+    """Return `jobs` with the listed entities extended by the entities they
+    depend on, in dependency order. Jobs of all entities are not changed."""
+
+    graph: Optional[EntityGraph] = None
+    result: List[Job] = []
+
+    for job in jobs:
+        if job.entities:
+            graph = graph or EntityGraph(model)
+            job = job._replace(entities=graph.dependency_order(job.entities))
+        result.append(job)
+
+    return result
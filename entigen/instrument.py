@@ -0,0 +1,165 @@
+"""Instrumentation – named timers and counters of the generation phases.
+
+Instrumentation is off by default. Code that is instrumented checks the
+module variable `enabled` before measuring anything, therefore the overhead
+is one attribute lookup when it is off. Use `enable()` to collect timers and
+counters, `subscribe()` to receive them as they are recorded, and `report()`
+to print them.
+"""
+
+import functools
+import time
+
+from collections import namedtuple
+from contextlib import contextmanager
+from typing import (Any, Callable, Dict, Iterator, List, Optional, TextIO,
+                    Tuple, TypeVar, cast)
+
+
+Event = namedtuple("Event", ["kind", "name", "value", "detail"])
+"""Recorded measurement. `kind` is ``timer`` with `value` in seconds or
+``counter`` with `value` the increment. `detail` is an optional name of the
+measured object, such as an entity name."""
+
+TOP_DETAILS = 10
+"""Default number of the slowest objects in the report."""
+
+enabled: bool = False
+"""Flag whether the measurements are recorded."""
+
+# Name -> [total seconds, number of calls]
+_timers: Dict[str, List[float]] = {}
+# Name -> detail -> total seconds
+_details: Dict[str, Dict[str, float]] = {}
+_counters: Dict[str, int] = {}
+_subscribers: List[Callable[[Event], None]] = []
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def enable() -> None:
+    """Start recording the measurements."""
+    global enabled
+    enabled = True
+
+
+def disable() -> None:
+    """Stop recording the measurements. Subscribers are kept, but they are
+    not notified until the instrumentation is enabled again."""
+    global enabled
+    enabled = False
+
+
+def reset() -> None:
+    """Remove all recorded measurements."""
+    _timers.clear()
+    _details.clear()
+    _counters.clear()
+
+
+def subscribe(callback: Callable[[Event], None]) -> None:
+    """Call `callback` with an `Event` for every recorded measurement. The
+    instrumentation is enabled."""
+    _subscribers.append(callback)
+    enable()
+
+
+def unsubscribe(callback: Callable[[Event], None]) -> None:
+    """Stop calling `callback`."""
+    _subscribers.remove(callback)
+
+
+def record_time(name: str, seconds: float,
+                detail: Optional[str]=None) -> None:
+    """Add `seconds` to timer `name`, and to its `detail` if specified."""
+    entry = _timers.setdefault(name, [0.0, 0])
+    entry[0] += seconds
+    entry[1] += 1
+
+    if detail is not None:
+        details = _details.setdefault(name, {})
+        details[detail] = details.get(detail, 0.0) + seconds
+
+    if _subscribers:
+        event = Event("timer", name, seconds, detail)
+        for callback in _subscribers:
+            callback(event)
+
+
+def count(name: str, value: int=1, detail: Optional[str]=None) -> None:
+    """Increase counter `name` by `value`."""
+    _counters[name] = _counters.get(name, 0) + value
+
+    if _subscribers:
+        event = Event("counter", name, value, detail)
+        for callback in _subscribers:
+            callback(event)
+
+
+@contextmanager
+def timer(name: str, detail: Optional[str]=None) -> Iterator[None]:
+    """Context measuring time spent in timer `name`. Callers should check
+    `enabled` first."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_time(name, time.perf_counter() - start, detail)
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Decorator measuring calls of a function in timer `name` when the
+    instrumentation is enabled."""
+
+    def decorator(function: F) -> F:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not enabled:
+                return function(*args, **kwargs)
+
+            with timer(name):
+                return function(*args, **kwargs)
+
+        return cast(F, wrapper)
+
+    return decorator
+
+
+def timers() -> Dict[str, Tuple[float, int]]:
+    """Return recorded timers as tuples of total seconds and number of calls,
+    in the order in which they were first recorded."""
+    return {name: (entry[0], int(entry[1]))
+            for name, entry in _timers.items()}
+
+
+def counters() -> Dict[str, int]:
+    """Return recorded counters."""
+    return dict(_counters)
+
+
+def slowest(name: str, top: int=TOP_DETAILS) -> List[Tuple[str, float]]:
+    """Return `top` slowest details of timer `name` as pairs of detail and
+    total seconds."""
+    details = _details.get(name, {})
+    return sorted(details.items(), key=lambda item: -item[1])[:top]
+
+
+def report(stream: TextIO, top: int=TOP_DETAILS) -> None:
+    """Write timers, counters and `top` slowest details of each timer into
+    `stream`."""
+
+    stream.write("{:32} {:>12} {:>8}\n".format("Phase", "Time (ms)",
+                                               "Calls"))
+    for name, (seconds, calls) in timers().items():
+        stream.write("{:32} {:12.2f} {:8}\n".format(name, seconds * 1000,
+                                                    calls))
+
+    if _counters:
+        stream.write("\n{:32} {:>12}\n".format("Counter", "Value"))
+        for name, value in _counters.items():
+            stream.write("{:32} {:12}\n".format(name, value))
+
+    for name in _details:
+        stream.write("\nSlowest in {} (ms):\n".format(name))
+        for detail, seconds in slowest(name, top):
+            stream.write("{:32} {:12.2f}\n".format(detail, seconds * 1000))
@@ -0,0 +1,173 @@
+"""Batch jobs – multiple writer outputs from a single model load."""
+
+import json
+import os.path
+import sys
+
+from collections import namedtuple
+from typing import Any, Dict, Iterable, List, Optional, TextIO
+
+from .block import Block
+from .errors import ConfigError
+from .extensible import Extensible, Writer
+from .model import Model
+from .output import OutputDirectory
+from . import instrument
+
+
+Job = namedtuple("Job", ["writer", "block_type", "entities", "variables",
+                         "output", "output_dir"])
+"""Output of a writer. `block_type` and `output` are used for a single-file
+output, `output_dir` for a multi-file output. If neither `output` nor
+`output_dir` is specified then the block is written to the standard
+output."""
+
+JOB_KEYS = {"writer", "block", "entities", "variables", "output",
+            "output_dir"}
+
+
+def _load_toml(path: str) -> Dict[str, Any]:
+    try:
+        import tomllib as toml  # type: ignore
+    except ImportError:
+        try:
+            import tomli as toml  # type: ignore
+        except ImportError:
+            raise ConfigError("Reading TOML job file '{}' requires Python "
+                              ">= 3.11 or the 'tomli' package. Use a JSON "
+                              "job file instead.".format(path))
+
+    with open(path, "rb") as f:
+        try:
+            return toml.load(f)
+        except toml.TOMLDecodeError as e:
+            raise ConfigError("Malformed job file '{}': {}".format(path, e))
+
+
+def _load_json(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        try:
+            return json.load(f)
+        except ValueError as e:
+            raise ConfigError("Malformed job file '{}': {}".format(path, e))
+
+
+def load_jobs(path: str) -> List[Job]:
+    """Load jobs from a TOML or JSON file `path`. The file contains a list
+    of job tables ``job`` with keys: ``writer``, ``block``, ``entities``,
+    ``variables``, ``output`` and ``output_dir``. Relative output paths are
+    relative to the directory of the job file."""
+
+    if path.endswith(".json"):
+        data = _load_json(path)
+    else:
+        data = _load_toml(path)
+
+    base = os.path.dirname(path)
+    jobs: List[Job] = []
+
+    for i, item in enumerate(data.get("job", [])):
+        unknown = set(item) - JOB_KEYS
+        if unknown:
+            raise ConfigError("Unknown keys in job {} of '{}': {}"
+                              .format(i + 1, path,
+                                      ", ".join(sorted(unknown))))
+
+        output = item.get("output")
+        output_dir = item.get("output_dir")
+        if not (output or output_dir):
+            raise ConfigError("Job {} of '{}' has no output or output_dir"
+                              .format(i + 1, path))
+
+        # Boolean variables are flags, the same as `-V name` on the command
+        # line
+        variables = {str(name): value if value is True else str(value)
+                     for name, value in item.get("variables", {}).items()
+                     if value is not False}
+
+        job = Job(writer=item.get("writer", "python"),
+                  block_type=item.get("block"),
+                  entities=list(item.get("entities", [])),
+                  variables=variables,
+                  output=output and os.path.join(base, output),
+                  output_dir=output_dir and os.path.join(base, output_dir))
+        jobs.append(job)
+
+    return jobs
+
+
+@instrument.timed("run_jobs")
+def run_jobs(model: Model, jobs: List[Job],
+             variables: Optional[Dict[str,str]]=None,
+             workers: int=1, remove_stale: bool=True,
+             stream: Optional[TextIO]=None,
+             caches: Optional[Dict[str, Dict[str, Any]]]=None,
+             streaming: bool=False) -> None:
+    """Run `jobs` with `model`. Job variables override `variables`. Writers
+    of the same kind share their caches, which are kept in `caches` by
+    writer name if specified. Caches are valid only for the same `model`.
+    See `run_job()` for `remove_stale`, `stream` and `streaming`."""
+
+    if caches is None:
+        caches = {}
+
+    for job in jobs:
+        writer = create_writer(model, job, variables, workers, caches)
+        run_job(writer, job, remove_stale=remove_stale, stream=stream,
+                streaming=streaming)
+
+
+def create_writer(model: Model, job: Job,
+                  variables: Optional[Dict[str,str]],
+                  workers: int, caches: Dict[str, Dict[str, Any]]) -> Writer:
+    """Create writer of `job` with `variables` overridden by the job
+    variables. The writer uses caches of its kind from `caches`."""
+
+    try:
+        writer_factory = Extensible.writers[job.writer]
+    except KeyError:
+        raise ConfigError("Unknown writer '{}'".format(job.writer))
+
+    job_variables = dict(variables or {})
+    job_variables.update(job.variables or {})
+
+    writer = writer_factory(model=model, variables=job_variables)
+    writer.workers = workers
+    writer.caches = caches.setdefault(job.writer, writer.caches)
+
+    return writer
+
+
+def run_job(writer: Writer, job: Job, remove_stale: bool=True,
+            stream: Optional[TextIO]=None, streaming: bool=False) -> None:
+    """Write output of `job` using `writer`. Files of a multi-file output
+    that were not generated are removed if `remove_stale` is true and the job
+    writes all entities – files of entities not listed in the job are kept.
+    Output of a job without an output file is written into `stream`, by
+    default the standard output. If `streaming` is true, then the block is
+    created and written in parts, see `Writer.iter_blocks()`."""
+
+    if job.output_dir:
+        output = OutputDirectory(job.output_dir)
+        output.update(writer.create_files(job.entities),
+                      remove_stale=remove_stale and not job.entities)
+        return
+
+    # If no block type is specified then default is used
+    block_type = job.block_type or writer.block_types[0]
+
+    blocks: Iterable[Block]
+    if streaming:
+        blocks = writer.iter_blocks(block_type, job.entities)
+    else:
+        # The whole block is created before the output is opened
+        blocks = [writer.create_block(block_type, job.entities)]
+
+    # Lines are written as they are rendered, the output is not collected
+    if job.output:
+        with open(job.output, "w") as f:
+            for block in blocks:
+                block.write(f)
+    else:
+        for block in blocks:
+            block.write(stream or sys.stdout)
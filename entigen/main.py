@@ -1,41 +1,136 @@
 """The main part of the entigen tool."""
 
 import argparse
+import os
 import re
+import sys
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Type
 
-from .model import Model
-from .readers.csv import CSVReader
-from .writers.python import PythonWriter
-from .writers.info import InfoWriter
+from .cache import ModelCache
+from .errors import ConfigError, MemoryLimitError
+from .parallel import read_models
+from .jobs import Job, load_jobs, run_jobs
+from . import instrument
 
-from .extensible import Extensible
+# Readers and writers are imported when they are used, see
+# `PluginRegistry`. Other modules not needed by every command are imported
+# where they are used.
 
 # Pattern for parsing argument-defined variables for writers
 VARIABLE_PATTERN = r"(\w+)(=.*)?"
 
-parser = argparse.ArgumentParser(description='Process some integers.')
-parser.add_argument('model',
-                    help='Model source')
 
-parser.add_argument('entities', nargs='*',
-                    help='Entities to be included')
+def memory_size(text: str) -> int:
+    """Parse memory size argument `text`, see `memory.parse_size()`."""
 
-parser.add_argument('-b', '--block', dest='block_type', 
-                    help="Block type the writer writes")
+    from .memory import parse_size
+    try:
+        return parse_size(text)
+    except ConfigError as e:
+        raise argparse.ArgumentTypeError(str(e))
 
-parser.add_argument('-f', '--from', dest='reader', 
-                    default="csv",
-                    help="Metamodel input format")
 
-parser.add_argument('-t', '--to', dest='writer', 
-                    default="python",
-                    help="Text output format")
+def create_parser(parser_class: Type[argparse.ArgumentParser]
+                      =argparse.ArgumentParser) -> argparse.ArgumentParser:
+    """Create parser of the command line arguments. `parser_class` might be
+    used to change how errors are reported."""
 
-parser.add_argument('-V', '--variable', dest='variables', 
-                    action="append",
-                    help="Text output format")
+    parser = parser_class(description='Process some integers.')
+    parser.add_argument('model',
+                        help='Model source')
+
+    parser.add_argument('-m', '--model', dest='models', metavar='MODEL',
+                        action="append", default=[],
+                        help="Additional model source, merged with the "
+                             "model. Sources are read concurrently with "
+                             "--workers")
+
+    parser.add_argument('entities', nargs='*',
+                        help='Entities to be included')
+
+    parser.add_argument('-b', '--block', dest='block_type', 
+                        help="Block type the writer writes")
+
+    parser.add_argument('-f', '--from', dest='reader', 
+                        default="csv",
+                        help="Metamodel input format")
+
+    parser.add_argument('-t', '--to', dest='writer', 
+                        default="python",
+                        help="Text output format")
+
+    parser.add_argument('-V', '--variable', dest='variables', 
+                        action="append",
+                        help="Text output format")
+
+    parser.add_argument('-o', '--output', dest='output',
+                        help="Output file, default is standard output")
+
+    parser.add_argument('-O', '--output-dir', dest='output_dir',
+                        help="Write one file per entity into a directory. "
+                             "Only files with changed content are rewritten")
+
+    parser.add_argument('-d', '--dependencies', dest='dependencies',
+                        action="store_true",
+                        help="Include entities the listed entities depend "
+                             "on and write all of them in dependency order")
+
+    parser.add_argument('--jobs', dest='jobs', metavar='JOBS_FILE',
+                        help="Run all jobs from a TOML or JSON job file with "
+                             "the model read once")
+
+    parser.add_argument('--watch', dest='watch', action="store_true",
+                        help="Keep running and regenerate the output when "
+                             "the model files change")
+
+    parser.add_argument('--cache-dir', dest='cache_dir',
+                        help="Directory of cached models, default is "
+                             "~/.cache/entigen")
+
+    parser.add_argument('--no-cache', dest='use_cache',
+                        action="store_false", default=True,
+                        help="Do not use or store cached models")
+
+    parser.add_argument('--workers', dest='workers', type=int,
+                        help="Number of worker processes reading the "
+                             "sources and creating blocks of large models, "
+                             "default is 1 – no worker processes")
+
+    parser.add_argument('--profile', dest='profile', action="store_true",
+                        help="Print time spent in the generation phases and "
+                             "the slowest entities to standard error output")
+
+    parser.add_argument('--memory-report', dest='memory_report',
+                        action="store_true",
+                        help="Print memory used after loading the model, "
+                             "creating blocks and rendering to standard "
+                             "error output")
+
+    parser.add_argument('--max-memory', dest='max_memory', metavar='SIZE',
+                        type=memory_size,
+                        help="Memory limit, for example 512M or 2G. Output "
+                             "exceeding the limit is written in the "
+                             "low-memory mode, if possible. With --pipeline "
+                             "the generation fails instead")
+
+    parser.add_argument('--pipeline', dest='pipeline', action="store_true",
+                        help="Create, render and write the output "
+                             "concurrently, keeping only a few entity "
+                             "blocks in memory")
+
+    parser.add_argument('--diff', dest='diff', metavar='OTHER',
+                        help="Write changes of the model since model OTHER "
+                             "as JSON instead of generating the output")
+
+    parser.add_argument('--connect', dest='connect', metavar='SOCKET',
+                        help="Send the request to an entigen server "
+                             "listening on a Unix socket SOCKET")
+
+    return parser
+
+
+parser = create_parser()
 
 
 def parse_variables(vars: Optional[List[str]]) -> Dict[str,str]:
@@ -71,20 +166,111 @@ def parse_variables(vars: Optional[List[str]]) -> Dict[str,str]:
 
 def main() -> None:
 
+    if sys.argv[1:2] == ["serve"]:
+        # Imported here, the server is not needed by other commands
+        from .server import serve_main
+        serve_main(sys.argv[2:])
+        return
+
     args = parser.parse_args()
 
+    if args.connect:
+        from .server import request
+        status = request(args.connect, sys.argv[1:], os.getcwd())
+        if status:
+            sys.exit(status)
+        return
+
+    try:
+        generate(args)
+    except MemoryLimitError as e:
+        sys.exit("entigen: {}".format(e))
+
+
+def generate(args: argparse.Namespace) -> None:
+    """Read the model and write the output requested by the command line
+    arguments `args`."""
+
     variables = parse_variables(args.variables)
 
-    model = Model()
-    reader = Extensible.readers[args.reader](model=model)
+    cache = ModelCache(args.cache_dir) if args.use_cache else None
+
+    # Worker processes are used only when requested
+    workers = args.workers or 1
+    sources = [args.model] + args.models
+
+    if args.profile:
+        # Measurements are collected only in this process
+        instrument.enable()
+        workers = 1
+
+    if args.memory_report:
+        from .memory import MemoryReport
+        memory_report = MemoryReport()
+        memory_report.start()
+        workers = 1
+
+    if args.max_memory:
+        from .memory import MemoryGuard
+        guard = MemoryGuard(args.max_memory)
+        guard.start()
+        # Memory is checked only in this process
+        workers = 1
+
+    if args.watch:
+        from .watch import ModelWatcher, watch
+        watcher = ModelWatcher(args.reader, sources, variables=variables,
+                               cache=cache)
+        model = watcher.model
+    else:
+        # Only the listed entities are needed by a single job
+        entities = None if args.jobs or args.diff else args.entities
+        model = read_models(args.reader, sources, variables=variables,
+                            cache=cache, workers=workers, entities=entities)
+
+    if args.diff:
+        from .diff import write_change_set
+        other = read_models(args.reader, [args.diff], variables=variables,
+                            cache=cache, workers=1)
+        if args.output:
+            with open(args.output, "w") as f:
+                write_change_set(other, model, f)
+        else:
+            write_change_set(other, model, sys.stdout)
+        return
+
+    if args.jobs:
+        jobs = load_jobs(args.jobs)
+    else:
+        jobs = [Job(writer=args.writer,
+                    block_type=args.block_type,
+                    entities=args.entities,
+                    variables={},
+                    output=args.output,
+                    output_dir=args.output_dir)]
+
+    if args.dependencies:
+        from .graph import with_dependencies
+        jobs = with_dependencies(model, jobs)
 
-    reader.read_model(args.model)
+    if args.pipeline:
+        from .pipeline import run_pipeline
+        run_pipeline(model, jobs, variables=variables)
+    elif args.max_memory:
+        from .memory import run_jobs_within_limit
+        run_jobs_within_limit(model, jobs, guard, sys.stderr,
+                              variables=variables, workers=workers)
+    else:
+        run_jobs(model, jobs, variables=variables, workers=workers)
 
-    writer_factory = Extensible.writers[args.writer]
-    writer = writer_factory(model=model, variables=variables)
+    if args.profile:
+        instrument.report(sys.stderr)
 
-    # If no block type is specified then default is used
-    block_type = args.block_type or writer.block_types[0]
-    block = writer.create_block(block_type, args.entities)
+    if args.memory_report:
+        memory_report.write(sys.stderr)
 
-    print(block)
+    if args.watch:
+        try:
+            watch(watcher, jobs, variables=variables, workers=workers)
+        except KeyboardInterrupt:
+            pass
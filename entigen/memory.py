@@ -0,0 +1,187 @@
+"""Memory reporting and the memory limit of the generation.
+
+Both use the instrumentation events, see `instrument.subscribe()`: memory is
+measured when a phase – reading of the model, creation of a block or
+rendering – ends.
+"""
+
+import gc
+import os
+import re
+import sys
+import tracemalloc
+
+from typing import Any, List, Optional, TextIO, Tuple
+
+from . import instrument
+from .errors import ConfigError, MemoryLimitError
+from .jobs import Job, run_jobs
+from .model import Model
+
+
+PHASES = {
+    "read_models": "load",
+    "create_block": "build",
+    "render": "render",
+}
+"""Names of the reported phases by name of the instrumentation timer."""
+
+SIZE_PATTERN = r"(\d+(?:\.\d+)?)\s*([KMG]?)B?$"
+SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+MB = 1 << 20
+
+
+def parse_size(text: str) -> int:
+    """Convert size such as ``512M`` or ``2G`` to number of bytes. Units are
+    powers of 1024."""
+    match = re.match(SIZE_PATTERN, text.strip().upper())
+    if not match:
+        raise ConfigError("Invalid size '{}'".format(text))
+
+    number, unit = match.groups()
+    return int(float(number) * SIZE_UNITS[unit])
+
+
+def current_rss() -> Optional[int]:
+    """Return resident set size of the process in bytes. If the current size
+    is not available then the peak size is returned. Returns `None` if
+    neither is available on the platform."""
+
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MemoryReport:
+    """Memory allocated by Python at the end of each phase and the peak
+    during the phase, measured by `tracemalloc`. Tracing slows down the
+    generation."""
+
+    # Phase, current size, peak size
+    phases: List[Tuple[str, int, int]]
+
+    def __init__(self) -> None:
+        self.phases = []
+
+    def start(self) -> None:
+        tracemalloc.start()
+        instrument.subscribe(self._event)
+
+    def stop(self) -> None:
+        instrument.unsubscribe(self._event)
+        tracemalloc.stop()
+
+    def _event(self, event: instrument.Event) -> None:
+        if event.kind != "timer" or event.name not in PHASES:
+            return
+
+        current, peak = tracemalloc.get_traced_memory()
+        self.phases.append((PHASES[event.name], current, peak))
+
+        # Peak of the next phase, available since Python 3.9
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+
+    def write(self, stream: TextIO) -> None:
+        """Write the report into `stream`."""
+        stream.write("{:16} {:>14} {:>14}\n".format("Phase", "Retained (MB)",
+                                                   "Peak (MB)"))
+        for phase, current, peak in self.phases:
+            stream.write("{:16} {:14.1f} {:14.1f}\n"
+                         .format(phase, current / MB, peak / MB))
+
+        rss = current_rss()
+        if rss is not None:
+            stream.write("Resident set size: {:.1f} MB\n".format(rss / MB))
+
+
+class MemoryGuard:
+    """Raises `MemoryLimitError` when the resident set size of the process
+    exceeds `limit` bytes after loading the model, after creating a block
+    or a block of an entity. Rendering is not checked – rendered lines are
+    not kept in memory and the output is already written when rendering
+    ends."""
+
+    limit: int
+
+    def __init__(self, limit: int) -> None:
+        if current_rss() is None:
+            raise ConfigError("Memory limit is not supported on this "
+                              "platform")
+        self.limit = limit
+
+    def start(self) -> None:
+        instrument.subscribe(self._event)
+
+    def stop(self) -> None:
+        instrument.unsubscribe(self._event)
+
+    def check(self, phase: str) -> None:
+        """Raise `MemoryLimitError` if the memory limit is exceeded in
+        `phase`."""
+        rss = current_rss()
+        if rss is not None and rss > self.limit:
+            raise MemoryLimitError("Memory limit of {:.1f} MB exceeded "
+                                   "while {}: {:.1f} MB used"
+                                   .format(self.limit / MB, phase,
+                                           rss / MB))
+
+    def _event(self, event: instrument.Event) -> None:
+        if event.kind != "timer":
+            return
+
+        if event.name == "read_models":
+            self.check("loading the model")
+        elif event.name == "create_block":
+            self.check("creating blocks")
+        elif event.detail is not None:
+            self.check("creating block of '{}'".format(event.detail))
+
+
+def run_jobs_within_limit(model: Model, jobs: List[Job], guard: MemoryGuard,
+                          log: TextIO, **kwargs: Any) -> None:
+    """Run `jobs` like `run_jobs()` with the started `guard`. A job which
+    exceeds the memory limit is run again in the streaming mode, which is
+    reported to `log`.
+
+    The guard is stopped during the streaming run: memory freed by the
+    aborted run is usually not returned to the operating system, so the
+    resident size stays at the limit although the memory is reused, and the
+    streaming mode keeps only a block of a single entity at a time."""
+
+    caches = kwargs.pop("caches", None)
+    if caches is None:
+        caches = {}
+
+    for job in jobs:
+        try:
+            run_jobs(model, [job], caches=caches, **kwargs)
+        except MemoryLimitError as e:
+            message = str(e)
+        else:
+            continue
+
+        # Partially created blocks are referenced by the traceback until the
+        # exception is handled
+        gc.collect()
+        log.write("{}. Writing the output in the low-memory mode.\n"
+                  .format(message))
+
+        guard.stop()
+        try:
+            run_jobs(model, [job], caches=caches, streaming=True, **kwargs)
+        finally:
+            guard.start()
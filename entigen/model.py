@@ -2,14 +2,33 @@
 Metamodel Entities
 """
 
-from typing import List, Optional
-from .errors import MetadataError
+import hashlib
+import sys
+
+from array import array
+from typing import (TYPE_CHECKING, Dict, Iterable, Iterator, List,
+                    Optional, Sequence, Union, overload)
+from .errors import MetadataError, NoSuchObjectError
 from .types import Type
 
+if TYPE_CHECKING:
+    from .diff import ModelDiff
+
+
+DIGEST_SIZE = 16
+"""Size of the content hashes in bytes."""
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE).digest()
+
 
 class Property:
     """Property of an entity"""
 
+    __slots__ = ("name", "tag", "raw_type", "type", "label", "desc",
+                 "default", "is_optional")
+
     name: str
     """Property identifier""" 
 
@@ -36,9 +55,9 @@ class Property:
 
     def __init__(self, name: str, tag: int, raw_type: str, label: str,
             desc: str, default: Optional[str], is_optional: bool) -> None:
-        self.name = name
+        self.name = sys.intern(name)
         self.tag = tag
-        self.raw_type = raw_type
+        self.raw_type = sys.intern(raw_type)
         # TODO: convert raw_type into type
         self.type = Type.from_string(raw_type)
         self.label = label
@@ -46,84 +65,354 @@ class Property:
         self.default = default
         self.is_optional = is_optional
 
+    def digest(self) -> bytes:
+        """Return hash of the property content."""
+        return _digest(repr((self.name, self.tag, self.raw_type, self.label,
+                             self.desc, self.default, self.is_optional))
+                       .encode())
+
+
+# Codes of `Property.is_optional` in `PropertyTable`
+_OPTIONAL_CODES = {False: 0, True: 1, None: 2}
+_OPTIONAL_VALUES = [False, True, None]
+
+
+class PropertyTable:
+    """Properties of many entities stored by columns – one list or array
+    per property attribute – instead of one object per property. Strings
+    are interned and the types are shared, so a property takes a few
+    pointers. Properties of an entity are a contiguous range of rows,
+    see `view()`."""
+
+    names: List[str]
+    tags: "array[int]"
+    raw_types: List[str]
+    types: List[Type]
+    labels: List[str]
+    descs: List[str]
+    defaults: List[Optional[str]]
+    optional: bytearray
+
+    def __init__(self) -> None:
+        self.names = []
+        self.tags = array("q")
+        self.raw_types = []
+        self.types = []
+        self.labels = []
+        self.descs = []
+        self.defaults = []
+        self.optional = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def append(self, prop: Property) -> None:
+        """Append row with the attributes of `prop`."""
+        self.names.append(prop.name)
+        self.tags.append(prop.tag)
+        self.raw_types.append(prop.raw_type)
+        self.types.append(prop.type)
+        self.labels.append(sys.intern(prop.label))
+        self.descs.append(prop.desc)
+        self.defaults.append(prop.default)
+        self.optional.append(_OPTIONAL_CODES[prop.is_optional])
+
+    def extend(self, props: Iterable[Property]) -> "PropertyView":
+        """Append rows of `props` and return view of the appended rows."""
+        start = len(self.names)
+        for prop in props:
+            self.append(prop)
+        return PropertyView(self, start, len(self.names))
+
+    def row(self, index: int) -> Property:
+        """Return property at row `index`. A new object is created on every
+        call."""
+        prop = Property.__new__(Property)
+        prop.name = self.names[index]
+        prop.tag = self.tags[index]
+        prop.raw_type = self.raw_types[index]
+        prop.type = self.types[index]
+        prop.label = self.labels[index]
+        prop.desc = self.descs[index]
+        prop.default = self.defaults[index]
+        prop.is_optional = _OPTIONAL_VALUES[self.optional[index]]
+        return prop
+
+    def view(self, start: int, stop: int) -> "PropertyView":
+        """Return read-only sequence of properties in rows from `start` to
+        `stop`."""
+        return PropertyView(self, start, stop)
+
+
+class PropertyView(Sequence[Property]):
+    """Read-only sequence of properties in a range of rows of a
+    `PropertyTable`. Property objects are created when they are
+    accessed."""
+
+    __slots__ = ("table", "start", "stop")
+
+    table: PropertyTable
+    start: int
+    stop: int
+
+    def __init__(self, table: PropertyTable, start: int, stop: int) -> None:
+        self.table = table
+        self.start = start
+        self.stop = stop
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    @overload
+    def __getitem__(self, index: int) -> Property: ...
+    @overload
+    def __getitem__(self, index: slice) -> List[Property]: ...
+
+    def __getitem__(self, index: Union[int, slice]) \
+            -> Union[Property, List[Property]]:
+        if isinstance(index, slice):
+            return [self.table.row(i)
+                    for i in range(self.start, self.stop)[index]]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Property index out of range")
+
+        return self.table.row(self.start + index)
+
+    def __iter__(self) -> Iterator[Property]:
+        row = self.table.row
+        for index in range(self.start, self.stop):
+            yield row(index)
+
+    def __add__(self, other: Sequence[Property]) -> List[Property]:
+        return list(self) + list(other)
+
+    def __repr__(self) -> str:
+        return "PropertyView({}..{})".format(self.start, self.stop)
+
 
 class Entity:
+    __slots__ = ("name", "_properties", "_digest")
+
     name: str
-    properties: List[Property]
 
-    def __init__(self, name: str, properties: List[Property]) -> None:
-        self.name = name
+    _properties: Sequence[Property]
+    _digest: Optional[bytes]
+
+    def __init__(self, name: str, properties: Sequence[Property]) -> None:
+        self.name = sys.intern(name)
         self.properties = properties
 
+    @property
+    def properties(self) -> Sequence[Property]:
+        """List of properties, or a view of properties in a `PropertyTable`
+        in a compact model. Assign the properties again after changing the
+        list in place, so the digest is computed again."""
+        return self._properties
+
+    @properties.setter
+    def properties(self, properties: Sequence[Property]) -> None:
+        self._properties = properties
+        self._digest = None
+
+    def digest(self) -> bytes:
+        """Return hash of the properties – of their hashes, in the order of
+        the properties. The hash is computed once."""
+        if self._digest is None:
+            self._digest = _digest(b"".join(prop.digest()
+                                            for prop in self._properties))
+        return self._digest
+
 
 class EnumValue:
+    __slots__ = ("key", "value", "label", "desc")
+
     key: str
     value: int
     label: str
     desc: str
 
     def __init__(self, key: str, value: int, label: str, desc: str) -> None:
-        self.key = key
+        self.key = sys.intern(key)
         self.value = value
         self.label = label
         self.desc = desc
 
+    def digest(self) -> bytes:
+        """Return hash of the enum value content."""
+        return _digest(repr((self.key, self.value, self.label, self.desc))
+                       .encode())
+
 
 class Enumeration:
+    __slots__ = ("name", "_values", "_digest")
+
     name: str
-    values: List[EnumValue]
+
+    _values: List[EnumValue]
+    _digest: Optional[bytes]
 
     def __init__(self, name: str, values: List[EnumValue]) -> None:
-        self.name = name
+        self.name = sys.intern(name)
         self.values = values
 
+    @property
+    def values(self) -> List[EnumValue]:
+        """Values of the enumeration. Assign the values again after changing
+        the list in place, so the digest is computed again."""
+        return self._values
+
+    @values.setter
+    def values(self, values: List[EnumValue]) -> None:
+        self._values = values
+        self._digest = None
+
+    def digest(self) -> bytes:
+        """Return hash of the values – of their hashes, in the order of the
+        values. The hash is computed once."""
+        if self._digest is None:
+            self._digest = _digest(b"".join(value.digest()
+                                            for value in self._values))
+        return self._digest
+
+
+Symbol = Union[Entity, Enumeration]
+
 
 class Model:
-    """Metamodel container – contains entities and other model elements."""
+    """Metamodel container – contains entities and other model elements.
+
+    Entities and enumerations are indexed by name. Use the `add_*` and
+    `remove_*` methods to keep the indexes in sync with the `entities` and
+    `enums` lists."""
     entities: List[Entity]
     enums: List[Enumeration]
 
+    _entity_index: Dict[str, Entity]
+    _enum_index: Dict[str, Enumeration]
+    _symbols: Dict[str, Symbol]
+
     def __init__(self) -> None:
         """Create an empty metamodel"""
         self.entities = []
         self.enums = []
+        self._entity_index = {}
+        self._enum_index = {}
+        self._symbols = {}
 
     def add_entity(self, entity: Entity) -> None:
         """Add entity `entity` to the model. If entity with given name already
         exists an exception is raised."""
-        if entity.name in self.entity_names:
+        if entity.name in self._entity_index:
             raise MetadataError("Entity '{}' already exists."
                                 .format(entity.name))
         self.entities.append(entity)
+        self._entity_index[entity.name] = entity
+        # Entities take precedence over enums of the same name
+        self._symbols[entity.name] = entity
 
     def add_enum(self, enum: Enumeration) -> None:
         """Add enum to the model. If enum with given name already
         exists an exception is raised."""
-        if enum.name in self.enum_names:
+        if enum.name in self._enum_index:
             raise MetadataError("Enum '{}' already exists."
                                 .format(enum.name))
         self.enums.append(enum)
+        self._enum_index[enum.name] = enum
+        self._symbols.setdefault(enum.name, enum)
+
+    def merge(self, other: "Model") -> None:
+        """Add all entities and enums of `other` model. Raises
+        `MetadataError` if an entity or an enum already exists."""
+        for entity in other.entities:
+            self.add_entity(entity)
+        for enum in other.enums:
+            self.add_enum(enum)
+
+    def digest(self) -> bytes:
+        """Return hash of the model – of names and hashes of the entities
+        and the enums, in the model order."""
+        parts: List[bytes] = []
+        for entity in self.entities:
+            parts += [b"E", entity.name.encode(), b"\0", entity.digest()]
+        for enum in self.enums:
+            parts += [b"N", enum.name.encode(), b"\0", enum.digest()]
+        return _digest(b"".join(parts))
+
+    def diff(self, other: "Model") -> "ModelDiff":
+        """Return changes from this model to the `other` model. Only entities
+        and enums with different hashes are compared in detail."""
+        # Imported here, the module depends on this one
+        from .diff import diff_models
+        return diff_models(self, other)
+
+    def compact(self) -> None:
+        """Store properties of all entities in a single `PropertyTable`.
+        `Entity.properties` become read-only views of the table."""
+        table = PropertyTable()
+        for entity in self.entities:
+            entity.properties = table.extend(entity.properties)
+
+    def remove_entity(self, name: str) -> Entity:
+        """Remove entity `name` from the model and return it."""
+        entity = self.entity(name)
+        self.entities.remove(entity)
+        del self._entity_index[name]
+
+        if name in self._enum_index:
+            self._symbols[name] = self._enum_index[name]
+        else:
+            del self._symbols[name]
+
+        return entity
+
+    def remove_enum(self, name: str) -> Enumeration:
+        """Remove enum `name` from the model and return it."""
+        enum = self.enum(name)
+        self.enums.remove(enum)
+        del self._enum_index[name]
+
+        if self._symbols[name] is enum:
+            del self._symbols[name]
+
+        return enum
 
     def entity(self, name: str) -> Entity:
-        return [ent for ent in self.entities if ent.name == name][0]
+        try:
+            return self._entity_index[name]
+        except KeyError:
+            raise NoSuchObjectError("Unknown entity '{}'".format(name))
 
     def enum(self, name: str) -> Enumeration:
-        return [enum for enum in self.enums if enum.name == name][0]
+        try:
+            return self._enum_index[name]
+        except KeyError:
+            raise NoSuchObjectError("Unknown enum '{}'".format(name))
+
+    def symbol(self, name: str) -> Symbol:
+        """Return entity or enumeration named `name`. Entity is returned if
+        there are both."""
+        try:
+            return self._symbols[name]
+        except KeyError:
+            raise NoSuchObjectError("Unknown symbol '{}'".format(name))
 
     @property
     def entity_names(self) -> List[str]:
         """Return list of names of all entities in the model"""
-        return [ent.name for ent in self.entities]
+        return list(self._entity_index)
 
     @property
     def enum_names(self) -> List[str]:
         """Return list of names of all enumerations in the model"""
-        return [enum.name for enum in self.enums]
+        return list(self._enum_index)
 
     def is_entity(self, symbol: str) -> bool:
         """Return `true` if the symbol is an entity"""
-        return symbol in self.entity_names
+        return symbol in self._entity_index
 
     def is_enum(self, symbol: str) -> bool:
         """Return `true` if the symbol is an entity"""
-        return symbol in self.enum_names
+        return symbol in self._enum_index
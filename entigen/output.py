@@ -0,0 +1,160 @@
+"""Multi-file output into a directory."""
+
+import hashlib
+import io
+import json
+import os
+import os.path
+import tempfile
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .block import Block
+
+MANIFEST_FILE = ".entigen-manifest.json"
+"""Name of the file with hashes of the generated files."""
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class OutputDirectory:
+    """Directory with generated files. Files are rewritten only when their
+    content changes, so their modification times reflect real changes.
+
+    The directory contains a manifest with the content hash, size and
+    modification time of every generated file. A file which has the same
+    size and modification time as recorded is considered unchanged without
+    reading it."""
+
+    path: str
+    # File name -> (content hash, size, modification time in nanoseconds)
+    manifest: Dict[str, Tuple[str, int, int]]
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.manifest = {}
+
+        try:
+            with open(os.path.join(path, MANIFEST_FILE)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        self.manifest = {name: tuple(entry)  # type: ignore
+                         for name, entry in data.get("files", {}).items()}
+
+    def _current_digest(self, name: str) -> Optional[str]:
+        """Return content hash of existing file `name` or `None` if the file
+        does not exist."""
+
+        filename = os.path.join(self.path, name)
+
+        try:
+            stat = os.stat(filename)
+        except FileNotFoundError:
+            return None
+
+        entry = self.manifest.get(name)
+        if entry and entry[1:] == (stat.st_size, stat.st_mtime_ns):
+            return entry[0]
+
+        with open(filename, "rb") as f:
+            return _digest(f.read())
+
+    def write(self, name: str, block: Block) -> bool:
+        """Write `block` into file `name` relative to the directory if the
+        file content is different. The file is replaced atomically. Returns
+        `True` if the file was written."""
+
+        stream = io.StringIO()
+        block.write(stream)
+        return self.write_data(name, stream.getvalue().encode("utf-8"))
+
+    def write_data(self, name: str, data: bytes) -> bool:
+        """Write rendered content `data` into file `name`, see `write()`."""
+
+        digest = _digest(data)
+
+        filename = os.path.join(self.path, name)
+
+        if self._current_digest(name) == digest:
+            # Refresh the entry, the file might have been touched
+            stat = os.stat(filename)
+            self.manifest[name] = (digest, stat.st_size, stat.st_mtime_ns)
+            return False
+
+        _write_atomic(filename, data)
+
+        stat = os.stat(filename)
+        self.manifest[name] = (digest, stat.st_size, stat.st_mtime_ns)
+
+        return True
+
+    def update(self, files: Iterable[Tuple[str, Block]],
+               remove_stale: bool=True) -> Tuple[List[str], List[str]]:
+        """Write `files` – pairs of file name and content. Files generated
+        before but not present in `files` are removed if `remove_stale` is
+        true. The manifest is saved. Returns a tuple of lists of written and
+        removed files."""
+
+        written: List[str] = []
+        generated: Set[str] = set()
+
+        os.makedirs(self.path, exist_ok=True)
+
+        for name, block in files:
+            generated.add(name)
+            if self.write(name, block):
+                written.append(name)
+
+        removed = self.finish(generated, remove_stale=remove_stale)
+
+        return (written, removed)
+
+    def finish(self, generated: Set[str],
+               remove_stale: bool=True) -> List[str]:
+        """Remove files generated before but not in `generated`, if
+        `remove_stale` is true, and save the manifest. Returns list of
+        removed files."""
+
+        removed: List[str] = []
+        if remove_stale:
+            for name in sorted(set(self.manifest) - generated):
+                try:
+                    os.unlink(os.path.join(self.path, name))
+                except FileNotFoundError:
+                    pass
+                del self.manifest[name]
+                removed.append(name)
+
+        self.save_manifest()
+
+        return removed
+
+    def save_manifest(self) -> None:
+        """Write the manifest into the directory."""
+        data = {"files": {name: list(entry)
+                          for name, entry in sorted(self.manifest.items())}}
+        text = json.dumps(data, indent=1, sort_keys=True) + "\n"
+        _write_atomic(os.path.join(self.path, MANIFEST_FILE),
+                      text.encode("utf-8"))
+
+
+def _write_atomic(filename: str, data: bytes) -> None:
+    """Write `data` into a temporary file next to `filename` and then
+    replace `filename` with it."""
+
+    directory = os.path.dirname(filename) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    fd, temp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(temp, 0o644)
+        os.replace(temp, filename)
+    except BaseException:
+        os.unlink(temp)
+        raise
@@ -0,0 +1,191 @@
+"""Concurrent processing of models using a pool of worker processes."""
+
+import os
+import pickle
+
+from typing import Dict, Iterator, List, Optional, Set
+
+from .model import Model, Entity
+from .cache import ModelCache
+from .extensible import Extensible, Writer
+from .types import BASE_TYPES, COMPOSITE_TYPES, type_names
+from .utils import paused_gc
+from . import instrument
+
+
+PARALLEL_MIN_ENTITIES = 100
+"""Minimal number of entities for which the blocks are created in parallel.
+For less entities the cost of starting workers exceeds the gain."""
+
+MAX_CHUNK_SIZE = 64
+"""Maximal number of entities sent to a worker at once."""
+
+# Writer of the worker process
+_worker_writer: Optional[Writer] = None
+
+
+def _read_source(reader_name: str, source: str, variables: Dict[str,str],
+                 cache_dir: Optional[str], use_cache: bool) -> Model:
+    """Read model from `source`."""
+    if use_cache:
+        return ModelCache(cache_dir).read(reader_name, source, variables)
+
+    reader = Extensible.readers[reader_name](model=Model(),
+                                             variables=variables)
+    reader.read_model(source)
+    return reader.model
+
+
+def _read_pickled_source(reader_name: str, source: str,
+                         variables: Dict[str,str], cache_dir: Optional[str],
+                         use_cache: bool) -> bytes:
+    """Read model from `source` and return it pickled. Executed in a worker
+    process. The model is pickled explicitly so it can be unpickled with the
+    garbage collector paused."""
+    model = _read_source(reader_name, source, variables, cache_dir,
+                         use_cache)
+    return pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _read_selected(reader_name: str, sources: List[str],
+                   variables: Dict[str,str], names: List[str]) -> Model:
+    """Read entities `names` and the entities and enums they refer to from
+    `sources`. Each source is asked again for entities referred to by
+    entities of the other sources. Raises `MetadataError` if an entity or
+    an enum is defined in more than one source, the same as
+    `Model.merge()`."""
+
+    reader_class = Extensible.readers[reader_name]
+    model = Model()
+    # Index of the source of each read entity and enum
+    origins: Dict[str, int] = {}
+    requested: Set[str] = set()
+    missing = list(names)
+
+    while missing:
+        requested.update(missing)
+
+        for i, source in enumerate(sources):
+            reader = reader_class(model=Model(), variables=variables)
+            reader.read_entities(source, missing)
+
+            # A source returns objects it returned before for other
+            # requested entities, those are merged once
+            new = Model()
+            for entity in reader.model.entities:
+                if origins.get("entity:" + entity.name) != i:
+                    origins["entity:" + entity.name] = i
+                    new.add_entity(entity)
+            for enum in reader.model.enums:
+                if origins.get("enum:" + enum.name) != i:
+                    origins["enum:" + enum.name] = i
+                    new.add_enum(enum)
+
+            model.merge(new)
+
+        # Every referenced entity is requested from all the sources, even
+        # if it was read already, so duplicates are found
+        missing = sorted(set(name for entity in model.entities
+                             for prop in entity.properties
+                             for name in type_names(prop.type)
+                             if name not in requested
+                             and name not in BASE_TYPES
+                             and name not in COMPOSITE_TYPES
+                             and not model.is_enum(name)))
+
+    return model
+
+
+@instrument.timed("read_models")
+def read_models(reader_name: str, sources: List[str],
+                variables: Optional[Dict[str,str]]=None,
+                cache: Optional[ModelCache]=None,
+                workers: Optional[int]=None,
+                entities: Optional[List[str]]=None) -> Model:
+    """Read models from `sources` and merge them into one model. Sources are
+    read concurrently by at most `workers` processes, by default one process
+    per source up to the number of CPUs. If `cache` is specified, then the
+    models are read through the cache.
+
+    Models are merged in the order of `sources`, regardless of the order in
+    which they were read. Raises `MetadataError` if an entity or an enum is
+    defined in more than one source.
+
+    If `entities` are specified and the reader is selective, see
+    `Reader.selective`, then only those entities, the entities they refer
+    to and all enums are read, without the cache."""
+
+    variables = variables or {}
+
+    if entities and Extensible.readers[reader_name].selective:
+        return _read_selected(reader_name, sources, variables, entities)
+    cache_dir = cache.path if cache else None
+    workers = min(workers or os.cpu_count() or 1, len(sources))
+
+    if workers <= 1:
+        models = [_read_source(reader_name, source, variables, cache_dir,
+                               cache is not None)
+                  for source in sources]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_read_pickled_source, reader_name,
+                                       source, variables, cache_dir,
+                                       cache is not None)
+                       for source in sources]
+            models = []
+            for future in futures:
+                data = future.result()
+                with paused_gc():
+                    models.append(pickle.loads(data))
+
+    model = Model()
+    for source_model in models:
+        model.merge(source_model)
+
+    return model
+
+
+def _init_worker(writer_data: bytes) -> None:
+    """Initialize worker process with pickled writer."""
+    global _worker_writer
+
+    with paused_gc():
+        _worker_writer = pickle.loads(writer_data)
+
+
+def _render_chunk(method: str, names: List[str]) -> List[List[str]]:
+    """Render blocks created by writer method `method` for entities `names`.
+    Executed in a worker process."""
+    assert _worker_writer is not None
+
+    writer = _worker_writer
+    create = getattr(writer, method)
+
+    return [list(create(writer.model.entity(name)).lines(memoize=False))
+            for name in names]
+
+
+def render_entities(writer: Writer, method: str, entities: List[Entity],
+                    workers: int) -> Iterator[List[str]]:
+    """Iterate over rendered lines of blocks created by `writer` method
+    `method` for each entity in `entities`. The writer, including its model,
+    is pickled once and sent to `workers` processes. Entities are sent to
+    the workers in chunks and results are returned in the order of
+    `entities`."""
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    writer_data = pickle.dumps(writer, protocol=pickle.HIGHEST_PROTOCOL)
+
+    names = [entity.name for entity in entities]
+    size = max(1, min(MAX_CHUNK_SIZE, len(names) // (workers * 4)))
+    chunks = [names[i:i + size] for i in range(0, len(names), size)]
+
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_worker,
+                             initargs=(writer_data,)) as executor:
+        for rendered in executor.map(_render_chunk,
+                                     [method] * len(chunks), chunks):
+            yield from rendered
@@ -0,0 +1,234 @@
+"""
+Pipelined generation – blocks are created, rendered and written
+concurrently.
+
+Output of a job is produced by three stages connected by bounded queues:
+
+* the writer creates the output one entity block at a time, see
+  `Writer.iter_blocks()` and `Writer.create_files()`,
+* the renderer renders the blocks into chunks of text,
+* the sink writes the text into the output file, the standard output or
+  the output directory.
+
+A stage waits while the queue to the next stage is full, so only a few
+blocks and chunks of text are kept in memory regardless of the model size.
+The writer and the file writes run in threads, writing of the output
+overlaps with creating and rendering of the blocks.
+
+The model itself is read before the pipeline starts: data types of the
+properties might refer to any entity of the model.
+"""
+
+import asyncio
+import functools
+import sys
+import threading
+
+from typing import (Any, Awaitable, Callable, Dict, Iterable, List, Optional,
+                    Set, TextIO, Tuple)
+
+from .jobs import Job, create_writer
+from .model import Model
+from .output import OutputDirectory
+from .extensible import Writer
+from . import instrument
+
+
+QUEUE_SIZE = 8
+"""Default number of items in each queue between the stages."""
+
+CHUNK_LINES = 1000
+"""Maximal number of lines in a chunk of text passed to the sink."""
+
+# Marks the end of items in a queue
+_END = None
+
+# File name – `None` for a single-file output – and the content
+_Item = Tuple[Optional[str], Any]
+
+_Sink = Callable[["asyncio.Queue[Optional[_Item]]"], Awaitable[None]]
+
+
+def _produce(items: Iterable[_Item], queue: "asyncio.Queue[Optional[_Item]]",
+             loop: asyncio.AbstractEventLoop,
+             stopped: threading.Event) -> None:
+    """Put `items` into `queue` of event `loop`, followed by the end mark.
+    Called in a thread other than the thread of the loop, waits while the
+    queue is full. No more items are created once `stopped` is set."""
+
+    def put(item: Optional[_Item]) -> None:
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    try:
+        for item in items:
+            if stopped.is_set():
+                break
+            put(item)
+    finally:
+        put(_END)
+
+
+def _text(lines: List[str]) -> str:
+    return "".join(line + "\n" for line in lines)
+
+
+async def _render(blocks: "asyncio.Queue[Optional[_Item]]",
+                  chunks: "asyncio.Queue[Optional[_Item]]") -> None:
+    """Render blocks from the `blocks` queue into `chunks`. Content of a
+    file of a multi-file output is passed as a single chunk."""
+
+    count = 0
+
+    while True:
+        item = await blocks.get()
+        if item is _END:
+            break
+
+        name, block = item
+        lines: List[str] = []
+
+        for line in block.lines(memoize=False):
+            lines.append(line)
+            if name is None and len(lines) >= CHUNK_LINES:
+                count += len(lines)
+                await chunks.put((name, _text(lines)))
+                lines = []
+
+        count += len(lines)
+        if lines or name is not None:
+            await chunks.put((name, _text(lines)))
+
+    await chunks.put(_END)
+
+    if instrument.enabled:
+        instrument.count("lines", count)
+
+
+async def _drain(queue: "asyncio.Queue[Optional[_Item]]",
+                 producer: "asyncio.Future[None]") -> None:
+    """Discard items of `queue` until the `producer` ends."""
+    while not producer.done():
+        while not queue.empty():
+            queue.get_nowait()
+        await asyncio.wait([producer], timeout=0.01)
+
+    # Only the first error is raised
+    if not producer.cancelled():
+        producer.exception()
+
+
+async def _pipeline(items: Iterable[_Item], sink: _Sink,
+                    queue_size: int) -> None:
+    """Create `items` in a thread, render them and pass the rendered items
+    to `sink`. If any stage fails, the other stages are stopped and the
+    error is raised."""
+
+    loop = asyncio.get_event_loop()
+
+    blocks: "asyncio.Queue[Optional[_Item]]" = asyncio.Queue(queue_size)
+    chunks: "asyncio.Queue[Optional[_Item]]" = asyncio.Queue(queue_size)
+    stopped = threading.Event()
+
+    producer = loop.run_in_executor(None, _produce, items, blocks, loop,
+                                    stopped)
+    tasks = [asyncio.ensure_future(_render(blocks, chunks)),
+             asyncio.ensure_future(sink(chunks))]
+
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        stopped.set()
+        for task in tasks:
+            task.cancel()
+        # The writer might be waiting for space in the queue
+        await _drain(blocks, producer)
+        raise
+
+    # Errors of the writer
+    await producer
+
+
+def _stream_sink(stream: TextIO) -> _Sink:
+    async def sink(chunks: "asyncio.Queue[Optional[_Item]]") -> None:
+        loop = asyncio.get_event_loop()
+        while True:
+            item = await chunks.get()
+            if item is _END:
+                return
+            await loop.run_in_executor(None, stream.write, item[1])
+
+    return sink
+
+
+def _directory_sink(output: OutputDirectory, generated: Set[str]) -> _Sink:
+    async def sink(chunks: "asyncio.Queue[Optional[_Item]]") -> None:
+        loop = asyncio.get_event_loop()
+        while True:
+            item = await chunks.get()
+            if item is _END:
+                return
+            name, text = item
+            generated.add(name)
+            write = functools.partial(output.write_data, name,
+                                      text.encode("utf-8"))
+            await loop.run_in_executor(None, write)
+
+    return sink
+
+
+async def run_pipelined_job(writer: Writer, job: Job, remove_stale: bool=True,
+                            stream: Optional[TextIO]=None,
+                            queue_size: int=QUEUE_SIZE) -> None:
+    """Write output of `job` using `writer` as a pipeline. The output is the
+    same as written by `run_job()`, see the function for `remove_stale` and
+    `stream`. At most `queue_size` blocks and `queue_size` chunks of text
+    are waiting in the queues."""
+
+    if job.output_dir:
+        output = OutputDirectory(job.output_dir)
+        generated: Set[str] = set()
+        await _pipeline(writer.create_files(job.entities),
+                        _directory_sink(output, generated), queue_size)
+        output.finish(generated,
+                      remove_stale=remove_stale and not job.entities)
+        return
+
+    # If no block type is specified then default is used
+    block_type = job.block_type or writer.block_types[0]
+    items = ((None, block)
+             for block in writer.iter_blocks(block_type, job.entities))
+
+    if job.output:
+        with open(job.output, "w") as f:
+            await _pipeline(items, _stream_sink(f), queue_size)
+    else:
+        await _pipeline(items, _stream_sink(stream or sys.stdout),
+                        queue_size)
+
+
+@instrument.timed("run_jobs")
+def run_pipeline(model: Model, jobs: List[Job],
+                 variables: Optional[Dict[str,str]]=None,
+                 remove_stale: bool=True,
+                 stream: Optional[TextIO]=None,
+                 caches: Optional[Dict[str, Dict[str, Any]]]=None,
+                 queue_size: int=QUEUE_SIZE) -> None:
+    """Run `jobs` with `model` like `run_jobs()`, each job as a pipeline.
+    Must not be called from a running event loop.
+
+    Blocks are created in this process: worker processes would be forked
+    from the writer thread while the other threads of the pipeline run."""
+
+    if caches is None:
+        caches = {}
+
+    for job in jobs:
+        writer = create_writer(model, job, variables, 1, caches)
+        # The calling thread might have no event loop
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(
+                run_pipelined_job(writer, job, remove_stale=remove_stale,
+                                  stream=stream, queue_size=queue_size))
+        finally:
+            loop.close()
@@ -0,0 +1,141 @@
+"""
+Model files in archives.
+
+A model source of the file-based readers might be a zip or tar archive,
+optionally compressed, instead of a directory. Model files are at the root
+of the archive or in a single directory of the archive, such as
+``thing.model/properties.csv``. A file in an archive is referred to as if
+the archive was a directory – ``thing.zip/properties.csv``.
+
+Files are decompressed as they are read, nothing is extracted to the disk.
+"""
+
+import io
+import os.path
+import tarfile
+import zipfile
+
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Iterator, Optional, TextIO, Tuple
+
+from ..errors import MetadataError
+
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2",
+                    ".tar.xz")
+
+
+def is_archive(path: str) -> bool:
+    """Return `True` if `path` is an archive file."""
+    return path.lower().endswith(ARCHIVE_SUFFIXES) and os.path.isfile(path)
+
+
+def split_member(filename: str) -> Optional[Tuple[str, str]]:
+    """Return pair of archive path and file name if `filename` refers to a
+    file in an archive, otherwise `None`."""
+    archive, name = os.path.split(filename)
+    if archive and is_archive(archive):
+        return (archive, name)
+    return None
+
+
+def _matches(member: str, name: str) -> bool:
+    """Return `True` if archive member `member` is the model file `name` at
+    the root or in a top-level directory of the archive."""
+    parts = [part for part in member.split("/") if part not in ("", ".")]
+    return parts == [name] or (len(parts) == 2 and parts[1] == name)
+
+
+def _zip_member(archive: zipfile.ZipFile, name: str) -> Optional[str]:
+    matches = [member for member in archive.namelist()
+               if _matches(member, name)]
+    # Files at the root take precedence
+    matches.sort(key=lambda member: member.count("/"))
+    return matches[0] if matches else None
+
+
+class _ReadOnlyStream(io.RawIOBase):
+    """Readable stream of a file in a tar archive read as a stream. Such
+    files can not tell whether they are seekable, which text streams
+    require."""
+
+    def __init__(self, fileobj: BinaryIO) -> None:
+        self.fileobj = fileobj
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        data = self.fileobj.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _tar_members(archive: tarfile.TarFile,
+                 name: str) -> Iterator[tarfile.TarInfo]:
+    """Iterate over regular file members matching `name` in the order of
+    the archive."""
+    for member in archive:
+        if member.isfile() and _matches(member.name, name):
+            yield member
+
+
+def is_file(filename: str) -> bool:
+    """Return `True` if `filename` is a file, or a file in an archive."""
+    split = split_member(filename)
+    if split is None:
+        return os.path.isfile(filename)
+
+    path, name = split
+
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            return _zip_member(archive, name) is not None
+
+    with _open_tar(path) as tar:
+        return next(_tar_members(tar, name), None) is not None
+
+
+def _open_tar(path: str) -> tarfile.TarFile:
+    """Open tar archive `path` for reading as a stream, the archive is
+    decompressed once while it is read."""
+    try:
+        return tarfile.open(path, "r|*")
+    except tarfile.TarError as e:
+        raise MetadataError("Can not read archive '{}': {}".format(path, e))
+
+
+@contextmanager
+def open_text(filename: str) -> Iterator[TextIO]:
+    """Open `filename`, or a file in an archive, for reading as text. Files
+    in archives are expected to be UTF-8 encoded. Raises
+    `FileNotFoundError` if the file does not exist."""
+
+    split = split_member(filename)
+    if split is None:
+        with open(filename) as f:
+            yield f
+        return
+
+    path, name = split
+    not_found = FileNotFoundError("File '{}' not found in archive '{}'"
+                                  .format(name, path))
+
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            member = _zip_member(archive, name)
+            if member is None:
+                raise not_found
+            with archive.open(member) as binary:
+                yield io.TextIOWrapper(binary, encoding="utf-8-sig")
+        return
+
+    with _open_tar(path) as tar:
+        tar_member = next(_tar_members(tar, name), None)
+        if tar_member is None:
+            raise not_found
+        binary = tar.extractfile(tar_member)
+        assert binary is not None
+        with binary:
+            stream = io.BufferedReader(_ReadOnlyStream(binary))
+            yield io.TextIOWrapper(stream, encoding="utf-8-sig")
@@ -3,15 +3,20 @@ CSV File Reader
 """
 
 import csv
+import mmap
+import os
 import os.path
 
 from collections import defaultdict
-from typing import Optional, Iterable, Dict, List
+from typing import (Optional, ContextManager, Iterable, Iterator, Dict, List,
+                    Sequence, Set, Tuple)
 
 from ..errors import MetadataError
-from ..model import Model, Entity, Property, Enumeration, EnumValue
+from ..model import (Model, Entity, Property, PropertyTable, Enumeration,
+                     EnumValue)
 from ..extensible import Reader
-from ..utils import to_bool
+from ..utils import to_bool, paused_gc
+from .archive import is_archive, is_file, open_text, split_member
 
 
 PROPERTIES_FILE = "properties.csv"
@@ -19,129 +24,366 @@ ENTITIES_FILE = "entities.csv"
 ENUMS_FILE = "enums.csv"
 ENUM_VALUES_FILE = "enum_values.csv"
 
+# Columns used to create model objects, in the order of unpacking in the
+# `_*_from_row` methods
+PROPERTY_COLUMNS = ["entity", "name", "type", "optional", "tag", "label",
+                    "description", "default"]
+ENUM_VALUE_COLUMNS = ["enum", "key", "value", "label", "description"]
+
+FAST_CHUNK_SIZE = 1 << 20
+"""Approximate size of a chunk of a memory-mapped file split at once by the
+fast parser."""
+
 
 class CSVReader(Reader, name="csv"):
 
+    variables = [
+        ("fast_csv", "Memory-map the model files and split lines without "
+                     "quotes directly, without the `csv` module"),
+        ("compact_model", "Store properties in a compact table instead of "
+                          "one object per property"),
+        ("pause_gc", "Pause the cyclic garbage collector while the model "
+                     "files are loaded"),
+    ]
+
     model: Model
+    fast: bool
+    compact: bool
+    pause_gc: bool
 
-    def __init__(self, model: Optional[Model]=None) -> None:
+    def __init__(self, model: Optional[Model]=None,
+                 variables: Optional[Dict[str,str]]=None) -> None:
         self.model = model or Model()
 
+        variables = variables or {}
+        self.fast = to_bool(variables.get("fast_csv") or False) or False
+        self.compact = to_bool(variables.get("compact_model") or False) \
+                       or False
+        self.pause_gc = to_bool(variables.get("pause_gc") or False) or False
+
     def read_model(self, path: str) -> None:
         self.read_entities_file(os.path.join(path, ENTITIES_FILE))
         self.read_properties_file(os.path.join(path, PROPERTIES_FILE))
         self.read_enumerations_file(os.path.join(path, ENUMS_FILE))
         self.read_enum_values_file(os.path.join(path, ENUM_VALUES_FILE))
 
+    def reload_model(self, path: str, changed: List[str],
+                     previous: Model) -> None:
+        """Read only the changed files, entities and enums of the other
+        files are taken from the `previous` model. A model in an archive is
+        read whole."""
+
+        if is_archive(path):
+            self.read_model(path)
+            return
+
+        properties_file = os.path.join(path, PROPERTIES_FILE)
+        enum_values_file = os.path.join(path, ENUM_VALUES_FILE)
+
+        if properties_file in changed:
+            self.read_properties_file(properties_file)
+        else:
+            for entity in previous.entities:
+                self.model.add_entity(entity)
+
+        if enum_values_file in changed:
+            self.read_enum_values_file(enum_values_file)
+        else:
+            for enum in previous.enums:
+                self.model.add_enum(enum)
+
+    def source_files(self, path: str) -> Optional[List[str]]:
+        if is_archive(path):
+            return [path]
+        return [os.path.join(path, filename)
+                for filename in (ENTITIES_FILE, PROPERTIES_FILE, ENUMS_FILE,
+                                 ENUM_VALUES_FILE)]
+
     def read_entities_file(self, filename: str) -> None:
         pass
 
     def read_properties_file(self, filename: str) -> None:
-        with open(filename) as f:
-            reader = csv.DictReader(f)
-            self._read_property_rows(reader)
+        # Properties of an entity are usually grouped together, but they
+        # don't have to be
+        added: Dict[str, Entity] = {}
+        table = PropertyTable() if self.compact else None
+
+        with self._loading():
+            entities = self._group_properties(self._property_rows(filename),
+                                              contiguous=False)
+            for entity in entities:
+                if entity.name in added:
+                    # Not contiguous in the table, the entity keeps a list
+                    added[entity.name].properties += entity.properties
+                else:
+                    if table is not None:
+                        entity.properties = table.extend(entity.properties)
+                    self.model.add_entity(entity)
+                    added[entity.name] = entity
+
+    def _loading(self) -> ContextManager[None]:
+        """Context of loading a whole file. The cyclic garbage collector is
+        paused if requested, model objects created from rows do not form
+        reference cycles."""
+        return paused_gc(self.pause_gc)
+
+    def iter_entities(self, path: str) -> Iterator[Entity]:
+        """Iterate over entities of the model in directory `path`. Entities
+        are not added to the model. Each entity is created as soon as the
+        rows of its properties end, therefore properties of an entity have to
+        be on consecutive rows of the properties file."""
+        rows = self._property_rows(os.path.join(path, PROPERTIES_FILE))
+        return self._group_properties(rows, contiguous=True)
+
+    def _property_rows(self, filename: str) \
+            -> Iterator[Tuple[str, Property]]:
+        """Iterate over pairs of entity name and property read from the
+        properties file `filename`."""
+        rows = self._rows(filename)
+        header = next(rows, None) or []
+        columns = _column_index(header, PROPERTY_COLUMNS, filename)
+
+        for row in rows:
+            yield self._property_from_row(row, columns)
+
+    def _rows(self, filename: str) -> Iterator[List[str]]:
+        """Iterate over non-empty rows of CSV file `filename`. Files in
+        archives are always read by the `csv` module."""
+        if self.fast and split_member(filename) is None:
+            return _fast_rows(filename)
+        else:
+            return _csv_rows(filename)
+
+    def _property_from_row(self, row: List[str],
+                           columns: Sequence[int]) -> Tuple[str, Property]:
+        """Create a property from `row`. `columns` are positions of the
+        `PROPERTY_COLUMNS` in the row. Returns a tuple of entity name and
+        the property."""
+
+        if len(row) < len(columns):
+            row = row + [""] * (len(columns) - len(row))
+
+        (entity_col, name_col, type_col, optional_col, tag_col, label_col,
+         desc_col, default_col) = columns
+
+        name = row[name_col]
+        entity_name = row[entity_col]
 
-    def _property_from_row(self, row: Dict[str, str]) -> Property:
-        name = row.get("name")
         if not name:
             raise MetadataError("Property in entity '{}' has no name"
-                                .format(row.get("entity")))
+                                .format(entity_name))
 
-        entity_name = row.get("entity")
         if not entity_name:
             raise MetadataError("Property '{}' has no entity."
-                               .format(row.get("name")))
+                               .format(name))
 
         try:
-            tag = int(row["tag"])
-        except TypeError:
+            tag = int(row[tag_col])
+        except (TypeError, ValueError):
             raise MetadataError("Invalid tag for property '{}.{}'"
                                 .format(entity_name, name))
 
         # Empty string in CSV is interpreted None
-        default: Optional[str] = row["default"] or None
+        default: Optional[str] = row[default_col] or None
 
         prop = Property(
-            name=row["name"],
-            tag=int(row["tag"]),
-            raw_type=row["type"],
-            label=row["label"],
-            desc=row["description"],
+            name=name,
+            tag=tag,
+            raw_type=row[type_col],
+            label=row[label_col],
+            desc=row[desc_col],
             default=default,
-            is_optional=to_bool(row["optional"]),
+            is_optional=_to_bool(row[optional_col]),
         )
 
-        return prop
+        return (entity_name, prop)
 
-    def _read_property_rows(self, rows: Iterable[Dict[str,str]]) -> None:
-        """Read properties from list of dictionaries where keys are
-        meta-property names and values are meta-property values."""
+    def _group_properties(self, rows: Iterable[Tuple[str, Property]],
+                          contiguous: bool) -> Iterator[Entity]:
+        """Create entities from pairs of entity name and property. An entity
+        is created for every run of consecutive properties of the same
+        entity. If `contiguous` is true then an error is raised when
+        properties of an entity are not consecutive."""
 
-        props: Dict[str,List[Property]]
-        props = defaultdict(list)
+        seen: Set[str] = set()
+        current: Optional[str] = None
+        props: List[Property] = []
 
-        for row in rows:
-            prop = self._property_from_row(row)
-            entname = row["entity"]
+        for entity_name, prop in rows:
+            if entity_name != current:
+                if current is not None:
+                    yield Entity(name=current, properties=props)
+
+                if contiguous and entity_name in seen:
+                    raise MetadataError("Properties of entity '{}' are not "
+                                        "on consecutive rows"
+                                        .format(entity_name))
+                seen.add(entity_name)
+                current = entity_name
+                props = []
 
-            props[entname].append(prop)
+            props.append(prop)
 
-        for entname, entprops in props.items():
-            entity = Entity(name=entname, properties=entprops)
-            self.model.add_entity(entity)
+        if current is not None:
+            yield Entity(name=current, properties=props)
 
     def read_enumerations_file(self, filename: str) -> None:
         pass
 
     def read_enum_values_file(self, filename: str) -> None:
         # Enum file is optional
-        if not os.path.isfile(filename):
+        if not is_file(filename):
             return
 
-        with open(filename) as f:
-            reader = csv.DictReader(f)
-            self._read_enum_rows(reader)
+        values: Dict[str,List[EnumValue]]
+        values = defaultdict(list)
+
+        with self._loading():
+            for enumname, value in self._enum_value_rows(filename):
+                values[enumname].append(value)
+
+        for enumname, enumvalues in values.items():
+            enum = Enumeration(name=enumname, values=enumvalues)
+            self.model.add_enum(enum)
+
+    def _enum_value_rows(self, filename: str) \
+            -> Iterator[Tuple[str, EnumValue]]:
+        """Iterate over pairs of enum name and enum value read from the enum
+        values file `filename`."""
+        rows = self._rows(filename)
+        header = next(rows, None) or []
+        columns = _column_index(header, ENUM_VALUE_COLUMNS, filename)
+
+        for row in rows:
+            yield self._enum_value_from_row(row, columns)
+
+    def _enum_value_from_row(self, row: List[str],
+                             columns: Sequence[int]) -> Tuple[str, EnumValue]:
+        """Create an enum value from `row`. `columns` are positions of the
+        `ENUM_VALUE_COLUMNS` in the row. Returns a tuple of enum name and
+        the value."""
+
+        if len(row) < len(columns):
+            row = row + [""] * (len(columns) - len(row))
+
+        enum_col, key_col, value_col, label_col, desc_col = columns
+
+        name = row[key_col]
+        enum_name = row[enum_col]
 
-    def _enum_value_from_row(self, row: Dict[str, str]) -> EnumValue:
-        name = row.get("key")
         if not name:
             raise MetadataError("Enum value in enum '{}' has no key"
-                                .format(row.get("enum")))
+                                .format(enum_name))
 
-        enum_name = row.get("enum")
         if not enum_name:
             raise MetadataError("Key '{}' has no enum name."
-                               .format(row.get("key")))
+                               .format(name))
 
         try:
-            value = int(row["value"])
-        except TypeError:
+            value = int(row[value_col])
+        except (TypeError, ValueError):
             raise MetadataError("Invalid enum value '{}.{}'"
                                 .format(enum_name, name))
 
         prop = EnumValue(
-            key=row["key"],
+            key=name,
             value=value,
-            label=row["label"],
-            desc=row["description"],
+            label=row[label_col],
+            desc=row[desc_col],
         )
 
-        return prop
+        return (enum_name, prop)
 
-    def _read_enum_rows(self, rows: Iterable[Dict[str,str]]) -> None:
-        """Read values of enums. Keys are: enum, key, value, label, desc."""
 
-        values: Dict[str,List[EnumValue]]
-        values = defaultdict(list)
+def _column_index(header: List[str], columns: Sequence[str],
+                  filename: str) -> List[int]:
+    """Return positions of `columns` in the `header` row of file
+    `filename`."""
+    index = {name: i for i, name in enumerate(header)}
 
-        for row in rows:
-            value = self._enum_value_from_row(row)
-            enumname = row["enum"]
+    try:
+        return [index[name] for name in columns]
+    except KeyError as e:
+        raise MetadataError("Column '{}' is missing in file '{}'"
+                            .format(e.args[0], filename))
 
-            values[enumname].append(value)
 
-        for enumname, enumvalues in values.items():
-            enum = Enumeration(name=enumname, values=enumvalues)
-            self.model.add_enum(enum)
+def _to_bool(value: str) -> Optional[bool]:
+    """Convert a CSV value to boolean, see `to_bool()`. Values are
+    usually one of few strings, the conversions are cached."""
+    try:
+        return _BOOL_VALUES[value]
+    except KeyError:
+        result = to_bool(value)
+        if len(_BOOL_VALUES) < 64:
+            _BOOL_VALUES[value] = result
+        return result
+
+_BOOL_VALUES: Dict[str, Optional[bool]] = {}
 
 
+def _csv_rows(filename: str) -> Iterator[List[str]]:
+    """Iterate over non-empty rows of CSV file `filename`, which might be in
+    an archive, using the `csv` module."""
+    with open_text(filename) as f:
+        for row in csv.reader(f):
+            # Skip empty lines the same way as `csv.DictReader`
+            if row:
+                yield row
+
+
+def _fast_rows(filename: str) -> Iterator[List[str]]:
+    """Iterate over non-empty rows of CSV file `filename`. The file is
+    memory-mapped and decoded as UTF-8 in chunks of lines. Lines without
+    quotes are split at commas, only lines with quotes are parsed with the
+    `csv` module. A quoted value might span multiple lines."""
+
+    with open(filename, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            # Lines of a record with a quoted value not finished yet
+            quoted: List[str] = []
+            start = 0
+
+            if data[:3] == b"\xef\xbb\xbf":
+                start = 3
+
+            while start < size:
+                # Split the chunk at the last new line
+                end = data.rfind(b"\n", start, start + FAST_CHUNK_SIZE)
+                if end == -1:
+                    end = data.find(b"\n", start + FAST_CHUNK_SIZE)
+                    if end == -1:
+                        end = size - 1
+                chunk = data[start:end + 1].decode("utf-8")
+                start = end + 1
+
+                lines = chunk.split("\n")
+                # The chunk ends with a new line, except at the end of the
+                # file. Quoted values continue on the first line of the next
+                # chunk.
+                if not lines[-1]:
+                    lines.pop()
+
+                for line in lines:
+                    if line.endswith("\r"):
+                        line = line[:-1]
+
+                    if quoted or '"' in line:
+                        quoted.append(line)
+                        record = "\n".join(quoted)
+                        # Record is complete when quotes are balanced
+                        if record.count('"') % 2:
+                            continue
+                        quoted = []
+                        yield from (row for row in csv.reader([record])
+                                    if row)
+                    elif line:
+                        yield line.split(",")
+
+            if quoted:
+                yield from (row for row in csv.reader(["\n".join(quoted)])
+                            if row)
@@ -0,0 +1,313 @@
+"""
+SQLite Database Reader
+
+The model is stored in tables indexed by entity and enum name, so entities
+can be read without reading the whole model. A database is created from
+another model source, such as a CSV model directory, by:
+
+    python -m entigen.readers.sqlite thing.model thing.db
+"""
+
+import argparse
+import os
+import os.path
+import sqlite3
+import tempfile
+
+from typing import (Any, Dict, Iterable, Iterator, List, Optional, Sequence,
+                    Set, Tuple)
+from urllib.request import pathname2url
+
+from ..errors import MetadataError
+from ..model import Model, Entity, Property, Enumeration, EnumValue
+from ..extensible import Reader
+from ..types import BASE_TYPES, COMPOSITE_TYPES, type_names
+
+
+SCHEMA_VERSION = 1
+"""Version of the database schema, stored as ``user_version``."""
+
+SCHEMA = """
+CREATE TABLE entities (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL
+);
+CREATE TABLE properties (
+    entity TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    optional INTEGER,
+    tag INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    description TEXT NOT NULL,
+    "default" TEXT
+);
+CREATE INDEX properties_entity ON properties (entity, position);
+CREATE TABLE enums (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL
+);
+CREATE TABLE enum_values (
+    enum TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    description TEXT NOT NULL
+);
+CREATE INDEX enum_values_enum ON enum_values (enum, position);
+"""
+
+PROPERTIES_QUERY = """
+SELECT p.entity, p.name, p.type, p.optional, p.tag, p.label, p.description,
+       p."default"
+FROM properties p JOIN entities e ON e.name = p.entity
+{where}
+ORDER BY e.position, p.position
+"""
+
+ENUM_VALUES_QUERY = """
+SELECT v.enum, v.key, v.value, v.label, v.description
+FROM enum_values v JOIN enums n ON n.name = v.enum
+ORDER BY n.position, v.position
+"""
+
+MAX_QUERY_NAMES = 500
+"""Maximal number of names in one query, SQLite limits the number of query
+parameters."""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    """Open database `path` read-only."""
+    if not os.path.isfile(path):
+        raise MetadataError("Model database '{}' does not exist"
+                            .format(path))
+
+    uri = "file:{}?mode=ro".format(pathname2url(os.path.abspath(path)))
+    db = sqlite3.connect(uri, uri=True)
+
+    version = db.execute("PRAGMA user_version").fetchone()[0]
+    if version != SCHEMA_VERSION:
+        db.close()
+        raise MetadataError("Database '{}' is not a model database of "
+                            "version {}".format(path, SCHEMA_VERSION))
+
+    return db
+
+
+def _chunks(names: Sequence[str]) -> Iterator[Sequence[str]]:
+    for i in range(0, len(names), MAX_QUERY_NAMES):
+        yield names[i:i + MAX_QUERY_NAMES]
+
+
+def _where_in(column: str, count: int) -> str:
+    return "WHERE {} IN ({})".format(column, ",".join("?" * count))
+
+
+def _group(rows: Iterable[Tuple[str, Any]]) -> Iterator[Tuple[str, List[Any]]]:
+    """Group consecutive pairs of name and object by name."""
+    current: Optional[str] = None
+    objects: List[Any] = []
+
+    for name, obj in rows:
+        if name != current:
+            if current is not None:
+                yield (current, objects)
+            current = name
+            objects = []
+        objects.append(obj)
+
+    if current is not None:
+        yield (current, objects)
+
+
+class SQLiteReader(Reader, name="sqlite"):
+
+    selective = True
+
+    model: Model
+
+    def __init__(self, model: Optional[Model]=None,
+                 variables: Optional[Dict[str,str]]=None) -> None:
+        self.model = model or Model()
+
+    def read_model(self, path: str) -> None:
+        db = _connect(path)
+        try:
+            for entity in self._entities(db, None):
+                self.model.add_entity(entity)
+            for enum in self._enums(db):
+                self.model.add_enum(enum)
+        finally:
+            db.close()
+
+    def read_entities(self, path: str, names: List[str]) -> None:
+        """Read entities `names` and, recursively, the entities used as
+        types of their properties. Only the rows of those entities are read
+        from the database. All enums are read – they are few and blocks
+        such as a file with enums do not depend on the listed entities."""
+
+        entities: List[Entity] = []
+        checked: Set[str] = set()
+        pending = list(names)
+
+        db = _connect(path)
+        try:
+            enums = self._enums(db)
+            enum_names = set(enum.name for enum in enums)
+
+            while pending:
+                checked.update(pending)
+
+                found = list(self._entities(db, pending))
+                entities += found
+
+                pending = sorted(set(name for entity in found
+                                     for prop in entity.properties
+                                     for name in type_names(prop.type)
+                                     if name not in checked
+                                     and name not in enum_names
+                                     and name not in BASE_TYPES
+                                     and name not in COMPOSITE_TYPES))
+
+            # Entities and enums in the model order
+            entity_order = self._positions(db, "entities",
+                                           [e.name for e in entities])
+        finally:
+            db.close()
+
+        for entity in sorted(entities, key=lambda e: entity_order[e.name]):
+            self.model.add_entity(entity)
+        for enum in enums:
+            self.model.add_enum(enum)
+
+    def iter_entities(self, path: str) -> Iterator[Entity]:
+        db = _connect(path)
+        try:
+            yield from self._entities(db, None)
+        finally:
+            db.close()
+
+    def source_files(self, path: str) -> Optional[List[str]]:
+        return [path]
+
+    def _positions(self, db: sqlite3.Connection, table: str,
+                   names: List[str]) -> Dict[str, int]:
+        """Return positions of `names` in the entities or enums `table`."""
+        positions: Dict[str, int] = {}
+        for chunk in _chunks(names):
+            query = "SELECT name, position FROM {} {}" \
+                    .format(table, _where_in("name", len(chunk)))
+            positions.update(db.execute(query, chunk))
+        return positions
+
+    def _entities(self, db: sqlite3.Connection,
+                  names: Optional[List[str]]) -> Iterator[Entity]:
+        """Iterate over entities `names`, or all entities, in the model
+        order within each chunk of names."""
+
+        if names is None:
+            queries = [(PROPERTIES_QUERY.format(where=""), [])]
+        else:
+            queries = [(PROPERTIES_QUERY.format(where=_where_in("p.entity",
+                                                                len(chunk))),
+                        list(chunk))
+                       for chunk in _chunks(names)]
+
+        for query, params in queries:
+            rows = db.execute(query, params)
+            pairs = ((row[0], _property_from_row(row)) for row in rows)
+            for name, props in _group(pairs):
+                yield Entity(name=name, properties=props)
+
+    def _enums(self, db: sqlite3.Connection) -> List[Enumeration]:
+        """Return all enums in the model order."""
+
+        rows = db.execute(ENUM_VALUES_QUERY)
+        pairs = ((row[0], EnumValue(key=row[1], value=row[2],
+                                    label=row[3], desc=row[4]))
+                 for row in rows)
+        return [Enumeration(name=name, values=values)
+                for name, values in _group(pairs)]
+
+
+def _property_from_row(row: Sequence[Any]) -> Property:
+    optional = row[3]
+    return Property(
+        name=row[1],
+        tag=row[4],
+        raw_type=row[2],
+        label=row[5],
+        desc=row[6],
+        default=row[7],
+        is_optional=None if optional is None else bool(optional),
+    )
+
+
+def write_database(model: Model, path: str) -> None:
+    """Write `model` into a new SQLite database `path`. An existing file is
+    replaced once the database is complete."""
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+
+    try:
+        db = sqlite3.connect(temp)
+        try:
+            db.executescript(SCHEMA)
+            db.execute("PRAGMA user_version = {}".format(SCHEMA_VERSION))
+
+            db.executemany("INSERT INTO entities VALUES (?, ?)",
+                           ((entity.name, i)
+                            for i, entity in enumerate(model.entities)))
+            db.executemany("INSERT INTO properties VALUES "
+                           "(?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                           ((entity.name, i, prop.name, prop.raw_type,
+                             prop.is_optional, prop.tag, prop.label,
+                             prop.desc, prop.default)
+                            for entity in model.entities
+                            for i, prop in enumerate(entity.properties)))
+            db.executemany("INSERT INTO enums VALUES (?, ?)",
+                           ((enum.name, i)
+                            for i, enum in enumerate(model.enums)))
+            db.executemany("INSERT INTO enum_values VALUES "
+                           "(?, ?, ?, ?, ?, ?)",
+                           ((enum.name, i, value.key, value.value,
+                             value.label, value.desc)
+                            for enum in model.enums
+                            for i, value in enumerate(enum.values)))
+            db.commit()
+        finally:
+            db.close()
+
+        os.replace(temp, path)
+    except BaseException:
+        if os.path.exists(temp):
+            os.unlink(temp)
+        raise
+
+
+def main(argv: Optional[List[str]]=None) -> None:
+    """Convert a model source into a model database."""
+
+    # Imported here, needed only by the converter
+    from ..parallel import read_models
+
+    parser = argparse.ArgumentParser(
+        prog="python -m entigen.readers.sqlite",
+        description="Convert a model into a SQLite model database")
+    parser.add_argument("model", help="Model source")
+    parser.add_argument("database", help="Database file to be created")
+    parser.add_argument("-f", "--from", dest="reader", default="csv",
+                        help="Reader of the model source, default is csv")
+
+    args = parser.parse_args(argv)
+
+    model = read_models(args.reader, [args.model], workers=1)
+    write_database(model, args.database)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""Generation server – keeps models in memory between requests.
+
+The server listens on a Unix domain socket. A client sends a request as one
+line of JSON with the command line arguments ``argv`` and the working
+directory ``cwd``. The server responds with lines of JSON: ``output`` chunks
+of the standard output and a final message with the exit ``status`` and an
+optional ``error``.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import os.path
+import socket
+import stat
+import sys
+import threading
+
+from collections import OrderedDict
+from typing import (Any, Callable, Dict, List, NoReturn, Optional, TextIO,
+                    Tuple)
+
+from .cache import (ModelCache, FileFingerprint, default_cache_dir,
+                    files_fingerprint, reader_variables)
+from .diff import write_change_set
+from .errors import ConfigError
+from .graph import with_dependencies
+from .extensible import Extensible
+from .jobs import Job, load_jobs, run_jobs
+from .main import create_parser, parse_variables
+from .model import Model
+from .parallel import read_models
+from .pipeline import run_pipeline
+
+
+DEFAULT_MAX_MODELS = 8
+"""Default number of models kept in memory by the server."""
+
+OUTPUT_CHUNK_SIZE = 1 << 16
+"""Approximate size of a chunk of output sent to the client at once."""
+
+UNSUPPORTED_OPTIONS = [
+    ("watch", "--watch"),
+    ("workers", "--workers"),
+    ("profile", "--profile"),
+    ("memory_report", "--memory-report"),
+    ("max_memory", "--max-memory"),
+]
+"""Destinations and names of the command line options rejected by the
+server."""
+
+
+def default_socket_path() -> str:
+    """Return default path of the server socket."""
+    return os.path.join(default_cache_dir(), "server.sock")
+
+
+class ModelStore:
+    """Models kept in memory, keyed by reader, sources and reader variables.
+    A model is used as long as the fingerprints of its source files match.
+    Least recently used models are evicted when there are more than
+    `max_models` models.
+
+    Each model has caches of the writers, see `Writer.caches`."""
+
+    max_models: int
+    cache: Optional[ModelCache]
+
+    # Key -> (fingerprints, model, writer caches)
+    _entries: Dict[Tuple[Any, ...],
+                   Tuple[List[List[FileFingerprint]], Model,
+                         Dict[str, Dict[str, Any]]]]
+
+    def __init__(self, max_models: int=DEFAULT_MAX_MODELS,
+                 cache: Optional[ModelCache]=None) -> None:
+        """Create a store of at most `max_models` models. Models which are
+        not in the store are read through the `cache` if specified."""
+        self.max_models = max_models
+        self.cache = cache
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, reader_name: str, sources: List[str],
+            variables: Dict[str,str]) \
+            -> Tuple[Model, Dict[str, Dict[str, Any]]]:
+        """Return model read from `sources` and caches of the writers for
+        the model."""
+
+        try:
+            reader_factory = Extensible.readers[reader_name]
+        except KeyError:
+            raise ConfigError("Unknown reader '{}'".format(reader_name))
+
+        reader = reader_factory(model=Model(), variables=variables)
+        key = (reader_name, tuple(sources),
+               tuple(sorted(reader_variables(reader, variables).items())))
+
+        fingerprint: Optional[List[List[FileFingerprint]]] = []
+        for source in sources:
+            files = reader.source_files(source)
+            if files is None:
+                # Model can not be validated, therefore is not kept
+                fingerprint = None
+                break
+            fingerprint.append(files_fingerprint(files))
+
+        if fingerprint is not None:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and entry[0] == fingerprint:
+                    self._entries.move_to_end(key)  # type: ignore
+                    return (entry[1], entry[2])
+
+        model = read_models(reader_name, sources, variables=variables,
+                            cache=self.cache, workers=1)
+        caches: Dict[str, Dict[str, Any]] = {}
+
+        if fingerprint is not None:
+            with self._lock:
+                self._entries[key] = (fingerprint, model, caches)
+                self._entries.move_to_end(key)  # type: ignore
+                while len(self._entries) > self.max_models:
+                    self._entries.popitem(last=False)  # type: ignore
+
+        return (model, caches)
+
+
+class _RequestParser(argparse.ArgumentParser):
+    """Argument parser which raises an error instead of exiting. Nothing is
+    printed into the output of the server."""
+
+    def error(self, message: str) -> NoReturn:
+        raise ConfigError(message)
+
+    def exit(self, status: int=0, message: Optional[str]=None) -> NoReturn:
+        raise ConfigError(message or "Invalid request")
+
+    def print_help(self, file: Optional[TextIO]=None) -> None:
+        raise ConfigError("Help is not available from the server")
+
+
+class _ClientStream:
+    """Text stream that sends written text to a client in chunks."""
+
+    def __init__(self, send: Callable[[str], None]) -> None:
+        self._send = send
+        self._buffer: List[str] = []
+        self._size = 0
+
+    def write(self, text: str) -> int:
+        self._buffer.append(text)
+        self._size += len(text)
+        if self._size >= OUTPUT_CHUNK_SIZE:
+            self.flush()
+        return len(text)
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._send("".join(self._buffer))
+            self._buffer = []
+            self._size = 0
+
+
+def _resolve(cwd: str, path: Optional[str]) -> Optional[str]:
+    """Return `path` relative to the client's working directory `cwd`."""
+    if path is None:
+        return None
+    return os.path.join(cwd, path)
+
+
+class Server:
+    """Server handling generation requests concurrently. Requests are
+    handled in threads of the event loop executor, output is streamed to
+    the client as it is rendered."""
+
+    store: ModelStore
+
+    def __init__(self, store: Optional[ModelStore]=None) -> None:
+        self.store = store if store is not None else ModelStore()
+        self._parser = create_parser(_RequestParser)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def handle_request(self, argv: List[str], cwd: str,
+                       stream: TextIO) -> None:
+        """Handle request with command line arguments `argv`. Relative paths
+        are relative to `cwd`. Output is written into `stream`."""
+
+        args = self._parser.parse_args(argv)
+
+        for dest, option in UNSUPPORTED_OPTIONS:
+            if getattr(args, dest):
+                raise ConfigError("Option {} is not supported by the server"
+                                  .format(option))
+
+        variables = parse_variables(args.variables)
+        sources = [os.path.join(cwd, source)
+                   for source in [args.model] + args.models]
+
+        model, caches = self.store.get(args.reader, sources, variables)
+
+        if args.diff:
+            other, _ = self.store.get(args.reader,
+                                      [os.path.join(cwd, args.diff)],
+                                      variables)
+            output = _resolve(cwd, args.output)
+            if output:
+                with open(output, "w") as f:
+                    write_change_set(other, model, f)
+            else:
+                write_change_set(other, model, stream)
+            return
+
+        if args.jobs:
+            jobs = load_jobs(os.path.join(cwd, args.jobs))
+        else:
+            jobs = [Job(writer=args.writer,
+                        block_type=args.block_type,
+                        entities=args.entities,
+                        variables={},
+                        output=_resolve(cwd, args.output),
+                        output_dir=_resolve(cwd, args.output_dir))]
+
+        if args.dependencies:
+            jobs = with_dependencies(model, jobs)
+
+        # Worker processes are not forked from the server threads
+        if args.pipeline:
+            # Requests are handled in threads without an event loop
+            run_pipeline(model, jobs, variables=variables, stream=stream,
+                         caches=caches)
+        else:
+            run_jobs(model, jobs, variables=variables, workers=1,
+                     stream=stream, caches=caches)
+
+    async def start(self, path: str) -> None:
+        """Start listening on Unix socket `path`. Raises `ConfigError` if
+        another server listens on the socket."""
+
+        try:
+            mode = os.stat(path).st_mode
+        except FileNotFoundError:
+            pass
+        else:
+            if not stat.S_ISSOCK(mode):
+                raise ConfigError("'{}' is not a socket".format(path))
+            if _is_listening(path):
+                raise ConfigError("Server is already running on '{}'"
+                                  .format(path))
+            os.unlink(path)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._server = await asyncio.start_unix_server(self._handle_client,
+                                                       path=path)
+
+    async def close(self) -> None:
+        """Stop listening."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_client(self, reader: asyncio.StreamReader,
+                             writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_event_loop()
+
+        async def send(message: Dict[str, Any]) -> None:
+            writer.write(json.dumps(message).encode("utf-8") + b"\n")
+            await writer.drain()
+
+        def send_output(text: str) -> None:
+            # Called from the executor thread, waits for the client to
+            # receive the data
+            future = asyncio.run_coroutine_threadsafe(send({"output": text}),
+                                                      loop)
+            future.result()
+
+        def handle(argv: List[str], cwd: str) -> None:
+            stream = _ClientStream(send_output)
+            self.handle_request(argv, cwd, stream)  # type: ignore
+            stream.flush()
+
+        try:
+            try:
+                request = json.loads((await reader.readline()).decode("utf-8"))
+                argv = [str(arg) for arg in request["argv"]]
+                cwd = str(request["cwd"])
+            except (ValueError, KeyError, TypeError):
+                await send({"status": 2, "error": "Malformed request"})
+                return
+
+            try:
+                await loop.run_in_executor(None, handle, argv, cwd)
+            except Exception as e:
+                # Any failure of the request is reported to the client, the
+                # server keeps running
+                await send({"status": 1, "error": str(e)})
+            else:
+                await send({"status": 0})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def _is_listening(path: str) -> bool:
+    """Return `True` if a server accepts connections on socket `path`."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+def request(path: str, argv: List[str], cwd: str,
+            stdout: TextIO=sys.stdout, stderr: TextIO=sys.stderr) -> int:
+    """Send request with command line arguments `argv` and working
+    directory `cwd` to the server listening on socket `path`. Output is
+    written into `stdout` as it is received, errors into `stderr`. Returns
+    the exit status."""
+
+    message = json.dumps({"argv": argv, "cwd": cwd}).encode("utf-8")
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except OSError as e:
+            raise ConfigError("Can not connect to server '{}': {}"
+                              .format(path, e))
+
+        sock.sendall(message + b"\n")
+
+        with sock.makefile("r", encoding="utf-8") as f:
+            for line in f:
+                response = json.loads(line)
+                if "output" in response:
+                    stdout.write(response["output"])
+                    continue
+
+                if response.get("error"):
+                    stderr.write("entigen: {}\n".format(response["error"]))
+                return int(response["status"])
+
+    stderr.write("entigen: Server closed the connection\n")
+    return 1
+
+
+def serve_main(argv: List[str]) -> None:
+    """Run the server with command line arguments `argv`."""
+
+    parser = argparse.ArgumentParser(prog="entigen serve",
+                                     description="Generation server")
+    parser.add_argument('--socket', dest='socket',
+                        default=default_socket_path(),
+                        help="Path of the Unix socket, default is "
+                             "~/.cache/entigen/server.sock")
+    parser.add_argument('--max-models', dest='max_models', type=int,
+                        default=DEFAULT_MAX_MODELS,
+                        help="Number of models kept in memory, default is "
+                             "{}".format(DEFAULT_MAX_MODELS))
+    parser.add_argument('--cache-dir', dest='cache_dir',
+                        help="Directory of cached models, default is "
+                             "~/.cache/entigen")
+    parser.add_argument('--no-cache', dest='use_cache',
+                        action="store_false", default=True,
+                        help="Do not use or store cached models")
+
+    args = parser.parse_args(argv)
+
+    cache = ModelCache(args.cache_dir) if args.use_cache else None
+    server = Server(ModelStore(args.max_models, cache))
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    loop.run_until_complete(server.start(args.socket))
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(server.close())
+        loop.close()
+        try:
+            os.unlink(args.socket)
+        except FileNotFoundError:
+            pass
@@ -2,9 +2,12 @@
 Data types used in the metamodel.
 """
 
+import functools
 import re
+import threading
+import weakref
 
-from typing import Optional, List
+from typing import Any, Optional, List, Sequence, Set, Tuple
 
 from .errors import DatatypeError
 
@@ -27,49 +30,78 @@ COMPOSITE_TYPES = [
     "dict"        
 ]
 
-COMPOSITE_PATTERN = r"^(\w+)<((\w)+(,(\w)+)*)>$"
+TYPE_TOKEN_PATTERN = re.compile(r"\s*(?:(\w+)|(\S))")
+"""Pattern for a token of a data type string: a type name or a single
+punctuation character."""
+
+TYPE_CACHE_SIZE = 1024
+"""Maximal number of parsed type strings kept in the cache."""
+
+# Guards creation of the shared `Type` instances
+_instances_lock = threading.Lock()
 
-"""Pattern for composite data type. Note that we accept only composite of a
-base type, no recursion is allowed."""
 
 class Type:
-    """Simple data type representation."""
+    """Simple data type representation.
+
+    Types are immutable and shared – there is only one instance of a type
+    with given name and children. Two types are equal only if they are the
+    same object, therefore comparison and hashing are identity based."""
+
+    __slots__ = ("name", "children", "__weakref__")
 
     name: str
     """Top-level type name"""
-    children: Optional[List["Type"]]
+    children: Optional[Tuple["Type", ...]]
     """Children types of the data type. For example, if the type is a list,
     then there is one child describing which type the list is composed of."""
 
+    _instances: "weakref.WeakValueDictionary[Any, Type]"
+    _instances = weakref.WeakValueDictionary()
+
     @classmethod
     def from_string(cls, string: str) -> "Type":
         """Create a data type from a string. The string can be:
             
         * One of the base types: ``string``, ``int``, ``identifier``
-        * List type: ``list<BASETYPE>``"""
+        * Composite type: ``list<TYPE>`` or ``dict<TYPE,TYPE>`` where the
+          children types might be composite types as well, for example
+          ``list<dict<string,int>>``
+
+        Parsed strings are cached."""
+        return _parse_type(string)
+
+    def __new__(cls, name: str,
+                children: Optional[Sequence["Type"]]=None) -> "Type":
+        """Return data type `name`. If no `children` are provided, then the
+        type is basic type, otherwise it is a complex type composed of
+        `children`"""
+        key = (name, tuple(children) if children else None)
 
-        match = re.match(COMPOSITE_PATTERN, string)
+        try:
+            return cls._instances[key]
+        except KeyError:
+            pass
 
-        if match:
-            typename = match.groups()[0]
+        # Another thread might be creating the same type
+        with _instances_lock:
+            try:
+                return cls._instances[key]
+            except KeyError:
+                pass
 
-            if typename in BASE_TYPES:
-                raise Exception("Can't use base type '{}' as a composite type"
-                                .format(typename))
+            type_ = object.__new__(cls)
+            object.__setattr__(type_, "name", name)
+            object.__setattr__(type_, "children", key[1])
+            cls._instances[key] = type_
 
-            children_str = match.groups()[1]
-            children = [Type(child) for child in children_str.split(",")]
+        return type_
 
-            return Type(typename, children=children)
-        else:
-            return Type(string)
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Type is immutable")
 
-    def __init__(self, name: str, children: Optional[List["Type"]]=None) -> None:
-        """Create a data type `name`. If no `children` are provided, then the
-        type is basic type, otherwise it is a complex type composed of
-        `children`"""
-        self.name = name
-        self.children = children
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (Type, (self.name, self.children))
 
     @property
     def is_composite(self) -> bool:
@@ -80,7 +112,7 @@ class Type:
         """Returns typename of the first child if the type is composite type or
         raise an exception if the type is not composite."""
 
-        if not self.is_composite:
+        if not self.is_composite or not self.children:
             raise DatatypeError("Type '{}' is not a composite type"
                             .format(str(self)))
 
@@ -93,4 +125,75 @@ class Type:
         else:
             return self.name
 
+    def __repr__(self) -> str:
+        return "Type({!r})".format(str(self))
+
+
+@functools.lru_cache(maxsize=TYPE_CACHE_SIZE)
+def _parse_type(string: str) -> Type:
+    """Parse data type from `string`."""
+
+    # Most of the types are simple types
+    if "<" not in string:
+        return Type(string)
+
+    # Pairs of type name and punctuation character, one of them is set
+    tokens = [match.groups() for match in TYPE_TOKEN_PATTERN.finditer(string)]
+    pos = 0
+
+    def invalid(reason: str) -> DatatypeError:
+        return DatatypeError("Invalid type '{}': {}".format(string, reason))
+
+    # Names and children of the open composite types
+    stack: List[Tuple[str, List[Type]]] = []
+
+    while True:
+        if pos >= len(tokens) or tokens[pos][0] is None:
+            raise invalid("type name expected")
+        name = tokens[pos][0]
+        pos += 1
+
+        if pos < len(tokens) and tokens[pos][1] == "<":
+            if name in BASE_TYPES:
+                raise DatatypeError("Can't use base type '{}' as a "
+                                    "composite type".format(name))
+            stack.append((name, []))
+            pos += 1
+            continue
+
+        type_ = Type(name)
+
+        # Close the composite types
+        while stack:
+            stack[-1][1].append(type_)
+
+            if pos >= len(tokens):
+                raise invalid("'>' expected")
+            punct = tokens[pos][1]
+            pos += 1
+
+            if punct == ",":
+                break
+            elif punct == ">":
+                name, children = stack.pop()
+                type_ = Type(name, children)
+            else:
+                raise invalid("',' or '>' expected")
+        else:
+            if pos < len(tokens):
+                raise invalid("unexpected '{}'".format(tokens[pos][0]
+                                                       or tokens[pos][1]))
+            return type_
+
+
+def type_names(type: Type) -> Set[str]:
+    """Return names of the type `type` and of all its nested types."""
+    names: Set[str] = set()
+    stack = [type]
+
+    while stack:
+        current = stack.pop()
+        names.add(current.name)
+        stack.extend(current.children or [])
 
+    return names
@@ -1,4 +1,6 @@
-from typing import Optional, Union
+from typing import Iterator, Optional, Union
+from contextlib import contextmanager
+import gc
 import re
 
 def decamelize(name: str) -> str:
@@ -33,3 +35,20 @@ def to_bool(value: Union[str,bool,int]) -> Optional[bool]:
     else:
         raise TypeError("Can't convert value of type '{}"
                         "to bool".format(type(value)))
+
+
+@contextmanager
+def paused_gc(pause: bool=True) -> Iterator[None]:
+    """Context in which the cyclic garbage collector is disabled if `pause`
+    is true. Used while creating large numbers of objects that do not form
+    reference cycles, such as model objects, which the collector would
+    otherwise repeatedly traverse."""
+    if not pause or not gc.isenabled():
+        yield
+        return
+
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
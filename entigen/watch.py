@@ -0,0 +1,238 @@
+"""Watching model sources and regenerating outputs when they change."""
+
+import os
+import sys
+import time
+
+from collections import namedtuple
+from typing import Dict, List, Optional, Set, TextIO, Tuple
+
+from . import diff
+from .cache import ModelCache
+from .errors import DatatypeError, MetadataError
+from .extensible import Extensible, Reader
+from .jobs import Job, run_jobs
+from .model import Model
+
+
+POLL_INTERVAL = 0.5
+"""Interval in seconds between checks of the model files."""
+
+ENUM_BLOCK_TYPES = ["enums_file", "enum_list"]
+"""Block types that depend only on enums of the model."""
+
+ModelChange = namedtuple("ModelChange", ["files", "entities", "enums",
+                                         "entity_list_changed"])
+"""Change of a model: list of changed `files`, names of added, removed or
+changed `entities` and `enums`. `entity_list_changed` is true if entities
+were added, removed or reordered."""
+
+# Size and modification time in nanoseconds, `None` if the file does not
+# exist
+FileStat = Optional[Tuple[int, int]]
+
+
+def _file_stat(path: str) -> FileStat:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def _merge(models: List[Model]) -> Model:
+    model = Model()
+    for source_model in models:
+        model.merge(source_model)
+    return model
+
+
+def affected_entities(model: Model, change: ModelChange) -> Set[str]:
+    """Return names of entities of `model` which output might be affected
+    by `change` – the changed entities and entities with properties of a
+    changed entity or enum type."""
+
+    return set(diff.affected_entities(model, change.entities, change.enums))
+
+
+def affected_jobs(model: Model, jobs: List[Job],
+                  change: ModelChange) -> List[Job]:
+    """Return jobs which output might be affected by `change`. Multi-file
+    jobs are restricted to the affected entities, unless the list of
+    entities has changed."""
+
+    affected = affected_entities(model, change)
+    result: List[Job] = []
+
+    for job in jobs:
+        if job.block_type in ENUM_BLOCK_TYPES:
+            if change.enums:
+                result.append(job)
+            continue
+
+        if not job.entities and change.entity_list_changed:
+            result.append(job)
+            continue
+
+        names = job.entities or model.entity_names
+        job_affected = [name for name in names if name in affected]
+
+        partial = job.output_dir and not change.entity_list_changed
+
+        if partial and job_affected:
+            result.append(job._replace(entities=job_affected))
+        elif job_affected or (job.output_dir and change.enums):
+            result.append(job)
+        elif set(job.entities) & change.entities:
+            # Explicitly requested entity was removed
+            result.append(job)
+
+    return result
+
+
+class ModelWatcher:
+    """Model read from multiple sources that is re-read when the source
+    files change. Only the changed sources are re-read and readers that
+    support it re-read only the changed files."""
+
+    reader_name: str
+    sources: List[str]
+    variables: Dict[str,str]
+    model: Model
+
+    source_models: List[Model]
+    # Source files of each source and their stat
+    stats: List[Dict[str, FileStat]]
+    # Stats of the files which could not be read
+    _failed_stats: Optional[List[Dict[str, FileStat]]]
+
+    def __init__(self, reader_name: str, sources: List[str],
+                 variables: Optional[Dict[str,str]]=None,
+                 cache: Optional[ModelCache]=None) -> None:
+        """Read the model from `sources`, through the `cache` if
+        specified."""
+
+        self.reader_name = reader_name
+        self.sources = sources
+        self.variables = variables or {}
+
+        self.source_models = []
+        self.stats = []
+        self._failed_stats = None
+
+        for source in sources:
+            self.stats.append(self._source_stat(source))
+
+            if cache:
+                model = cache.read(reader_name, source, self.variables)
+            else:
+                reader = self._reader()
+                reader.read_model(source)
+                model = reader.model
+
+            self.source_models.append(model)
+
+        self.model = _merge(self.source_models)
+
+    def _reader(self) -> Reader:
+        return Extensible.readers[self.reader_name](model=Model(),
+                                                    variables=self.variables)
+
+    def _source_stat(self, source: str) -> Dict[str, FileStat]:
+        """Return stats of files of `source`. If the reader does not know
+        the files then the source itself is watched."""
+        files = self._reader().source_files(source) or [source]
+        return {path: _file_stat(path) for path in files}
+
+    def reload(self) -> Optional[ModelChange]:
+        """Re-read sources with changed files. Returns the change of the
+        model or `None` if no file has changed. If the model can not be
+        read, the previous model is kept and the exception is raised. The
+        same files are not read again until they change."""
+
+        stats = [self._source_stat(source) for source in self.sources]
+
+        if stats == self.stats or stats == self._failed_stats:
+            return None
+
+        changed_files = [[path for path, stat in new.items()
+                          if old.get(path, False) != stat]
+                         for old, new in zip(self.stats, stats)]
+
+        models = list(self.source_models)
+        old_model = self.model
+
+        try:
+            for i, changed in enumerate(changed_files):
+                if changed:
+                    reader = self._reader()
+                    reader.reload_model(self.sources[i], changed, models[i])
+                    models[i] = reader.model
+
+            model = _merge(models)
+        except Exception:
+            self._failed_stats = stats
+            raise
+
+        self.source_models = models
+        self.model = model
+        self.stats = stats
+        self._failed_stats = None
+
+        model_diff = old_model.diff(model)
+        files = [path for changed in changed_files for path in changed]
+
+        return ModelChange(files=files,
+                           entities=model_diff.entities,
+                           enums=model_diff.enums,
+                           entity_list_changed=(old_model.entity_names
+                                                != self.model.entity_names))
+
+
+def watch(watcher: ModelWatcher, jobs: List[Job],
+          variables: Optional[Dict[str,str]]=None, workers: int=1,
+          interval: float=POLL_INTERVAL, cycles: Optional[int]=None,
+          log: TextIO=sys.stderr) -> None:
+    """Poll files of the `watcher` model every `interval` seconds and run
+    the `jobs` affected by changes. Reload and regeneration time is written
+    to `log` on every change. Runs until interrupted, or for `cycles`
+    checks if specified."""
+
+    cycle = 0
+
+    while cycles is None or cycle < cycles:
+        cycle += 1
+        time.sleep(interval)
+
+        start = time.perf_counter()
+        try:
+            change = watcher.reload()
+        except (MetadataError, DatatypeError, OSError) as e:
+            log.write("Error reading model: {}\n".format(e))
+            log.flush()
+            continue
+
+        if change is None:
+            continue
+
+        reloaded = time.perf_counter()
+
+        rerun = affected_jobs(watcher.model, jobs, change)
+        try:
+            run_jobs(watcher.model, rerun, variables=variables,
+                     workers=workers,
+                     remove_stale=change.entity_list_changed)
+        except (MetadataError, DatatypeError, OSError) as e:
+            log.write("Error generating output: {}\n".format(e))
+            log.flush()
+            continue
+
+        finished = time.perf_counter()
+
+        log.write("Reloaded {} file(s) in {:.1f} ms ({} entities, {} enums "
+                  "changed), regenerated {} of {} outputs in {:.1f} ms\n"
+                  .format(len(change.files), (reloaded - start) * 1000,
+                          len(change.entities), len(change.enums),
+                          len(rerun), len(jobs),
+                          (finished - reloaded) * 1000))
+        log.flush()
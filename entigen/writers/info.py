@@ -16,9 +16,10 @@ class InfoWriter(Writer, name="info"):
 
     def __init__(self, model: Model,
                  variables: Optional[Dict[str,str]]=None) -> None:
+        super().__init__(model, variables)
         self.model = model
 
-        if "decamelize" in variables:
+        if "decamelize" in (variables or {}):
             self.decamelize = True
         else:
             self.decamelize = False
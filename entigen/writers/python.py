@@ -1,11 +1,12 @@
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Iterator, Tuple
 
 import re
 
 from ..model import Model, Entity, Property, Enumeration
 from ..block import Block, BlockType
+from ..compiler import ENTITY, ENUM, sort_by_default
 
-from ..types import Type
+from ..types import Type, type_names
 from ..extensible import Writer
 
 from ..errors import DatatypeError, ConfigError
@@ -22,8 +23,23 @@ PYTHON_BASE_TYPES = {
     "objref": "Any",
 }
 
+COMPOSITE_ARITY = {
+    "list": 1,
+    "dict": 2,
+}
+"""Number of type arguments of the composite types."""
+
 TypeImport = namedtuple("TypeImport", ["module", "symbol"])
 
+ModuleLayout = namedtuple("ModuleLayout", ["entities_module",
+                                           "entity_per_module",
+                                           "enums_module"])
+"""Modules the generated code imports entities and enums from, see the
+writer attributes of the same names."""
+
+ENUMS_MODULE = "enums"
+"""Name of the module with enums in the multi-file output."""
+
 PYTHON_TYPE_IMPORTS = {
     "datetime": TypeImport("datetime", "datetime"),
     "date": TypeImport("datetime", "date"),
@@ -32,21 +48,6 @@ PYTHON_TYPE_IMPORTS = {
 }
 
 
-def sort_by_default(props: List[Property]) -> List[Property]:
-    """Sort properties `props` by whether they have default value or not. Put
-    the ones with default value at the end."""
-    first: List[Property] = []
-    last: List[Property] = []
-
-    for prop in props:
-        if prop.default is not None:
-            last.append(prop)
-        else:
-            first.append(prop)
-
-    return first + last
-
-
 class PythonWriter(Writer, name="python"):
 
     block_types = ["class_file", "class"]
@@ -57,8 +58,9 @@ class PythonWriter(Writer, name="python"):
 
     def __init__(self, model: Model,
                  variables: Optional[Dict[str,str]]=None) -> None:
-        self.model = model
+        super().__init__(model, variables)
 
+        variables = variables or {}
         self.entities_module = variables.get("entities_module")
         self.entity_per_module = to_bool(variables.get("entity_per_module")
                                          or False)
@@ -66,8 +68,23 @@ class PythonWriter(Writer, name="python"):
 
     def type_annotation(self, type: Type) -> str:
         """Convert `type` into python Python annotation"""
+        annotations = self.caches.setdefault("annotations", {})
+
+        try:
+            return annotations[type]
+        except KeyError:
+            annotation = self._type_annotation(type)
+            annotations[type] = annotation
+            return annotation
+
+    def _type_annotation(self, type: Type) -> str:
         # TODO: nothing for now
         if type.is_composite:
+            arity = COMPOSITE_ARITY.get(type.name)
+            if arity is not None and len(type.children or ()) != arity:
+                raise DatatypeError("Composite type '{}' requires {} type "
+                                    "argument(s)".format(type, arity))
+
             if type.name == "list":
                 return "List[{}]".format(self.type_annotation(type.first_child))
             if type.name == "dict":
@@ -78,27 +95,47 @@ class PythonWriter(Writer, name="python"):
                 raise DatatypeError("Can't convert composite type '{}' into "
                                     "Python type".format(type))
 
-        # TODO: Handle enums
-        if type.name in PYTHON_BASE_TYPES:
-            return PYTHON_BASE_TYPES[type.name]
-        elif self.model.is_entity(type.name):
-            return type.name
-        elif self.model.is_enum(type.name):
+        kind = self.compiled.bind(type.name).kind
+        if kind == ENTITY or kind == ENUM:
             return type.name
+
+        try:
+            return PYTHON_BASE_TYPES[type.name]
+        except KeyError:
+            raise DatatypeError("Can't convert type '{}' into Python type"
+                                .format(type))
+
+    @property
+    def layout(self) -> ModuleLayout:
+        """Module layout given by the writer variables."""
+        return ModuleLayout(self.entities_module, self.entity_per_module,
+                            self.enums_module)
+
+    @property
+    def files_layout(self) -> ModuleLayout:
+        """Module layout of the multi-file output. Unless specified
+        otherwise by the variables, entities are imported from sibling
+        modules and enums from the ``enums`` module."""
+        enums_module = self.enums_module or "." + ENUMS_MODULE
+
+        if self.entities_module is None:
+            return ModuleLayout(".", True, enums_module)
         else:
-            raise DatatypeError(type.name)
+            return ModuleLayout(self.entities_module, self.entity_per_module,
+                                enums_module)
 
-    def _entity_import(self, entity: Entity) -> Optional[TypeImport]:
+    def _entity_import(self, entity: Entity,
+                       layout: ModuleLayout) -> Optional[TypeImport]:
 
-        if not self.entities_module:
+        if not layout.entities_module:
             return None
 
-        module: str = self.entities_module
+        module: str = layout.entities_module
 
         # If there is one module per entity, then import that entity from a
         # sub-module
-        if self.entity_per_module:
-            submodule = to_identifier(decamelize(entity.name))
+        if layout.entity_per_module:
+            submodule = self.module_name(entity)
             # Handle `.`, `..`, ... modules:
             if module.endswith("."):
                 module += submodule
@@ -107,45 +144,56 @@ class PythonWriter(Writer, name="python"):
 
         return TypeImport(module, entity.name)
 
-    def _enum_import(self, enum: Enumeration) -> Optional[TypeImport]:
+    def _enum_import(self, enum: Enumeration,
+                     layout: ModuleLayout) -> Optional[TypeImport]:
 
-        if not self.enums_module:
+        if not layout.enums_module:
             return None
 
-        return TypeImport(self.enums_module, enum.name)
+        return TypeImport(layout.enums_module, enum.name)
 
-    def type_imports(self, type: Type) -> List[TypeImport]:
-        """Return list of imports that provide the type `type`."""
+    def name_imports(self, name: str,
+                     layout: Optional[ModuleLayout]=None) -> List[TypeImport]:
+        """Return list of imports that provide the type named `name`,
+        without its nested types. Modules are given by `layout`, by default
+        the writer `layout`."""
         imports: List[TypeImport] = []
+        layout = layout or self.layout
 
         try:
-            imp = PYTHON_TYPE_IMPORTS[type.name]
+            imports.append(PYTHON_TYPE_IMPORTS[name])
         except KeyError:
             pass
-        else:
+
+        binding = self.compiled.bind(name)
+        imp: Optional[TypeImport] = None
+        if binding.kind == ENTITY:
+            imp = self._entity_import(binding.target, layout)
+        elif binding.kind == ENUM:
+            imp = self._enum_import(binding.target, layout)
+        if imp:
             imports.append(imp)
 
-        if self.model.is_entity(type.name):
-            imp = self._entity_import(self.model.entity(type.name))
-            if imp:
-                imports.append(imp)
-        elif self.model.is_enum(type.name):
-            imp = self._enum_import(self.model.enum(type.name))
-            if imp:
-                imports.append(imp)
-            pass
+        return imports
 
-        for child in type.children or []:
-            imports += self.type_imports(child)
+    def type_imports(self, type: Type,
+                     layout: Optional[ModuleLayout]=None) -> List[TypeImport]:
+        """Return list of imports that provide the type `type`."""
+        imports: List[TypeImport] = []
+
+        for name in sorted(type_names(type)):
+            imports += self.name_imports(name, layout)
 
         return imports
 
-    def entity_type_imports(self, entity: Entity) -> List[TypeImport]:
+    def entity_type_imports(self, entity: Entity,
+                            layout: Optional[ModuleLayout]=None) \
+            -> List[TypeImport]:
         """Collect all imports required for entity `entity`."""
         imports: List[TypeImport] = []
 
-        for prop in entity.properties:
-            imports += self.type_imports(prop.type)
+        for name in self.compiled.entity(entity.name).type_names:
+            imports += self.name_imports(name, layout)
 
         return imports
 
@@ -236,7 +284,7 @@ class PythonWriter(Writer, name="python"):
         """Generate ``__init__` method for entity `Entity"""
 
         args = Block(indent=13, suffix=",", last_suffix="")
-        for prop in sort_by_default(entity.properties):
+        for prop in self.compiled.entity(entity.name).arguments:
             args += self.init_argument(prop)
 
         inits = Block(indent=4)
@@ -327,19 +375,35 @@ class PythonWriter(Writer, name="python"):
 
         b = Block()
 
-        for ent in entities:
-            b += self.write_class(ent)
+        for class_block in self.entity_blocks("write_class", entities):
+            b += class_block
             b += ""
 
         return b
 
-    def write_class_file(self, entities: List[Entity]) -> Block:
-        """Generate class definition file for `entity`"""
+    def write_class_file(self, entities: List[Entity],
+                         layout: Optional[ModuleLayout]=None) -> Block:
+        """Generate class definition file for `entity`. Types are imported
+        from modules given by `layout`, by default the writer `layout`."""
+
+        b = self.write_imports(entities, layout)
+        b += self.write_classes(entities)
+
+        return b
+
+    def write_imports(self, entities: List[Entity],
+                      layout: Optional[ModuleLayout]=None) -> Block:
+        """Generate imports of a class definition file for `entities`."""
 
         imports: List[TypeImport] = []
         for ent in entities:
-            imports += self.entity_type_imports(ent)
-        imports = list(set(imports))
+            imports += self.entity_type_imports(ent, layout)
+
+        # Classes defined in the file are not imported. Imports are sorted
+        # so the output is the same on every run.
+        defined = set(ent.name for ent in entities)
+        imports = sorted(imp for imp in set(imports)
+                         if imp.symbol not in defined)
 
 
         b = Block()
@@ -350,10 +414,14 @@ class PythonWriter(Writer, name="python"):
             b += "from {} import {}".format(imp.module, imp.symbol)
 
         b += ""
-        b += self.write_classes(entities)
 
         return b
 
+    def write_entity_file(self, entity: Entity) -> Block:
+        """Generate file with class definition of a single entity of the
+        multi-file output, see `files_layout`."""
+        return self.write_class_file([entity], self.files_layout)
+
     def write_enum(self, enum: Enumeration) -> Block:
         """Write enum definition"""
 
@@ -384,15 +452,54 @@ class PythonWriter(Writer, name="python"):
 
         return b
 
+    def compiled_entities(self, entities: Optional[List[str]]=None) \
+            -> List[Entity]:
+        """Return entities named `entities`, or all entities, once they are
+        compiled. Raises `CompilationError` with all problems of the
+        entities."""
+        return [compiled.entity
+                for compiled in self.compiled.compile(entities)]
+
+    def module_name(self, entity: Entity) -> str:
+        """Return name of a module of `entity` if each entity has its own
+        module."""
+        return to_identifier(decamelize(entity.name))
+
+    def create_files(self, entities: Optional[List[str]]=None) \
+            -> Iterator[Tuple[str, Block]]:
+        """Iterate over files with one module per entity and a module with
+        enums, if there are any. Modules are imported as given by
+        `files_layout`."""
+
+        write_ents = self.compiled_entities(entities)
+
+        blocks = self.entity_blocks("write_entity_file", write_ents)
+        for ent, block in zip(write_ents, blocks):
+            yield (self.module_name(ent) + ".py", block)
+
+        if self.model.enums:
+            yield (ENUMS_MODULE + ".py", self.write_enums_file())
+
+    def iter_blocks(self, block_type: str,
+                    entities: Optional[List[str]]=None) -> Iterator[Block]:
+        if block_type not in ("class", "class_file"):
+            yield self.create_block(block_type, entities)
+            return
+
+        write_ents = self.compiled_entities(entities)
+
+        if block_type == "class_file":
+            yield self.write_imports(write_ents)
+
+        for class_block in self.entity_blocks("write_class", write_ents):
+            yield Block([class_block, ""])
+
     def create_block(self, block_type: str,
                      entities: Optional[List[str]]=None) -> Block:
-        write_ents = [self.model.entity(name)
-                      for name in entities or self.model.entity_names]
-
         if block_type == "class":
-            return self.write_classes(write_ents)
+            return self.write_classes(self.compiled_entities(entities))
         elif block_type == "class_file":
-            return self.write_class_file(write_ents)
+            return self.write_class_file(self.compiled_entities(entities))
         elif block_type == "enums_file":
             return self.write_enums_file()
         else:
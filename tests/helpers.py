@@ -0,0 +1,52 @@
+"""Helpers shared by the tests – CSV models in temporary directories."""
+
+import os
+import os.path
+import tempfile
+import unittest
+
+
+PROPERTIES_HEADER = "category,entity,name,type,optional,tag,label," \
+                    "description,default,note\n"
+"""Header of the properties file of a CSV model."""
+
+ENUM_HEADER = "enum,key,value,label,description\n"
+"""Header of the enum values file of a CSV model."""
+
+
+def write_file(path: str, text: str) -> None:
+    """Write `text` into file `path`. The directory is created if it does
+    not exist."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def write_model(path: str, *entities: str) -> str:
+    """Write CSV model into directory `path` with `entities`, each with a
+    ``name`` property. Returns `path`."""
+    lines = ["default,{},name,string,no,1,Name,,,\n".format(entity)
+             for entity in entities]
+    write_file(os.path.join(path, "properties.csv"),
+               PROPERTIES_HEADER + "".join(lines))
+    return path
+
+
+class TempDirTestCase(unittest.TestCase):
+    """Test case with a temporary directory, which is removed after each
+    test."""
+
+    def setUp(self) -> None:
+        self.tempdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tempdir.cleanup()
+
+    def temp_path(self, *names: str) -> str:
+        """Return path of `names` within the temporary directory."""
+        return os.path.join(self.tempdir.name, *names)
+
+    def model(self, name: str, *entities: str) -> str:
+        """Write CSV model `name` with `entities` into the temporary
+        directory, see `write_model()`. Returns path of the model."""
+        return write_model(self.temp_path(name), *entities)
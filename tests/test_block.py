@@ -1,7 +1,15 @@
 import unittest
 import textwrap
+import io
+import gc
+import weakref
+
+from entigen.block import Block, BlockArena
+
+
+def memoized(block: Block) -> str:
+    return "\n".join(block.lines(memoize=True))
 
-from entigen.block import Block
 
 class TestBlock(unittest.TestCase):
     def test_basic(self) -> None:
@@ -190,4 +198,133 @@ class TestBlock(unittest.TestCase):
 
         self.assertEqual(str(b), text)
 
+    def test_single_line_last_suffix(self) -> None:
+        # Single line is the first line, the common suffix is used
+        b = Block("one", suffix=",", last_suffix=":")
+
+        self.assertEqual(list(b.lines()), ["one,"])
+
+    def test_empty_nested_last_suffix(self) -> None:
+        inner = Block(indent=2, suffix=",", last_suffix=";")
+        inner += "one"
+        inner += "two"
+        inner += Block()
+
+        self.assertEqual(list(inner.lines()), ["  one,", "  two;"])
+
+    def test_deep_nesting(self) -> None:
+        b = Block("leaf")
+        for i in range(5000):
+            b = Block(b, prefix=">")
+
+        self.assertEqual(str(b), ">" * 5000 + "leaf")
+
+    def test_write(self) -> None:
+        inner = Block(indent=2)
+        inner += "one"
+        inner += "two"
+
+        b = Block()
+        b += "begin"
+        b += inner
+        b += "end"
+
+        stream = io.StringIO()
+        b.write(stream)
+
+        self.assertEqual(stream.getvalue(), str(b) + "\n")
+
+
+    def test_memoized(self) -> None:
+        inner = Block(indent=2)
+        inner += "one"
+
+        b = Block()
+        b += "begin"
+        b += inner
+        b += "end"
+
+        self.assertEqual(memoized(b), "begin\n  one\nend")
+        self.assertIsNotNone(inner._cache)
+        self.assertEqual(memoized(b), "begin\n  one\nend")
+
+        inner += "two"
+        self.assertEqual(memoized(b), "begin\n  one\n  two\nend")
+
+        inner.indent = 4
+        self.assertEqual(memoized(b), "begin\n    one\n    two\nend")
+        self.assertEqual(str(b), "begin\n    one\n    two\nend")
+
+    def test_not_memoized(self) -> None:
+        inner = Block("one", indent=2)
+        b = Block(["begin", inner, "end"])
+
+        self.assertEqual(str(b), "begin\n  one\nend")
+        self.assertIsNone(b._cache)
+        self.assertIsNone(inner._cache)
+        self.assertIsNone(inner._parents)
+
+    def test_memoized_shared(self) -> None:
+        shared = Block("shared")
+
+        first = Block(shared, indent=2)
+        second = Block(prefix="# ")
+        second += shared
+
+        self.assertEqual(memoized(first), "  shared")
+        self.assertEqual(memoized(second), "# shared")
+
+        shared += "more"
+
+        self.assertEqual(memoized(first), "  shared\n  more")
+        self.assertEqual(memoized(second), "# shared\n# more")
+
+    def test_parents_not_kept(self) -> None:
+        # Children refer to their parents weakly, a dropped tree is freed
+        # without the cyclic garbage collector
+        shared = Block("shared")
+        parent = Block([shared, Block("child")])
+        self.assertEqual(memoized(parent), "shared\nchild")
+
+        ref = weakref.ref(parent)
+        gc.disable()
+        try:
+            del parent
+            self.assertIsNone(ref())
+        finally:
+            gc.enable()
+
+        shared += "more"
+        self.assertEqual(memoized(Block(shared)), "shared\nmore")
+
+    def test_style_shared(self) -> None:
+        a = Block(indent=2, prefix="# ")
+        b = Block(indent=2, prefix="# ")
+
+        self.assertIs(a.style, b.style)
+
+        b.indent = 4
+        self.assertIsNot(a.style, b.style)
+        self.assertEqual(b.style.prefix, "# ")
+
+    def test_arena(self) -> None:
+        inner = Block(indent=2, suffix=",", last_suffix="")
+        inner += "one"
+        inner += "two"
+
+        arena = BlockArena()
+        arena += "begin"
+        arena += inner
+        arena.open(indent=4, prefix="# ")
+        arena += "comment"
+        arena.close()
+        arena += "end"
+
+        text = textwrap.dedent("""
+        begin
+          one,
+          two
+            # comment
+        end""").strip()
 
+        self.assertEqual(str(arena), text)
@@ -0,0 +1,40 @@
+import unittest
+import os
+import os.path
+
+from entigen.cache import ModelCache
+
+from helpers import ENUM_HEADER, TempDirTestCase, write_file, write_model
+
+class TestModelCache(TempDirTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.model_path = self.model("thing.model", "Thing")
+        self.cache = ModelCache(self.temp_path("cache"))
+
+    def write(self, filename: str, text: str) -> None:
+        write_file(os.path.join(self.model_path, filename), text)
+
+    def test_cached(self) -> None:
+        model = self.cache.read("csv", self.model_path)
+        self.assertEqual(model.entity_names, ["Thing"])
+        self.assertEqual(len(os.listdir(self.cache.path)), 1)
+
+        cached = self.cache.read("csv", self.model_path)
+        self.assertIsNot(cached, model)
+        self.assertEqual(cached.entity_names, ["Thing"])
+        self.assertIs(cached.entity("Thing").properties[0].type,
+                      model.entity("Thing").properties[0].type)
+
+    def test_changed(self) -> None:
+        self.cache.read("csv", self.model_path)
+
+        # Same size, different content
+        write_model(self.model_path, "Other")
+        model = self.cache.read("csv", self.model_path)
+        self.assertEqual(model.entity_names, ["Other"])
+
+        # New optional file
+        self.write("enum_values.csv", ENUM_HEADER + "Color,red,1,Red,\n")
+        model = self.cache.read("csv", self.model_path)
+        self.assertEqual(model.enum_names, ["Color"])
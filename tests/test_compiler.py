@@ -0,0 +1,93 @@
+import unittest
+import pickle
+
+from entigen.compiler import CompiledModel, BASE, COMPOSITE, ENTITY, ENUM
+from entigen.errors import CompilationError, DatatypeError
+from entigen.model import Model, Entity, Property, Enumeration, EnumValue
+from entigen.writers.python import PythonWriter
+
+
+def prop(name: str, tag: int, type: str,
+         default: str=None) -> Property:
+    return Property(name, tag, type, name.title(), "", default, False)
+
+
+class TestCompiler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.model = Model()
+        self.model.add_entity(Entity("Thing", [
+            prop("tags", 1, "list<string>", "[]"),
+            prop("name", 2, "string"),
+            prop("parts", 3, "dict<string,list<Part>>"),
+            prop("color", 4, "Color"),
+        ]))
+        self.model.add_entity(Entity("Part", [prop("name", 1, "string")]))
+        self.model.add_enum(Enumeration("Color", [EnumValue("RED", 1, "Red",
+                                                            "")]))
+
+    def test_bind(self) -> None:
+        compiled = CompiledModel(self.model)
+
+        self.assertEqual(compiled.bind("string").kind, BASE)
+        self.assertEqual(compiled.bind("list").kind, COMPOSITE)
+        self.assertIs(compiled.bind("Part").target, self.model.entity("Part"))
+        self.assertIs(compiled.bind("Color").target, self.model.enum("Color"))
+        self.assertEqual(compiled.bind("Color").kind, ENUM)
+
+        with self.assertRaises(DatatypeError):
+            compiled.bind("Unknown")
+
+    def test_entity(self) -> None:
+        compiled = CompiledModel(self.model)
+        thing = compiled.entity("Thing")
+
+        self.assertEqual([p.name for p in thing.arguments],
+                         ["name", "parts", "color", "tags"])
+        self.assertEqual(thing.type_names,
+                         ["Color", "Part", "dict", "list", "string"])
+        self.assertEqual(thing.references, ["Color", "Part"])
+        self.assertIs(compiled.entity("Thing"), thing)
+        self.assertEqual(compiled.bind("Part").kind, ENTITY)
+
+    def test_problems(self) -> None:
+        self.model.add_entity(Entity("Broken", [
+            prop("a", 1, "list<Missing>"),
+            prop("b", 1, "Other"),
+        ]))
+        self.model.add_entity(Entity("AlsoBroken", [prop("c", 1, "Nope")]))
+        compiled = CompiledModel(self.model)
+
+        # Only the requested entities are compiled
+        self.assertEqual(len(compiled.compile(["Thing", "Part"])), 2)
+
+        with self.assertRaises(CompilationError) as cm:
+            compiled.compile()
+
+        self.assertEqual(cm.exception.problems, [
+            "Unknown type 'Missing' of property 'Broken.a'",
+            "Unknown type 'Other' of property 'Broken.b'",
+            "Duplicate tag 1 of properties 'Broken.a' and 'Broken.b'",
+            "Unknown type 'Nope' of property 'AlsoBroken.c'",
+        ])
+
+        error = pickle.loads(pickle.dumps(cm.exception))
+        self.assertEqual(error.problems, cm.exception.problems)
+
+    def test_writer(self) -> None:
+        self.model.add_entity(Entity("Broken", [prop("a", 1, "Missing")]))
+        writer = PythonWriter(self.model, {})
+
+        self.assertIn("class Thing:", list(writer.create_block("class",
+                                                               ["Thing"])
+                                           .lines()))
+        with self.assertRaises(CompilationError):
+            writer.create_block("class_file")
+
+    def test_composite_without_arguments(self) -> None:
+        for raw_type in ["list", "dict", "dict<string>"]:
+            model = Model()
+            model.add_entity(Entity("Thing", [prop("items", 1, raw_type)]))
+            writer = PythonWriter(model, {})
+
+            with self.assertRaises(DatatypeError):
+                writer.create_block("class")
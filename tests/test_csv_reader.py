@@ -0,0 +1,215 @@
+import unittest
+import os.path
+import tarfile
+import tempfile
+import textwrap
+import zipfile
+
+from entigen.model import Model, PropertyView
+from entigen.readers import csv as csv_reader
+from entigen.readers.csv import CSVReader
+from entigen.errors import MetadataError
+
+from helpers import PROPERTIES_HEADER, TempDirTestCase, write_file
+
+class TestCSVReader(TempDirTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.path = self.tempdir.name
+
+    def write(self, filename: str, text: str) -> None:
+        write_file(os.path.join(self.path, filename),
+                   textwrap.dedent(text).lstrip())
+
+    def write_properties(self, text: str) -> None:
+        self.write("properties.csv",
+                   PROPERTIES_HEADER + textwrap.dedent(text).lstrip())
+
+    def test_read_model(self) -> None:
+        self.write_properties("""
+        default,Thing,name,string,no,1,Name,Name of a thing,,
+        default,Thing,tags,list<string>,yes,2,Tags,Tags,[],
+
+        default,Other,size,int,no,1,Size,Size,,
+        """)
+        self.write("enum_values.csv", """
+        enum,key,value,label,description
+        Color,red,1,Red,
+        Color,green,2,Green,
+        """)
+
+        model = Model()
+        CSVReader(model).read_model(self.path)
+
+        self.assertEqual(model.entity_names, ["Thing", "Other"])
+
+        thing = model.entity("Thing")
+        self.assertEqual([p.name for p in thing.properties], ["name", "tags"])
+        self.assertEqual(thing.properties[1].tag, 2)
+        self.assertEqual(thing.properties[1].default, "[]")
+        self.assertIsNone(thing.properties[0].default)
+        self.assertTrue(thing.properties[1].is_optional)
+
+        color = model.enum("Color")
+        self.assertEqual([v.key for v in color.values], ["red", "green"])
+
+    def test_ungrouped(self) -> None:
+        self.write_properties("""
+        default,Thing,name,string,no,1,Name,,,
+        default,Other,size,int,no,1,Size,,,
+        default,Thing,type,string,no,2,Type,,,
+        """)
+
+        model = Model()
+        reader = CSVReader(model)
+        reader.read_model(self.path)
+
+        self.assertEqual([p.name for p in model.entity("Thing").properties],
+                         ["name", "type"])
+
+        with self.assertRaises(MetadataError):
+            list(reader.iter_entities(self.path))
+
+    def test_iter_entities(self) -> None:
+        self.write_properties("""
+        default,Thing,name,string,no,1,Name,,,
+        default,Thing,type,string,no,2,Type,,,
+        default,Other,size,int,no,1,Size,,,
+        """)
+
+        model = Model()
+        entities = CSVReader(model).iter_entities(self.path)
+
+        thing = next(entities)
+        self.assertEqual(thing.name, "Thing")
+        self.assertEqual(len(thing.properties), 2)
+        self.assertEqual([e.name for e in entities], ["Other"])
+        self.assertEqual(model.entities, [])
+
+    def test_invalid_tag(self) -> None:
+        self.write_properties("""
+        default,Thing,name,string,no,first,Name,,,
+        """)
+
+        with self.assertRaises(MetadataError):
+            CSVReader().read_model(self.path)
+
+    def test_fast(self) -> None:
+        self.write_properties("""
+        default,Thing,name,string,no,1,Name,"Name, of a thing",,
+        default,Thing,note,string,no,2,Note,"Multi-line
+        ""quoted"" text",,
+
+        default,Thing,size,int,no,3,Size,Size,,
+        """)
+
+        slow = Model()
+        CSVReader(slow).read_model(self.path)
+
+        fast = Model()
+        CSVReader(fast, variables={"fast_csv": "yes"}).read_model(self.path)
+
+        self.assertEqual([p.desc for p in fast.entity("Thing").properties],
+                         [p.desc for p in slow.entity("Thing").properties])
+        self.assertEqual(fast.entity("Thing").properties[1].desc,
+                         'Multi-line\n"quoted" text')
+
+    def test_fast_chunks(self) -> None:
+        self.write_properties("""
+        default,Thing,name,string,no,1,Name,"line1
+        line2",,
+        default,Thing,note,string,no,2,Note,"a
+
+        b",,
+        """)
+
+        slow = Model()
+        CSVReader(slow).read_model(self.path)
+
+        # Chunks end within the quoted values
+        saved = csv_reader.FAST_CHUNK_SIZE
+        csv_reader.FAST_CHUNK_SIZE = 8
+        try:
+            fast = Model()
+            CSVReader(fast, variables={"fast_csv": "yes"}) \
+                .read_model(self.path)
+        finally:
+            csv_reader.FAST_CHUNK_SIZE = saved
+
+        self.assertEqual([p.desc for p in fast.entity("Thing").properties],
+                         ["line1\nline2", "a\n\nb"])
+        self.assertEqual([p.desc for p in fast.entity("Thing").properties],
+                         [p.desc for p in slow.entity("Thing").properties])
+
+    def test_compact(self) -> None:
+        self.write_properties("""
+        default,Thing,name,string,no,1,Name,Name of a thing,,
+        default,Other,size,int,yes,1,Size,,,
+        default,Thing,tags,list<string>,no,2,Tags,Tags,[],
+        default,Third,size,int,,1,Size,,,
+        """)
+
+        model = Model()
+        CSVReader(model).read_model(self.path)
+
+        compact = Model()
+        CSVReader(compact, variables={"compact_model": "yes"}) \
+            .read_model(self.path)
+
+        def rows(model: Model) -> list:
+            return [(entity.name, p.name, p.tag, p.raw_type, p.type, p.label,
+                     p.desc, p.default, p.is_optional)
+                    for entity in model.entities
+                    for p in entity.properties]
+
+        self.assertEqual(rows(compact), rows(model))
+        self.assertIsInstance(compact.entity("Other").properties,
+                              PropertyView)
+
+    def test_archives(self) -> None:
+        self.write_properties("""
+        default,Thing,name,string,no,1,Name,Name of a thing,,
+        default,Thing,color,Color,no,2,Color,,,
+        """)
+        self.write("enum_values.csv", """
+        enum,key,value,label,description
+        Color,red,1,Red,
+        """)
+
+        expected = Model()
+        CSVReader(expected).read_model(self.path)
+
+        archives = tempfile.TemporaryDirectory()
+        self.addCleanup(archives.cleanup)
+
+        names = ["properties.csv", "enum_values.csv"]
+
+        zip_path = os.path.join(archives.name, "thing.zip")
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            for name in names:
+                archive.write(os.path.join(self.path, name), name)
+
+        # Files in a directory, without the optional enum values
+        tar_path = os.path.join(archives.name, "thing.tar.gz")
+        with tarfile.open(tar_path, "w:gz") as tar:
+            tar.add(os.path.join(self.path, names[0]),
+                    "thing.model/" + names[0])
+
+        model = Model()
+        CSVReader(model).read_model(zip_path)
+        self.assertEqual(model.digest(), expected.digest())
+
+        model = Model()
+        reader = CSVReader(model, variables={"fast_csv": "yes"})
+        reader.read_model(tar_path)
+        self.assertEqual(model.entity("Thing").digest(),
+                         expected.entity("Thing").digest())
+        self.assertEqual(model.enum_names, [])
+        self.assertEqual(reader.source_files(tar_path), [tar_path])
+
+        empty_path = os.path.join(archives.name, "empty.zip")
+        with zipfile.ZipFile(empty_path, "w") as archive:
+            archive.writestr("README", "")
+
+        with self.assertRaises(FileNotFoundError):
+            CSVReader(Model()).read_model(empty_path)
@@ -0,0 +1,89 @@
+import unittest
+import io
+import json
+
+from entigen.diff import write_change_set
+from entigen.model import Model, Entity, Property, Enumeration, EnumValue
+
+
+def prop(name: str, tag: int, type: str="string") -> Property:
+    return Property(name, tag, type, name.title(), "", None, False)
+
+
+def create_model() -> Model:
+    model = Model()
+    model.add_entity(Entity("Thing", [prop("name", 1),
+                                      prop("color", 2, "Color")]))
+    model.add_entity(Entity("Part", [prop("name", 1), prop("size", 2, "int")]))
+    model.add_entity(Entity("Other", [prop("name", 1)]))
+    model.add_enum(Enumeration("Color", [EnumValue("red", 1, "Red", ""),
+                                         EnumValue("blue", 2, "Blue", "")]))
+    return model
+
+
+class TestDiff(unittest.TestCase):
+    def test_digest(self) -> None:
+        model = create_model()
+        other = create_model()
+
+        self.assertEqual(model.digest(), other.digest())
+        self.assertEqual(model.entity("Thing").digest(),
+                         other.entity("Thing").digest())
+
+        compact = create_model()
+        compact.compact()
+        self.assertEqual(compact.digest(), model.digest())
+
+        other.entity("Part").properties += [prop("weight", 3, "int")]
+        self.assertNotEqual(model.digest(), other.digest())
+        self.assertNotEqual(model.entity("Part").digest(),
+                            other.entity("Part").digest())
+
+    def test_no_changes(self) -> None:
+        diff = create_model().diff(create_model())
+
+        self.assertFalse(diff)
+        self.assertEqual(diff.entities, set())
+
+    def test_changes(self) -> None:
+        old = create_model()
+        new = create_model()
+
+        part = new.entity("Part")
+        part.properties = [prop("size", 2), prop("name", 1),
+                           prop("weight", 3, "int")]
+        new.remove_entity("Other")
+        new.add_entity(Entity("Box", [prop("content", 1, "list<Part>")]))
+        new.enum("Color").values = [EnumValue("red", 1, "Red", ""),
+                                    EnumValue("green", 3, "Green", "")]
+
+        diff = old.diff(new)
+
+        self.assertEqual(diff.added_entities, ["Box"])
+        self.assertEqual(diff.removed_entities, ["Other"])
+        self.assertEqual([d.name for d in diff.changed_entities], ["Part"])
+
+        changes = diff.changed_entities[0]
+        self.assertEqual(changes.added, [3])
+        self.assertEqual(changes.changed, [2])
+        self.assertEqual(changes.removed, [])
+        self.assertTrue(changes.reordered)
+
+        self.assertEqual(diff.changed_enums[0].added, ["green"])
+        self.assertEqual(diff.changed_enums[0].removed, ["blue"])
+
+        self.assertEqual(diff.affected_entities(new),
+                         ["Thing", "Part", "Box"])
+
+    def test_change_set(self) -> None:
+        old = create_model()
+        new = create_model()
+        new.entity("Thing").properties = [prop("name", 1)]
+
+        stream = io.StringIO()
+        write_change_set(old, new, stream)
+        data = json.loads(stream.getvalue())
+
+        self.assertEqual(data["affected_entities"], ["Thing"])
+        self.assertEqual(data["entities"]["changed"]["Thing"]["removed"], [2])
+        self.assertEqual(data["digest"]["new"], new.digest().hex())
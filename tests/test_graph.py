@@ -0,0 +1,69 @@
+import unittest
+
+from entigen.errors import NoSuchObjectError
+from entigen.graph import EntityGraph, with_dependencies
+from entigen.jobs import Job
+from entigen.model import Model, Entity, Property
+
+
+def entity(name: str, *types: str) -> Entity:
+    props = [Property("p{}".format(i), i, type, "", "", None, False)
+             for i, type in enumerate(types)]
+    return Entity(name, props)
+
+
+class TestGraph(unittest.TestCase):
+    def setUp(self) -> None:
+        # Order references Customer and Line, Customer and Address reference
+        # each other
+        self.model = Model()
+        self.model.add_entity(entity("Order", "Customer", "list<Line>"))
+        self.model.add_entity(entity("Customer", "list<Address>", "string"))
+        self.model.add_entity(entity("Address", "Customer"))
+        self.model.add_entity(entity("Line", "dict<string,Product>"))
+        self.model.add_entity(entity("Product", "int"))
+        self.model.add_entity(entity("Unrelated", "string"))
+
+    def test_references(self) -> None:
+        graph = EntityGraph(self.model)
+
+        self.assertEqual(graph.references["Order"], ["Customer", "Line"])
+        self.assertEqual(graph.references["Product"], [])
+        self.assertEqual(graph.referrers["Customer"], ["Order", "Address"])
+
+    def test_closure(self) -> None:
+        graph = EntityGraph(self.model)
+
+        self.assertEqual(graph.closure(["Line"]), {"Line", "Product"})
+        self.assertEqual(graph.closure(["Address"]), {"Address", "Customer"})
+
+        with self.assertRaises(NoSuchObjectError):
+            graph.closure(["Unknown"])
+
+    def test_order(self) -> None:
+        graph = EntityGraph(self.model)
+
+        self.assertEqual(graph.components(),
+                         [["Customer", "Address"], ["Product"], ["Line"],
+                          ["Order"], ["Unrelated"]])
+        self.assertEqual(graph.dependency_order(["Order"]),
+                         ["Customer", "Address", "Product", "Line", "Order"])
+
+    def test_deep(self) -> None:
+        model = Model()
+        count = 5000
+        for i in range(count):
+            model.add_entity(entity("E{}".format(i), "E{}".format(i + 1)))
+        model.add_entity(entity("E{}".format(count)))
+
+        order = EntityGraph(model).topological_order()
+        self.assertEqual(order[0], "E{}".format(count))
+        self.assertEqual(order[-1], "E0")
+
+    def test_jobs(self) -> None:
+        jobs = [Job("python", "class", ["Line"], {}, None, None),
+                Job("python", "class", [], {}, None, None)]
+
+        jobs = with_dependencies(self.model, jobs)
+        self.assertEqual(jobs[0].entities, ["Product", "Line"])
+        self.assertEqual(jobs[1].entities, [])
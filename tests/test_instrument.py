@@ -0,0 +1,63 @@
+import unittest
+import io
+
+from entigen import instrument
+from entigen.block import Block
+from entigen.model import Model, Entity, Property
+from entigen.writers.python import PythonWriter
+
+
+class TestInstrument(unittest.TestCase):
+    def setUp(self) -> None:
+        instrument.reset()
+
+    def tearDown(self) -> None:
+        instrument.disable()
+        instrument.reset()
+
+    def model(self) -> Model:
+        model = Model()
+        for name in ["Thing", "Other"]:
+            props = [Property("name", 1, "string", "Name", "", None, False)]
+            model.add_entity(Entity(name=name, properties=props))
+        return model
+
+    def test_disabled(self) -> None:
+        writer = PythonWriter(self.model(), {})
+        writer.create_block("class").write(io.StringIO())
+
+        self.assertEqual(instrument.timers(), {})
+        self.assertEqual(instrument.counters(), {})
+
+    def test_phases(self) -> None:
+        instrument.enable()
+
+        writer = PythonWriter(self.model(), {})
+        block = writer.create_block("class")
+        block.write(io.StringIO())
+
+        timers = instrument.timers()
+        self.assertEqual(timers["create_block"][1], 1)
+        self.assertEqual(timers["write_class"][1], 2)
+        self.assertEqual(timers["render"][1], 1)
+        self.assertEqual(instrument.counters()["lines"],
+                         len(list(block.lines())))
+
+        slowest = [name for name, _ in instrument.slowest("write_class")]
+        self.assertEqual(sorted(slowest), ["Other", "Thing"])
+
+        stream = io.StringIO()
+        instrument.report(stream, top=1)
+        self.assertIn("create_block", stream.getvalue())
+
+    def test_subscribe(self) -> None:
+        events = []
+        instrument.subscribe(events.append)
+        try:
+            Block(["a", "b"]).write(io.StringIO())
+        finally:
+            instrument.unsubscribe(events.append)
+
+        self.assertEqual([(event.kind, event.name) for event in events],
+                         [("timer", "render"), ("counter", "lines")])
+        self.assertEqual(events[1].value, 2)
@@ -0,0 +1,98 @@
+import unittest
+import json
+import os
+import os.path
+import tempfile
+
+from entigen.jobs import Job, load_jobs, run_jobs
+from entigen.model import Model, Entity, Property
+from entigen.errors import ConfigError
+
+
+
+class TestJobs(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tempdir = tempfile.TemporaryDirectory()
+
+        self.model = Model()
+        props = [Property("name", 1, "string", "Name", "", None, False),
+                 Property("tags", 2, "list<string>", "Tags", "", "[]",
+                          False)]
+        self.model.add_entity(Entity(name="Thing", properties=props))
+        self.model.add_entity(Entity(name="OtherThing", properties=[]))
+
+    def tearDown(self) -> None:
+        self.tempdir.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.tempdir.name, name)
+
+    def read(self, name: str) -> str:
+        with open(self.path(name)) as f:
+            return f.read()
+
+    def write_jobs(self, name: str, content: str) -> str:
+        with open(self.path(name), "w") as f:
+            f.write(content)
+        return self.path(name)
+
+    def test_load_toml(self) -> None:
+        path = self.write_jobs("jobs.toml", """
+            [[job]]
+            writer = "python"
+            block = "class"
+            entities = ["Thing"]
+            output = "thing.py"
+
+            [job.variables]
+            entities_module = "entities"
+            entity_per_module = true
+
+            [[job]]
+            writer = "info"
+            output_dir = "out"
+            """.replace("\n            ", "\n"))
+
+        jobs = load_jobs(path)
+        self.assertEqual(len(jobs), 2)
+
+        self.assertEqual(jobs[0].block_type, "class")
+        self.assertEqual(jobs[0].entities, ["Thing"])
+        self.assertEqual(jobs[0].output, self.path("thing.py"))
+        self.assertEqual(jobs[0].variables,
+                         {"entities_module": "entities",
+                          "entity_per_module": True})
+
+        self.assertEqual(jobs[1].writer, "info")
+        self.assertEqual(jobs[1].output_dir, self.path("out"))
+
+    def test_load_json(self) -> None:
+        data = {"job": [{"writer": "info", "output": "names.txt"}]}
+        path = self.write_jobs("jobs.json", json.dumps(data))
+
+        jobs = load_jobs(path)
+        self.assertEqual(jobs[0].output, self.path("names.txt"))
+
+    def test_invalid(self) -> None:
+        path = self.write_jobs("jobs.json", '{"job": [{"writer": "info"}]}')
+        with self.assertRaises(ConfigError):
+            load_jobs(path)
+
+        path = self.write_jobs("jobs.json",
+                               '{"job": [{"otput": "names.txt"}]}')
+        with self.assertRaises(ConfigError):
+            load_jobs(path)
+
+    def test_run(self) -> None:
+        jobs = [
+            Job("python", "class", ["Thing"], {}, self.path("thing.py"),
+                None),
+            Job("info", None, [], {"decamelize": True},
+                self.path("names.txt"), None),
+            Job("python", "class_file", [], {}, self.path("all.py"), None),
+        ]
+        run_jobs(self.model, jobs)
+
+        self.assertTrue(self.read("thing.py").startswith("class Thing:"))
+        self.assertIn("class OtherThing:", self.read("all.py"))
+        self.assertEqual(self.read("names.txt"), "thing\nother_thing\n")
@@ -0,0 +1,108 @@
+import unittest
+import io
+import os.path
+import subprocess
+import sys
+
+from entigen import instrument
+from entigen.errors import ConfigError, MemoryLimitError
+from entigen.jobs import Job, run_jobs
+from entigen.memory import (MemoryGuard, MemoryReport, parse_size,
+                            run_jobs_within_limit)
+from entigen.model import Model, Entity, Property
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLE_MODEL = os.path.join(ROOT, "examples", "thing.model")
+
+
+class TestMemory(unittest.TestCase):
+    def setUp(self) -> None:
+        self.model = Model()
+        for name in ["Thing", "Other"]:
+            props = [Property("name", 1, "string", "Name", "", None, False),
+                     Property("tags", 2, "list<string>", "Tags", "", "[]",
+                              False)]
+            self.model.add_entity(Entity(name=name, properties=props))
+
+    def tearDown(self) -> None:
+        instrument.disable()
+        instrument.reset()
+
+    def output(self, block_type: str, **kwargs: object) -> str:
+        stream = io.StringIO()
+        job = Job("python", block_type, [], {}, None, None)
+        run_jobs(self.model, [job], stream=stream, **kwargs)
+        return stream.getvalue()
+
+    def test_parse_size(self) -> None:
+        self.assertEqual(parse_size("100"), 100)
+        self.assertEqual(parse_size("2K"), 2048)
+        self.assertEqual(parse_size("1.5mb"), 3 << 19)
+        self.assertEqual(parse_size("2G"), 2 << 30)
+
+        with self.assertRaises(ConfigError):
+            parse_size("lots")
+
+    def test_streaming(self) -> None:
+        for block_type in ["class", "class_file", "enums_file"]:
+            self.assertEqual(self.output(block_type, streaming=True),
+                             self.output(block_type))
+
+    def test_guard(self) -> None:
+        expected = self.output("class_file")
+
+        guard = MemoryGuard(1)
+        guard.start()
+        try:
+            with self.assertRaises(MemoryLimitError):
+                self.output("class_file")
+
+            stream = io.StringIO()
+            log = io.StringIO()
+            job = Job("python", "class_file", [], {}, None, None)
+            run_jobs_within_limit(self.model, [job], guard, log,
+                                  stream=stream)
+        finally:
+            guard.stop()
+
+        self.assertEqual(stream.getvalue(), expected)
+        self.assertIn("low-memory mode", log.getvalue())
+
+    def test_report(self) -> None:
+        report = MemoryReport()
+        report.start()
+        try:
+            self.output("class")
+        finally:
+            report.stop()
+
+        self.assertEqual([phase for phase, _, _ in report.phases],
+                         ["build", "render"])
+
+        stream = io.StringIO()
+        report.write(stream)
+        self.assertIn("build", stream.getvalue())
+
+    def run_main(self, limit: str) -> "subprocess.CompletedProcess[bytes]":
+        code = "import sys; " \
+               "sys.argv = ['entigen', '--no-cache', '--max-memory', {!r}, " \
+               "{!r}]; from entigen.main import main; main()" \
+               .format(limit, EXAMPLE_MODEL)
+        return subprocess.run([sys.executable, "-c", code], cwd=ROOT,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def test_invalid_limit(self) -> None:
+        result = self.run_main("abc")
+
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("argument --max-memory: Invalid size 'abc'",
+                      result.stderr.decode())
+        self.assertNotIn("Traceback", result.stderr.decode())
+
+    def test_model_over_limit(self) -> None:
+        result = self.run_main("1K")
+
+        self.assertEqual(result.returncode, 1)
+        self.assertEqual(result.stdout, b"")
+        self.assertRegex(result.stderr.decode(),
+                         r"^entigen: Memory limit .* loading the model.*\n$")
@@ -0,0 +1,91 @@
+import unittest
+import pickle
+
+from entigen.model import Model, Entity, Enumeration, Property, PropertyView
+from entigen.errors import MetadataError, NoSuchObjectError
+
+class TestModel(unittest.TestCase):
+    def test_lookup(self) -> None:
+        model = Model()
+        thing = Entity("Thing", [])
+        color = Enumeration("Color", [])
+
+        model.add_entity(thing)
+        model.add_enum(color)
+
+        self.assertIs(model.entity("Thing"), thing)
+        self.assertIs(model.enum("Color"), color)
+        self.assertIs(model.symbol("Color"), color)
+        self.assertTrue(model.is_entity("Thing"))
+        self.assertFalse(model.is_entity("Color"))
+        self.assertTrue(model.is_enum("Color"))
+
+        with self.assertRaises(NoSuchObjectError):
+            model.entity("Unknown")
+
+    def test_duplicate(self) -> None:
+        model = Model()
+        model.add_entity(Entity("Thing", []))
+
+        with self.assertRaises(MetadataError):
+            model.add_entity(Entity("Thing", []))
+
+    def test_remove(self) -> None:
+        model = Model()
+        model.add_entity(Entity("Thing", []))
+        model.add_entity(Entity("Other", []))
+        model.add_enum(Enumeration("Thing", []))
+
+        self.assertIsInstance(model.symbol("Thing"), Entity)
+
+        model.remove_entity("Thing")
+
+        self.assertEqual(model.entity_names, ["Other"])
+        self.assertEqual([e.name for e in model.entities], ["Other"])
+        self.assertFalse(model.is_entity("Thing"))
+        self.assertIsInstance(model.symbol("Thing"), Enumeration)
+
+        model.remove_enum("Thing")
+        with self.assertRaises(NoSuchObjectError):
+            model.symbol("Thing")
+
+    def test_merge(self) -> None:
+        first = Model()
+        first.add_entity(Entity("Thing", []))
+        second = Model()
+        second.add_entity(Entity("Other", []))
+        second.add_enum(Enumeration("Color", []))
+
+        first.merge(second)
+
+        self.assertEqual(first.entity_names, ["Thing", "Other"])
+        self.assertEqual(first.enum_names, ["Color"])
+
+        with self.assertRaises(MetadataError):
+            first.merge(second)
+
+    def test_compact(self) -> None:
+        model = Model()
+        model.add_entity(Entity("Thing", [
+            Property("name", 1, "string", "Name", "Name", None, False),
+            Property("tags", 2, "list<string>", "Tags", "", "[]", None),
+        ]))
+        model.add_entity(Entity("Empty", []))
+        model.compact()
+
+        props = model.entity("Thing").properties
+        self.assertIsInstance(props, PropertyView)
+        self.assertEqual(len(props), 2)
+        self.assertEqual([p.name for p in props], ["name", "tags"])
+        self.assertEqual(props[-1].default, "[]")
+        self.assertIsNone(props[1].is_optional)
+        self.assertEqual(str(props[1].type), "list<string>")
+        self.assertEqual([p.tag for p in props[1:]], [2])
+        self.assertEqual(len(model.entity("Empty").properties), 0)
+
+        with self.assertRaises(IndexError):
+            props[2]
+
+        copy = pickle.loads(pickle.dumps(model))
+        self.assertEqual([p.label for p in copy.entity("Thing").properties],
+                         ["Name", "Tags"])
@@ -0,0 +1,95 @@
+import unittest
+import os
+import os.path
+import subprocess
+import sys
+import tempfile
+
+from entigen.block import Block
+from entigen.model import Model, Entity, Property
+from entigen.output import OutputDirectory
+from entigen.writers.python import PythonWriter
+
+class TestOutputDirectory(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "out")
+
+    def tearDown(self) -> None:
+        self.tempdir.cleanup()
+
+    def read(self, name: str) -> str:
+        with open(os.path.join(self.path, name)) as f:
+            return f.read()
+
+    def test_update(self) -> None:
+        files = [("a.py", Block("a = 1")), ("b.py", Block("b = 1"))]
+
+        written, removed = OutputDirectory(self.path).update(files)
+        self.assertEqual(written, ["a.py", "b.py"])
+        self.assertEqual(self.read("a.py"), "a = 1\n")
+
+        # Manifest is read by a new instance
+        written, removed = OutputDirectory(self.path).update(files)
+        self.assertEqual(written, [])
+
+        files = [("a.py", Block("a = 2"))]
+        written, removed = OutputDirectory(self.path).update(files)
+        self.assertEqual(written, ["a.py"])
+        self.assertEqual(removed, ["b.py"])
+        self.assertEqual(self.read("a.py"), "a = 2\n")
+        self.assertFalse(os.path.exists(os.path.join(self.path, "b.py")))
+
+    def test_modified_file(self) -> None:
+        files = [("a.py", Block("a = 1"))]
+        OutputDirectory(self.path).update(files)
+
+        with open(os.path.join(self.path, "a.py"), "w") as f:
+            f.write("edited\n")
+
+        written, removed = OutputDirectory(self.path).update(files)
+        self.assertEqual(written, ["a.py"])
+        self.assertEqual(self.read("a.py"), "a = 1\n")
+
+    def test_entity_subset(self) -> None:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        model = os.path.join(root, "examples", "thing.model")
+
+        def generate(*entities: str) -> None:
+            code = "import sys; sys.argv = ['entigen', '--no-cache', " \
+                   "'-O', {!r}, {!r}] + {!r}; " \
+                   "from entigen.main import main; main()" \
+                   .format(self.path, model, list(entities))
+            subprocess.run([sys.executable, "-c", code], cwd=root,
+                           check=True)
+
+        generate()
+        names = sorted(os.listdir(self.path))
+        self.assertIn("attribute.py", names)
+
+        # Files of the entities not listed are kept
+        generate("Thing")
+        self.assertEqual(sorted(os.listdir(self.path)), names)
+
+
+class TestPythonFiles(unittest.TestCase):
+    def test_files_layout(self) -> None:
+        model = Model()
+        model.add_entity(Entity(name="Thing", properties=[
+            Property("name", 1, "string", "Name", "", None, False),
+        ]))
+        model.add_entity(Entity(name="Part", properties=[
+            Property("thing", 1, "Thing", "Thing", "", None, False),
+        ]))
+        writer = PythonWriter(model, variables={})
+
+        # The writer is used while the multi-file output is suspended
+        files = writer.create_files()
+        name, block = next(files)
+        self.assertEqual(name, "thing.py")
+
+        block = writer.create_block("class_file", ["Part"])
+        self.assertNotIn("import Thing", str(block))
+
+        files = dict(files)
+        self.assertIn("from .thing import Thing", str(files["part.py"]))
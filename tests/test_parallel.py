@@ -0,0 +1,43 @@
+import unittest
+
+from entigen.parallel import read_models, PARALLEL_MIN_ENTITIES
+from entigen.model import Model, Entity, Property
+from entigen.writers.python import PythonWriter
+from entigen.errors import MetadataError
+
+from helpers import TempDirTestCase
+
+class TestReadModels(TempDirTestCase):
+    def test_merge_order(self) -> None:
+        first = self.model("first.model", "B", "A")
+        second = self.model("second.model", "D", "C")
+
+        model = read_models("csv", [first, second], workers=2)
+        self.assertEqual(model.entity_names, ["B", "A", "D", "C"])
+
+        model = read_models("csv", [second, first], workers=1)
+        self.assertEqual(model.entity_names, ["D", "C", "B", "A"])
+
+    def test_duplicate(self) -> None:
+        first = self.model("first.model", "A")
+        second = self.model("second.model", "A")
+
+        with self.assertRaises(MetadataError):
+            read_models("csv", [first, second], workers=2)
+
+
+class TestRenderEntities(unittest.TestCase):
+    def test_identical(self) -> None:
+        model = Model()
+        for i in range(PARALLEL_MIN_ENTITIES + 10):
+            props = [Property("name", 1, "string", "Name", "", None, False),
+                     Property("items", 2, "list<string>", "Items", "", "[]",
+                              False)]
+            model.add_entity(Entity("Entity{}".format(i), props))
+
+        serial = PythonWriter(model, variables={})
+        parallel = PythonWriter(model, variables={})
+        parallel.workers = 2
+
+        self.assertEqual(str(parallel.create_block("class_file")),
+                         str(serial.create_block("class_file")))
@@ -0,0 +1,122 @@
+import unittest
+import io
+import os
+import os.path
+
+from entigen.errors import CompilationError
+from entigen.jobs import Job, run_jobs
+from entigen.model import Model, Entity, Property, Enumeration, EnumValue
+from entigen import parallel, pipeline
+from entigen.parallel import PARALLEL_MIN_ENTITIES
+from entigen.pipeline import run_pipeline
+
+from helpers import TempDirTestCase
+
+
+class FailingStream(io.StringIO):
+    def write(self, text: str) -> int:
+        raise OSError("Disk full")
+
+
+class TestPipeline(TempDirTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.model = Model()
+        for i in range(20):
+            props = [Property("name", 1, "string", "Name", "", None, False),
+                     Property("color", 2, "Color", "Color", "", None, False),
+                     Property("next", 3, "Thing{}".format((i + 1) % 20),
+                              "Next", "", None, True)]
+            self.model.add_entity(Entity("Thing{}".format(i), props))
+        self.model.add_enum(Enumeration("Color", [
+            EnumValue("red", 1, "Red", ""),
+        ]))
+
+    def output(self, run: object, block_type: str, **kwargs: object) -> str:
+        stream = io.StringIO()
+        job = Job("python", block_type, [], {}, None, None)
+        run(self.model, [job], stream=stream, **kwargs)  # type: ignore
+        return stream.getvalue()
+
+    def test_output(self) -> None:
+        for block_type in ["class", "class_file", "enums_file"]:
+            self.assertEqual(self.output(run_pipeline, block_type,
+                                         queue_size=1),
+                             self.output(run_jobs, block_type))
+
+    def test_chunks(self) -> None:
+        saved = pipeline.CHUNK_LINES
+        pipeline.CHUNK_LINES = 7
+        try:
+            self.assertEqual(self.output(run_pipeline, "class_file"),
+                             self.output(run_jobs, "class_file"))
+        finally:
+            pipeline.CHUNK_LINES = saved
+
+    def test_output_dir(self) -> None:
+        first = self.temp_path("first")
+        second = self.temp_path("second")
+        os.makedirs(second)
+        with open(os.path.join(second, ".entigen-manifest.json"), "w") as f:
+            f.write('{"files": {"stale.py": ["", 0, 0]}}')
+        with open(os.path.join(second, "stale.py"), "w") as f:
+            f.write("")
+
+        run_jobs(self.model, [Job("python", None, [], {}, None, first)])
+        run_pipeline(self.model, [Job("python", None, [], {}, None, second)],
+                     queue_size=2)
+
+        names = sorted(os.listdir(first))
+        self.assertEqual(sorted(os.listdir(second)), names)
+        self.assertNotIn("stale.py", names)
+
+        for name in names:
+            if name.endswith(".py"):
+                with open(os.path.join(first, name)) as f:
+                    expected = f.read()
+                with open(os.path.join(second, name)) as f:
+                    self.assertEqual(f.read(), expected)
+
+    def test_entity_subset(self) -> None:
+        path = self.temp_path("output")
+        run_pipeline(self.model, [Job("python", None, [], {}, None, path)])
+        names = sorted(os.listdir(path))
+
+        # Files of the entities not listed are kept
+        run_pipeline(self.model,
+                     [Job("python", None, ["Thing1"], {}, None, path)])
+        self.assertEqual(sorted(os.listdir(path)), names)
+
+    def test_writer_error(self) -> None:
+        self.model.add_entity(Entity("Broken", [
+            Property("part", 1, "Unknown", "Part", "", None, False),
+        ]))
+
+        with self.assertRaises(CompilationError):
+            self.output(run_pipeline, "class_file")
+
+    def test_sink_error(self) -> None:
+        job = Job("python", "class", [], {}, None, None)
+
+        with self.assertRaises(OSError):
+            run_pipeline(self.model, [job], stream=FailingStream(),
+                         queue_size=1)
+
+    def test_no_worker_processes(self) -> None:
+        for i in range(20, PARALLEL_MIN_ENTITIES):
+            self.model.add_entity(Entity("Other{}".format(i), [
+                Property("name", 1, "string", "Name", "", None, False),
+            ]))
+
+        def render_entities(*args: object) -> None:
+            raise AssertionError("Blocks created in worker processes")
+
+        # Blocks are not created by processes forked from the threads
+        saved = parallel.render_entities
+        parallel.render_entities = render_entities  # type: ignore
+        try:
+            self.assertEqual(self.output(run_pipeline, "class"),
+                             self.output(run_jobs, "class"))
+        finally:
+            parallel.render_entities = saved
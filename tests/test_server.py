@@ -0,0 +1,104 @@
+import unittest
+import asyncio
+import io
+import threading
+
+from entigen.server import Server, ModelStore, request
+from entigen.jobs import Job, run_jobs
+from entigen.parallel import read_models
+
+from helpers import TempDirTestCase
+
+
+class TestServer(TempDirTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.socket = self.temp_path("server.sock")
+
+        for name in ["first", "second", "third"]:
+            self.model(name + ".model", name.capitalize())
+
+        self.store = ModelStore(max_models=2)
+        self.server = Server(self.store)
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self.server.start(self.socket))
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.start()
+
+    def tearDown(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.run_until_complete(self.server.close())
+        self.loop.close()
+        super().tearDown()
+
+    def request(self, *argv: str) -> str:
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        status = request(self.socket, list(argv), self.tempdir.name,
+                         stdout=stdout, stderr=stderr)
+        self.assertEqual(status, 0, stderr.getvalue())
+        return stdout.getvalue()
+
+    def test_request(self) -> None:
+        model = read_models("csv", [self.temp_path("first.model")])
+        expected = io.StringIO()
+        run_jobs(model, [Job("python", None, [], {}, None, None)],
+                 stream=expected)
+
+        self.assertEqual(self.request("first.model"), expected.getvalue())
+        self.assertEqual(self.request("--pipeline", "first.model"),
+                         expected.getvalue())
+        self.assertEqual(self.request("-t", "info", "first.model"),
+                         "First\n")
+
+        # Output file is relative to the working directory of the client
+        self.assertEqual(self.request("-t", "info", "-o", "out.txt",
+                                      "first.model"), "")
+        with open(self.temp_path("out.txt")) as f:
+            self.assertEqual(f.read(), "First\n")
+
+    def test_model_cache(self) -> None:
+        self.request("-t", "info", "first.model")
+        self.request("-t", "info", "second.model")
+        self.assertEqual(len(self.store), 2)
+
+        # Changed model is read again
+        self.model("first.model", "Changed")
+        self.assertEqual(self.request("-t", "info", "first.model"),
+                         "Changed\n")
+
+        # Least recently used model is evicted
+        self.request("-t", "info", "third.model")
+        self.assertEqual(len(self.store), 2)
+        self.assertEqual(self.request("-t", "info", "second.model"),
+                         "Second\n")
+
+    def test_error(self) -> None:
+        stderr = io.StringIO()
+        status = request(self.socket, ["-t", "unknown", "first.model"],
+                         self.tempdir.name, stdout=io.StringIO(),
+                         stderr=stderr)
+        self.assertEqual(status, 1)
+        self.assertIn("unknown", stderr.getvalue())
+
+        # Server keeps running
+        self.assertEqual(self.request("-t", "info", "first.model"),
+                         "First\n")
+
+    def test_unsupported(self) -> None:
+        for argv in [["-h"], ["--workers", "2", "first.model"],
+                     ["--watch", "first.model"],
+                     ["--profile", "first.model"],
+                     ["--memory-report", "first.model"],
+                     ["--max-memory", "1G", "first.model"]]:
+            stdout = io.StringIO()
+            stderr = io.StringIO()
+            status = request(self.socket, argv, self.tempdir.name,
+                             stdout=stdout, stderr=stderr)
+            self.assertEqual(status, 1)
+            self.assertEqual(stdout.getvalue(), "")
+            self.assertRegex(stderr.getvalue(), "not (available|supported)")
+
+        self.assertEqual(self.request("-t", "info", "first.model"),
+                         "First\n")
@@ -0,0 +1,136 @@
+import unittest
+import io
+import os
+import os.path
+import tempfile
+
+from entigen.errors import MetadataError
+from entigen.jobs import Job, run_jobs
+from entigen.model import Model, Entity, Property, Enumeration, EnumValue
+from entigen.parallel import read_models
+from entigen.readers.csv import CSVReader
+from entigen.readers.sqlite import SQLiteReader, main, write_database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLE_MODEL = os.path.join(ROOT, "examples", "thing.model")
+
+
+def prop(name: str, tag: int, type: str) -> Property:
+    return Property(name, tag, type, name.title(), "", None, None)
+
+
+class TestSQLiteReader(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tempdir = tempfile.TemporaryDirectory()
+
+        self.model = Model()
+        self.model.add_entity(Entity("Order", [prop("lines", 1, "list<Line>"),
+                                               prop("state", 2, "State")]))
+        self.model.add_entity(Entity("Line", [prop("product", 1, "Product"),
+                                              prop("count", 2, "int")]))
+        self.model.add_entity(Entity("Product", [prop("name", 1, "string")]))
+        self.model.add_entity(Entity("Customer", [prop("name", 1, "string")]))
+        self.model.add_enum(Enumeration("State", [
+            EnumValue("open", 1, "Open", ""),
+            EnumValue("closed", 2, "Closed", "Closed order"),
+        ]))
+        self.model.add_enum(Enumeration("Color", [
+            EnumValue("red", 1, "Red", ""),
+        ]))
+
+    def tearDown(self) -> None:
+        self.tempdir.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.tempdir.name, name)
+
+    def test_read_model(self) -> None:
+        write_database(self.model, self.path("model.db"))
+
+        reader = SQLiteReader()
+        reader.read_model(self.path("model.db"))
+
+        self.assertEqual(reader.model.entity_names, self.model.entity_names)
+        self.assertEqual(reader.model.enum_names, self.model.enum_names)
+        self.assertEqual(reader.model.digest(), self.model.digest())
+
+    def test_read_entities(self) -> None:
+        write_database(self.model, self.path("model.db"))
+
+        reader = SQLiteReader()
+        reader.read_entities(self.path("model.db"), ["Order", "Unknown"])
+
+        self.assertEqual(reader.model.entity_names,
+                         ["Order", "Line", "Product"])
+        # Enums are always read whole
+        self.assertEqual(reader.model.enum_names, ["State", "Color"])
+        self.assertEqual(reader.model.entity("Line").digest(),
+                         self.model.entity("Line").digest())
+
+    def test_sources(self) -> None:
+        # Order refers to Line in the other source
+        first = Model()
+        first.add_entity(self.model.entity("Order"))
+        first.add_enum(self.model.enum("State"))
+        second = Model()
+        for name in ["Line", "Product", "Customer"]:
+            second.add_entity(self.model.entity(name))
+
+        write_database(first, self.path("first.db"))
+        write_database(second, self.path("second.db"))
+
+        model = read_models("sqlite", [self.path("first.db"),
+                                       self.path("second.db")],
+                            workers=1, entities=["Order"])
+
+        self.assertEqual(sorted(model.entity_names),
+                         ["Line", "Order", "Product"])
+
+    def test_enum_blocks(self) -> None:
+        write_database(self.model, self.path("model.db"))
+
+        model = read_models("sqlite", [self.path("model.db")], workers=1,
+                            entities=["Line"])
+        self.assertEqual(model.entity_names, ["Line", "Product"])
+
+        stream = io.StringIO()
+        run_jobs(model, [Job("info", "enum_list", ["Line"], {}, None, None)],
+                 stream=stream)
+        self.assertEqual(stream.getvalue(), "State\nColor\n")
+
+    def test_duplicate_sources(self) -> None:
+        first = Model()
+        first.add_entity(self.model.entity("Order"))
+        first.add_entity(self.model.entity("Line"))
+        first.add_enum(self.model.enum("State"))
+        second = Model()
+        second.add_entity(self.model.entity("Line"))
+        second.add_entity(self.model.entity("Product"))
+
+        write_database(first, self.path("first.db"))
+        write_database(second, self.path("second.db"))
+
+        with self.assertRaises(MetadataError):
+            read_models("sqlite", [self.path("first.db"),
+                                   self.path("second.db")],
+                        workers=1, entities=["Order"])
+
+    def test_convert(self) -> None:
+        main([EXAMPLE_MODEL, self.path("thing.db")])
+
+        expected = Model()
+        CSVReader(expected).read_model(EXAMPLE_MODEL)
+
+        reader = SQLiteReader()
+        reader.read_model(self.path("thing.db"))
+        self.assertEqual(reader.model.digest(), expected.digest())
+
+    def test_invalid(self) -> None:
+        with self.assertRaises(MetadataError):
+            SQLiteReader().read_model(self.path("missing.db"))
+
+        with open(self.path("empty.db"), "w"):
+            pass
+
+        with self.assertRaises(MetadataError):
+            SQLiteReader().read_model(self.path("empty.db"))
@@ -0,0 +1,44 @@
+import unittest
+import os
+import os.path
+import subprocess
+import sys
+
+from entigen.extensible import Extensible
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('entigen.readers.', 'entigen.writers.', 'entigen.server',
+                 'entigen.watch', 'concurrent.futures')
+"""Prefixes of modules not needed to start the tool. The start-up time is
+measured by ``benchmarks/startup.py``."""
+
+
+def imported(code: str) -> str:
+    """Run Python `code` in a new interpreter and return the sorted list of
+    imported heavy modules as printed when the interpreter exits."""
+    code = "import atexit, sys; " \
+           "atexit.register(lambda: print(sorted(m for m in sys.modules " \
+           "if m.startswith({!r})))); ".format(HEAVY_MODULES) + code
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT,
+                            stdout=subprocess.PIPE)
+    assert output.returncode == 0
+    return output.stdout.decode().strip().splitlines()[-1]
+
+
+class TestStartup(unittest.TestCase):
+    def test_lazy_imports(self) -> None:
+        self.assertEqual(imported("import entigen.main"), "[]")
+
+    def test_help(self) -> None:
+        self.assertEqual(imported("sys.argv = ['entigen', '--help']; "
+                                  "from entigen.main import main; main()"),
+                         "[]")
+
+    def test_registry(self) -> None:
+        self.assertIn("python", Extensible.writers.names())
+        self.assertEqual(Extensible.writers["info"].__name__, "InfoWriter")
+        self.assertEqual(Extensible.readers["csv"].__name__, "CSVReader")
+
+        with self.assertRaises(KeyError):
+            Extensible.writers["unknown"]
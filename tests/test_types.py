@@ -1,6 +1,10 @@
 import unittest
+import threading
+
+from typing import List
 
 from entigen.types import Type
+from entigen.errors import DatatypeError
 
 class TestTypes(unittest.TestCase):
 
@@ -17,3 +21,46 @@ class TestTypes(unittest.TestCase):
         child = t.first_child
         self.assertEqual(child.name, "string")
         self.assertEqual(child.children, None)
+
+    def test_nested(self) -> None:
+        t = Type.from_string("list<dict<string,list<int>>>")
+        self.assertEqual(t.name, "list")
+
+        child = t.first_child
+        self.assertEqual(child.name, "dict")
+        self.assertEqual([c.name for c in child.children], ["string", "list"])
+        self.assertEqual(str(t), "list<dict<string,list<int>>>")
+
+    def test_shared(self) -> None:
+        t = Type.from_string("dict<string, int>")
+
+        self.assertIs(t, Type.from_string("dict<string,int>"))
+        self.assertIs(t, Type("dict", [Type("string"), Type("int")]))
+        self.assertIs(t.children[0], Type.from_string("string"))
+
+        with self.assertRaises(AttributeError):
+            t.name = "list"
+
+    def test_shared_threads(self) -> None:
+        barrier = threading.Barrier(8)
+        types: List[Type] = []
+
+        def create() -> None:
+            barrier.wait()
+            types.append(Type("threaded", [Type("int")]))
+
+        threads = [threading.Thread(target=create) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(all(t is types[0] for t in types))
+
+    def test_invalid(self) -> None:
+        with self.assertRaises(DatatypeError):
+            Type.from_string("list<string")
+        with self.assertRaises(DatatypeError):
+            Type.from_string("list<string>>")
+        with self.assertRaises(DatatypeError):
+            Type.from_string("string<int>")
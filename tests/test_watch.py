@@ -0,0 +1,115 @@
+import unittest
+import io
+import os
+import os.path
+
+from entigen.jobs import Job
+from entigen.watch import ModelWatcher, affected_jobs, watch
+from entigen.errors import MetadataError
+
+from helpers import (ENUM_HEADER, PROPERTIES_HEADER, TempDirTestCase,
+                     write_file)
+
+
+class TestWatch(TempDirTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.source = self.temp_path("test.model")
+        self.mtime = 1000000000
+
+        self.write("properties.csv", PROPERTIES_HEADER,
+                   "default,Thing,name,string,no,1,Name,,,",
+                   "default,Thing,color,Color,no,2,Color,,,",
+                   "default,Other,name,string,no,1,Name,,,")
+        self.write("enum_values.csv", ENUM_HEADER,
+                   "Color,red,1,Red,",
+                   "Color,blue,2,Blue,")
+
+    def write(self, name: str, header: str, *lines: str) -> None:
+        path = os.path.join(self.source, name)
+        write_file(path, header + "\n".join(lines) + "\n")
+
+        # Make sure the modification time changes
+        self.mtime += 1000000000
+        os.utime(path, ns=(self.mtime, self.mtime))
+
+    def test_reload(self) -> None:
+        watcher = ModelWatcher("csv", [self.source])
+        self.assertEqual(watcher.model.entity_names, ["Thing", "Other"])
+        self.assertIsNone(watcher.reload())
+
+        color = watcher.model.enum("Color")
+
+        self.write("properties.csv", PROPERTIES_HEADER,
+                   "default,Thing,name,string,no,1,Name,,,",
+                   "default,Thing,color,Color,no,2,Color,,,",
+                   "default,Other,name,string,no,1,Other name,,,")
+
+        change = watcher.reload()
+        self.assertEqual(change.files,
+                         [os.path.join(self.source, "properties.csv")])
+        self.assertEqual(change.entities, {"Other"})
+        self.assertEqual(change.enums, set())
+        self.assertFalse(change.entity_list_changed)
+
+        # Enums are not re-read
+        self.assertIs(watcher.model.enum("Color"), color)
+        self.assertIsNone(watcher.reload())
+
+    def test_broken_file(self) -> None:
+        watcher = ModelWatcher("csv", [self.source])
+
+        self.write("properties.csv", PROPERTIES_HEADER,
+                   "default,Thing,,string,no,1,Name,,,")
+
+        with self.assertRaises(MetadataError):
+            watcher.reload()
+
+        # Previous model is kept and the file is not read again
+        self.assertEqual(watcher.model.entity_names, ["Thing", "Other"])
+        self.assertIsNone(watcher.reload())
+
+        self.write("properties.csv", PROPERTIES_HEADER,
+                   "default,Thing,name,string,no,1,Name,,,")
+        change = watcher.reload()
+        self.assertEqual(change.entities, {"Thing", "Other"})
+        self.assertTrue(change.entity_list_changed)
+
+    def test_affected_jobs(self) -> None:
+        watcher = ModelWatcher("csv", [self.source])
+
+        thing = Job("python", "class", ["Thing"], {}, "thing.py", None)
+        other = Job("python", "class", ["Other"], {}, "other.py", None)
+        all_files = Job("python", None, [], {}, None, "out")
+        enums = Job("python", "enums_file", [], {}, "enums.py", None)
+        jobs = [thing, other, all_files, enums]
+
+        self.write("enum_values.csv", ENUM_HEADER,
+                   "Color,red,1,Red,",
+                   "Color,green,2,Green,")
+
+        change = watcher.reload()
+        self.assertEqual(change.enums, {"Color"})
+
+        # Only Thing has a property of the Color type
+        result = affected_jobs(watcher.model, jobs, change)
+        self.assertEqual(result, [thing,
+                                  all_files._replace(entities=["Thing"]),
+                                  enums])
+
+    def test_watch(self) -> None:
+        jobs = [Job("info", None, [], {}, self.temp_path("names.txt"), None)]
+        watcher = ModelWatcher("csv", [self.source])
+
+        self.write("properties.csv", PROPERTIES_HEADER,
+                   "default,Thing,name,string,no,1,Name,,,",
+                   "default,Another,name,string,no,1,Name,,,")
+
+        log = io.StringIO()
+        watch(watcher, jobs, interval=0, cycles=2, log=log)
+
+        with open(self.temp_path("names.txt")) as f:
+            self.assertEqual(f.read(), "Thing\nAnother\n")
+
+        self.assertIn("regenerated 1 of 1 outputs", log.getvalue())
+        self.assertEqual(len(log.getvalue().splitlines()), 1)